@@ -0,0 +1,94 @@
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from spa import SLOT_PER_DAY, Gold, Slot, SlotCalendar, SQLiteRepository, bulk_load, init_system
+
+def timed(name: str, function):
+    started = time.perf_counter()
+    result = function()
+    print(f"{name:40s} {(time.perf_counter() - started) * 1e3:8.1f} ms")
+    return result
+
+def best_of(repeat: int, function):
+    elapsed_list = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        elapsed_list.append(time.perf_counter() - started)
+    return min(elapsed_list)
+
+def bench_slot(calendar_count: int = 100, day_count: int = 625, repeat: int = 3):
+    date_list = [date(2027, 1, 1) + timedelta(days=offset) for offset in range(day_count)]
+    vacancy_list = [1] * SLOT_PER_DAY
+    def validated():
+        for _ in range(calendar_count):
+            calendar = SlotCalendar()
+            for date_target in date_list:
+                for order in range(1, SLOT_PER_DAY + 1):
+                    calendar.add_slot(Slot(date_target, order, 1))
+    def trusted():
+        for _ in range(calendar_count):
+            calendar = SlotCalendar()
+            for date_target in date_list:
+                calendar.load_day(date_target, vacancy_list)
+    def construct(make):
+        def run():
+            for _ in range(calendar_count):
+                for date_target in date_list:
+                    for order in range(1, SLOT_PER_DAY + 1):
+                        make(date_target, order, 1)
+        return run
+    def in_bulk_load(function):
+        def run():
+            with bulk_load():
+                function()
+        return run
+
+    count = calendar_count * day_count * SLOT_PER_DAY
+    print(f"{count} slots ({calendar_count} calendars x {day_count} days), best of {repeat}:")
+    for name, function in (("Slot() + add_slot", validated), ("Slot.trusted() via load_day", trusted),
+                           ("Slot() alone", construct(Slot)), ("Slot.trusted() alone", construct(Slot.trusted)),
+                           ("Slot() + add_slot in bulk_load", in_bulk_load(validated)),
+                           ("load_day in bulk_load", in_bulk_load(trusted))):
+        print(f"  {name:38s} {best_of(repeat, function):8.2f} s")
+
+def bench(count: int = 100_000):
+    customer_list = [Gold(f"C{index:06d}", f"Customer {index}") for index in range(100, count + 100)]
+    spa = init_system()
+    def add_one_by_one():
+        for customer in customer_list:
+            spa.add_customer(customer)
+    timed(f"add_customer x {count}", add_one_by_one)
+
+    customer_list = [Gold(f"C{index:06d}", f"Customer {index}") for index in range(100, count + 100)]
+    spa = init_system()
+    def load_trusted():
+        with bulk_load():
+            spa.load_trusted(customer_list=customer_list)
+    timed(f"load_trusted x {count}", load_trusted)
+
+    room = spa.search_room_by_id("ROOM-DRY-PV-001")
+    vacancy_list = [1] * 16
+    def load_day():
+        for ordinal in range(date(2027, 1, 1).toordinal(), date(2027, 12, 31).toordinal() + 1):
+            room.calendar.load_day(date.fromordinal(ordinal), vacancy_list)
+    timed("load_day x 365", load_day)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "spa.db")
+        repository = SQLiteRepository(path)
+        timed(f"sqlite sync ({count} customers)", lambda: repository.sync(spa))
+        repository.close()
+        repository = SQLiteRepository(path)
+        timed(f"sqlite load ({count} customers)", lambda: repository.load(init_system()))
+        repository.close()
+
+    bench_slot()
+
+if __name__ == "__main__":
+    bench()
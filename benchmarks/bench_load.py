@@ -0,0 +1,78 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SLOT_BODY = {"customer_id": "C0001", "therapist_id": "T0001", "treatment_id": "TM-01", "room_type": "PV",
+             "year": 2026, "month": 1, "day": 15}
+
+def make_request(index: int):
+    if index % 2:
+        path, body = "/getSlot", dict(SLOT_BODY, day=1 + index % 28)
+    else:
+        path, body = "/checkNotice", {"customer_id": f"C{1 + index % 10:04d}"}
+    payload = json.dumps(body).encode()
+    return (f"POST {path} HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\n\r\n").encode() + payload
+
+async def call(reader, writer, index: int):
+    writer.write(make_request(index))
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    if not head.startswith(b"HTTP/1.1 200"): raise RuntimeError(head)
+    length = next(int(line.split(b":")[1]) for line in head.split(b"\r\n") if line.lower().startswith(b"content-length"))
+    await reader.readexactly(length)
+
+async def drive(port: int, concurrency: int, total: int):
+    for _ in range(100):
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            await call(reader, writer, 0)
+            writer.close()
+            break
+        except OSError:
+            await asyncio.sleep(0.1)
+    latency_list = []
+    counter = iter(range(total * 2))
+
+    async def worker(count: int):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        for _ in range(count):
+            index = next(counter)
+            started = time.perf_counter()
+            await call(reader, writer, index)
+            latency_list.append(time.perf_counter() - started)
+        writer.close()
+
+    await asyncio.gather(*(worker(5) for _ in range(concurrency)))
+    latency_list.clear()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(total // concurrency) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latency_list.sort()
+    return len(latency_list) / elapsed, latency_list[len(latency_list) // 2], latency_list[int(len(latency_list) * 0.99)]
+
+def bench(concurrency_list: tuple = (1, 16, 64), total: int = 8000, port: int = 8765):
+    for mode in ("async", "thread"):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            env = dict(os.environ, SPA_ASYNC_ROUTES="1" if mode == "async" else "0", SPA_CACHE_DIR=cache_dir, PYTHONPATH=ROOT)
+            for name in ("SPA_DATA_DIR", "SPA_DATABASE", "SPA_ENABLE_MCP"):
+                env.pop(name, None)
+            server = subprocess.Popen([sys.executable, "-m", "uvicorn", "spa:app", "--port", str(port),
+                                       "--log-level", "warning", "--no-access-log"], env=env, cwd=ROOT)
+            try:
+                for concurrency in concurrency_list:
+                    throughput, p50, p99 = asyncio.run(drive(port, concurrency, total))
+                    print(f"{mode:6s} concurrency={concurrency:3d} {throughput:7.0f} req/s  "
+                          f"p50={p50 * 1e3:6.1f} ms  p99={p99 * 1e3:6.1f} ms")
+            finally:
+                server.terminate()
+                server.wait()
+
+if __name__ == "__main__":
+    bench()
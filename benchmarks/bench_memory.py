@@ -0,0 +1,57 @@
+import os
+import sys
+import tracemalloc
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from spa import Booking, Coupon, Message, Slot, TreatmentTransaction, WellnessRecord, init_system
+
+COUNT = 100_000
+
+twin_class = {}
+
+def dict_twin(obj):
+    twin_type = twin_class.get(type(obj))
+    if twin_type is None:
+        twin_type = twin_class[type(obj)] = type(f"{type(obj).__name__}Dict", (), {})
+    twin = twin_type()
+    for cls in type(obj).__mro__:
+        for name in getattr(cls, "__slots__", ()):
+            attribute = f"_{cls.__name__.lstrip('_')}{name}" if name.startswith("__") else name
+            setattr(twin, attribute, getattr(obj, attribute))
+    return twin
+
+def measure(make):
+    tracemalloc.start()
+    object_list = [make(i) for i in range(COUNT)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return object_list, current / COUNT
+
+def compare(name: str, make):
+    _, before = measure(lambda i: dict_twin(make(i)))
+    object_list, after = measure(make)
+    print(f"{name:22s} {before:8.0f} {after:9.0f} {after - before:+8.0f}")
+    return object_list
+
+def bench():
+    spa = init_system()
+    customer = spa.search_customer_by_id("C0001")
+    treatment = spa.search_treatment_by_id("TM-01")
+    room = spa.search_room_by_id("ROOM-DRY-PV-001")
+    therapist = spa.search_employee_by_id("T0001")
+    date_target = date(2026, 1, 15)
+    now = datetime.now()
+
+    print(f"{'B/object':22s} {'__dict__':>8s} {'__slots__':>9s} {'delta':>8s}")
+    compare("Slot", lambda i: Slot(date_target, i % 16 + 1, 1))
+    transaction_list = compare("TreatmentTransaction",
+                               lambda i: TreatmentTransaction(customer, treatment, date_target, room, [1, 2], therapist, []))
+    compare("Booking", lambda i: Booking(f"BK-{i}", customer, date_target, [transaction_list[i]]))
+    compare("Message", lambda i: Message(f"PROMOTION-{i}", customer, "promo", now))
+    compare("WellnessRecord", lambda i: WellnessRecord(therapist, "ok"))
+    compare("Coupon", lambda i: Coupon(f"CP{i}", 100.0))
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,54 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import spa as spa_module
+from spa import Therapist, make_window_str, recover_system
+
+PAIR_LIST = [("T0001", "TM-01", "ROOM-DRY-PV-001"), ("T0002", "TM-01", "ROOM-DRY-PV-002"),
+             ("T0005", "DT-03", "ROOM-DRY-PV-003"), ("T0007", "HP-04", "ROOM-WET-PV-001")]
+
+def book_all(job_list: list):
+    for date_target, therapist_id, treatment_id, room_id, start in job_list:
+        response = spa_module.request_booking(spa_module.RequestBooking(
+            customer_id="C0001", year=date_target.year, month=date_target.month, day=date_target.day,
+            treatments=[spa_module.RequestTreatment(therapist_id=therapist_id, treatment_id=treatment_id,
+                                                    room_id=room_id, time=make_window_str(start, 2), addon=[])]))
+        if response.status != "SUCCESS": raise RuntimeError(response)
+
+def bench(day_count: int = 365, thread_count: int = 16):
+    with tempfile.TemporaryDirectory() as directory:
+        spa = recover_system(directory, 3600)
+        spa_module.spa = spa
+        for entity in spa.room_list + [employee for employee in spa.employee_list if isinstance(employee, Therapist)]:
+            entity.calendar.open_date_range(date(2027, 1, 1), date(2027, 12, 31), 1)
+        spa.journal.checkpoint(spa)
+        job_list = [(date(2027, 1, 1) + timedelta(days=offset), *pair, start)
+                    for offset in range(day_count) for pair in PAIR_LIST for start in range(1, 16, 2)]
+
+        started = time.perf_counter()
+        thread_list = [threading.Thread(target=book_all, args=(job_list[i::thread_count],)) for i in range(thread_count)]
+        for thread in thread_list: thread.start()
+        for thread in thread_list: thread.join()
+        elapsed = time.perf_counter() - started
+        print(f"{len(job_list)} journalled bookings on {thread_count} threads: {len(job_list) / elapsed:8.0f} ops/s")
+        spa.journal.close()
+
+        started = time.perf_counter()
+        spa = recover_system(directory, 3600)
+        print(f"replay {len(job_list)} records:             {(time.perf_counter() - started) * 1e3:8.1f} ms")
+        if spa.booking_count != len(job_list): raise RuntimeError("Replay lost bookings")
+
+        started = time.perf_counter()
+        spa.journal.close()
+        spa = recover_system(directory, 3600)
+        print(f"restart from snapshot:                {(time.perf_counter() - started) * 1e3:8.1f} ms")
+        spa.journal.close()
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,27 @@
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from spa import Bronze, Spa
+
+def linear_search(customer_list: list, id: str):
+    for customer in customer_list:
+        if customer.id == id:
+            return customer
+    return None
+
+def bench(customer_count: int, repeat: int = 5):
+    spa = Spa("BENCH SPA")
+    for number in range(1, customer_count + 1):
+        spa.add_customer(Bronze(f"C{number:06d}", f"Customer {number}"))
+    last_id = f"C{customer_count:06d}"
+    number = max(1, 200_000 // customer_count)
+    indexed = min(timeit.repeat(lambda: spa.search_customer_by_id(last_id), number=number * 100, repeat=repeat)) / (number * 100)
+    scanned = min(timeit.repeat(lambda: linear_search(spa.customer_list, last_id), number=number, repeat=repeat)) / number
+    print(f"{customer_count:>7} customers  indexed {indexed * 1e9:8.0f} ns   linear scan {scanned * 1e6:10.1f} us")
+
+if __name__ == "__main__":
+    for customer_count in (1_000, 10_000, 100_000):
+        bench(customer_count)
@@ -0,0 +1,33 @@
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import spa as spa_module
+from spa import Booking, TreatmentTransaction, init_system
+
+def bench(day_count: int = 3650, repeat: int = 20):
+    spa = init_system()
+    spa_module.spa = spa
+    customer = spa.search_customer_by_id("C0005")
+    treatment = spa.search_treatment_by_id("TM-01")
+    room = spa.search_room_by_id("ROOM-DRY-PV-001")
+    therapist = spa.search_employee_by_id("T0001")
+    for offset in range(day_count):
+        date_target = date(2020, 1, 1) + timedelta(days=offset)
+        transaction = TreatmentTransaction(customer, treatment, date_target, room, [1, 2], therapist, [])
+        spa.record_revenue(Booking(f"BK-{offset}", customer, date_target, [transaction]), 500.0)
+
+    for label, group_by, dimension in (("day", "day", None), ("month by therapist", "month", "therapist")):
+        request = spa_module.RequestRevenueReport(admin_id="0002", start_date=date(1, 1, 1), end_date=date(9999, 12, 31),
+                                                  group_by=group_by, dimension=dimension)
+        started = time.perf_counter()
+        for _ in range(repeat):
+            report = spa_module.request_revenue_report(request)
+        elapsed = (time.perf_counter() - started) / repeat
+        print(f"{day_count} recorded days, full range, {label:18s} {len(report):5d} rows {elapsed * 1e3:8.2f} ms")
+
+if __name__ == "__main__":
+    bench()
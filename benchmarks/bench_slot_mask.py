@@ -0,0 +1,29 @@
+import os
+import sys
+import timeit
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from spa import init_system, mask_to_slot_order
+
+def bench(repeat: int = 5, number: int = 20_000):
+    spa = init_system()
+    room = spa.search_room_by_id("ROOM-DRY-PV-001")
+    therapist = spa.search_employee_by_id("T0001")
+    date_target = date(2026, 1, 15)
+
+    case_list = (
+        ("find_intersect_free_slot(get_slot_by_date...)",
+         lambda: spa.find_intersect_free_slot(room.get_slot_by_date(date_target), therapist.get_slot_by_date(date_target))),
+        ("mask AND + decode to slot orders",
+         lambda: mask_to_slot_order(spa.find_intersect_free_mask(room, therapist, date_target))),
+        ("mask AND only",
+         lambda: spa.find_intersect_free_mask(room, therapist, date_target)),
+    )
+    for name, function in case_list:
+        best = min(timeit.repeat(function, number=number, repeat=repeat)) / number
+        print(f"{name:48s} {best * 1e6:6.2f} us")
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,49 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STARTUP_SCRIPT = """
+import json
+import sys
+import time
+
+started = time.perf_counter()
+import spa
+from fastapi.testclient import TestClient
+imported = time.perf_counter()
+if sys.argv[1] == "init_system":
+    spa.load_seed = spa.init_system
+spa.start_system()
+ready = time.perf_counter()
+with TestClient(spa.app) as client:
+    response = client.post("/getCustomerIdByName", params={"customer_name": "Batman"})
+    answered = time.perf_counter()
+if response.status_code != 200: raise RuntimeError(response.text)
+print(json.dumps({"import": imported - started, "start_system": ready - imported, "first_request": answered - ready}))
+"""
+
+def run(path: str, cache_dir: str, enable_mcp: bool):
+    env = dict(os.environ, SPA_CACHE_DIR=cache_dir, SPA_ENABLE_MCP="1" if enable_mcp else "", PYTHONPATH=ROOT)
+    for name in ("SPA_DATA_DIR", "SPA_DATABASE"):
+        env.pop(name, None)
+    result = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT, path], env=env, cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+def bench(repeat: int = 5):
+    for enable_mcp in (False, True):
+        suffix = " +mcp" if enable_mcp else ""
+        with tempfile.TemporaryDirectory() as cache_dir:
+            for label, path, count in (("init_system", "init_system", repeat), ("load_seed (cold cache)", "load_seed", 1),
+                                       ("load_seed (snapshot)", "load_seed", repeat)):
+                timing_list = [run(path, cache_dir, enable_mcp) for _ in range(count)]
+                best = {key: min(timing[key] for timing in timing_list) for key in timing_list[0]}
+                print(f"{label + suffix:29s} import {best['import'] * 1e3:7.1f} ms  start_system {best['start_system'] * 1e3:6.1f} ms  "
+                      f"first request {best['first_request'] * 1e3:6.1f} ms  total {sum(best.values()) * 1e3:7.1f} ms")
+
+if __name__ == "__main__":
+    bench()
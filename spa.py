@@ -1,17 +1,57 @@
 from __future__ import annotations
 from datetime import date, datetime, timedelta, time
-from typing import Dict
+from typing import Any, Dict, get_type_hints
 from enum import Enum
-from fastapi import FastAPI, HTTPException, Body
+from fastapi import FastAPI, HTTPException, Body, Response
 import uvicorn
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
+from pydantic_core import to_json, to_jsonable_python
 from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager, contextmanager, nullcontext
+from concurrent.futures import Future, ThreadPoolExecutor
+from collections import OrderedDict
+from time import monotonic
 import re
-
-from fastmcp import FastMCP
-
-mcp = FastMCP("Spa_system")
-app = FastAPI()
+import os
+import asyncio
+import functools
+import bisect
+import gc
+import heapq
+import itertools
+import json
+import logging
+import pickle
+import queue
+import sqlite3
+import threading
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger("spa")
+
+SPA_ENABLE_MCP = os.environ.get("SPA_ENABLE_MCP", "").lower() in ("1", "true", "yes")
+SPA_ASYNC_ROUTES = os.environ.get("SPA_ASYNC_ROUTES", "1").lower() in ("1", "true", "yes")
+
+@asynccontextmanager
+async def lifespan(server):
+    start_system()
+    yield
+    stop_system()
+
+if SPA_ENABLE_MCP:
+    from fastmcp import FastMCP
+    mcp = FastMCP("Spa_system", lifespan=lifespan)
+else:
+    class DisabledMCP:
+        def tool(self, *args, **kwargs):
+            return lambda function: function
+    mcp = DisabledMCP()
+
+app = FastAPI(lifespan=lifespan)
 
 # ==========================================
 # 1. DOMAIN CLASSES (FULL TYPE & VALUE VALIDATION)
@@ -23,6 +63,56 @@ class SkillSets(Enum):
   DT = "Deep Tissue Massage"
   HP = "Hydrotherapy Pool"
 
+class IdAllocator:
+    def __init__(self):
+        self.__sequence = {}
+        self.__lock = threading.Lock()
+
+    def next(self, key: str):
+        if not isinstance(key, str): raise TypeError("Sequence key must be a string")
+        with self.__lock:
+            value = self.__sequence.get(key, 0)
+            self.__sequence[key] = value + 1
+        return value
+
+    def observe(self, key: str, value: int):
+        if not isinstance(key, str): raise TypeError("Sequence key must be a string")
+        if not isinstance(value, int): raise TypeError("Sequence value must be an integer")
+        with self.__lock:
+            if self.__sequence.get(key, 0) <= value:
+                self.__sequence[key] = value + 1
+
+    def state(self):
+        with self.__lock:
+            return dict(self.__sequence)
+
+    def __getstate__(self):
+        return {"sequence": self.state()}
+
+    def __setstate__(self, state):
+        self.__sequence = {}
+        self.__lock = threading.Lock()
+        self.load_state(state["sequence"])
+
+    def load_state(self, state: dict):
+        if not isinstance(state, dict): raise TypeError("State must be a dict")
+        with self.__lock:
+            for key, value in state.items():
+                if self.__sequence.get(key, 0) < value:
+                    self.__sequence[key] = value
+
+    def booking_id(self, d: date):
+        if not isinstance(d, date): raise TypeError("Must be a date object")
+        prefix = f"BK-{d.strftime('%Y%m%d')}"
+        return f"{prefix}-{self.next(prefix)}"
+
+    def customer_id(self):
+        return f"C{self.next('C'):04d}"
+
+    def notice_id(self, prefix: str, now: datetime):
+        if not isinstance(now, datetime): raise TypeError("Must be a datetime object")
+        return f"{prefix}-{now.strftime('%Y%m%d%H%M%S')}-{self.next('NOTICE')}"
+
 class Spa:
     def __init__(self, name: str):
         if not isinstance(name, str): raise TypeError("Spa name must be a string")
@@ -36,7 +126,43 @@ class Spa:
         self.__resource_list = []
         self.__add_on_list = []
         self.__revenue_per_day_list = []
-        self.__booking_count = 0
+        self.__id_allocator = IdAllocator()
+        self.__id_allocator.observe("C", 0)
+        self.__customer_index = {}
+        self.__employee_index = {}
+        self.__room_index = {}
+        self.__room_type_index = {}
+        self.__treatment_index = {}
+        self.__add_on_index = {}
+        self.__occupancy_matrix = None
+        self.__revenue_index = {}
+        self.__revenue_date_list = []
+        self.__booking_index = {}
+        self.__booking_by_date = {}
+        self.__booking_by_status = {}
+        self.__booking_by_therapist = {}
+        self.__booking_by_room = {}
+        self.__booking_lock = threading.Lock()
+        self.__revenue_lock = threading.Lock()
+        self.__journal = None
+        self.__repository = InMemoryRepository()
+        self.__broadcast_box = BroadcastBox()
+        self.__catalog_version = 0
+        self.__skill_therapist_index = {skill: [] for skill in SkillSets}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_Spa__booking_lock"]
+        del state["_Spa__revenue_lock"]
+        state["_Spa__journal"] = None
+        state["_Spa__occupancy_matrix"] = None
+        state["_Spa__repository"] = InMemoryRepository()
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__booking_lock = threading.Lock()
+        self.__revenue_lock = threading.Lock()
 
     @property
     def employee_list(self): return self.__employee_list
@@ -47,46 +173,112 @@ class Spa:
     @property
     def customer_list(self): return self.__customer_list
     @property
+    def room_list(self): return self.__room_list
+    @property
+    def occupancy_matrix(self): return self.__occupancy_matrix
+    @property
     def revenue_per_day_list(self): return self.__revenue_per_day_list
     @property
-    def booking_count(self): return self.__booking_count
+    def booking_count(self): return len(self.__booking_index)
+    @property
+    def id_allocator(self): return self.__id_allocator
+    @property
+    def catalog_version(self): return self.__catalog_version
+
+    def invalidate_catalog(self):
+        self.__catalog_version += 1
+
+    def __index_therapist(self, therapist):
+        therapist.add_observer(self)
+        self.__skill_therapist_index[therapist.skill].append(therapist)
 
-    @booking_count.setter
-    def booking_count(self, value): self.__booking_count = value
+    def __unindex_therapist(self, therapist):
+        therapist.remove_observer(self)
+        for therapist_list in self.__skill_therapist_index.values():
+            if therapist in therapist_list:
+                therapist_list.remove(therapist)
+
+    def update_skill(self, therapist):
+        self.__unindex_therapist(therapist)
+        self.__index_therapist(therapist)
+        self.invalidate_catalog()
+
+    def get_qualified_therapist_list(self, treatment):
+        if not isinstance(treatment, Treatment): raise TypeError("Must be a Treatment object")
+        return self.__skill_therapist_index[treatment.skill]
+    @property
+    def journal(self): return self.__journal
+    @property
+    def repository(self): return self.__repository
+    @property
+    def persistent(self): return self.__journal is not None or not isinstance(self.__repository, InMemoryRepository)
+    @property
+    def broadcast_box(self): return self.__broadcast_box
+
+    def attach_repository(self, repository: Repository):
+        if not isinstance(repository, Repository): raise TypeError("Must be a Repository object")
+        repository.sync(self)
+        old_repository = self.__repository
+        self.__repository = repository
+        old_repository.close()
+
+    def attach_journal(self, journal: OperationLog):
+        if journal is not None and not isinstance(journal, OperationLog): raise TypeError("Must be an OperationLog object")
+        self.__journal = journal
+        for entity in self.__employee_list + self.__room_list:
+            self.__attach_gate(entity)
+
+    def __attach_gate(self, entity):
+        entity.calendar.attach_gate(self.__journal.gate if self.__journal is not None else None)
+
+    def log_operation(self, op: str, payload: dict):
+        if self.__journal is not None:
+            self.__journal.append(op, payload)
+
+    @contextmanager
+    def operation(self):
+        journal = self.__journal
+        if journal is None:
+            yield
+            return
+        with journal.gate.shared():
+            yield
+        journal.sync()
 
     def search_customer_by_id(self, id: str):
         if not isinstance(id, str): raise TypeError("ID must be a string")
+        return self.__customer_index.get(id)
+
+    def search_customer_by_name(self, name: str):
+        if not isinstance(name, str): raise TypeError("Name must be a string")
+        name = name.strip().casefold()
         for customer in self.__customer_list:
-            if customer.id == id: return customer
+            if customer.name.casefold() == name:
+                return customer
         return None
 
     def search_employee_by_id(self, id: str):
         if not isinstance(id, str): raise TypeError("ID must be a string")
-        for employee in self.__employee_list:
-            if employee.id == id: return employee
-        return None
+        return self.__employee_index.get(id)
 
     def search_treatment_by_id(self, id: str):
         if not isinstance(id, str): raise TypeError("ID must be a string")
-        for treatment in self.__treatment_list:
-            if treatment.id == id: return treatment
-        return None
+        return self.__treatment_index.get(id)
 
     def search_add_on_by_id(self, id: str):
         if not isinstance(id, str): raise TypeError("ID must be a string")
-        for add_on in self.__add_on_list:
-            if add_on.id == id: return add_on
-        return None
+        return self.__add_on_index.get(id)
 
     def search_room_by_id(self, id: str):
         if not isinstance(id, str): raise TypeError("ID must be a string")
-        for room in self.__room_list:
-            if room.id == id: return room
-        return None
+        return self.__room_index.get(id)
 
-    def get_room_by_room_type(self, type_str: str):
-        if not isinstance(type_str, str): raise TypeError("Room type must be a string")
-        return [room for room in self.__room_list if room.id.startswith(type_str)]
+    def get_room_list_by_type(self, room_type: str):
+        if not isinstance(room_type, str): raise TypeError("Room type must be a string")
+        return self.__room_type_index.get(room_type, [])
+
+    def __index_room(self, room):
+        self.__room_type_index.setdefault(room.room_type, []).append(room)
 
     def verify_admin(self, employee_id: str, input_password: str):
         if not isinstance(employee_id, str) or not isinstance(input_password, str):
@@ -105,28 +297,146 @@ class Spa:
 
     def add_employee(self, employee):
         if not isinstance(employee, Employee): raise TypeError("Must be an Employee object")
-        if self.search_employee_by_id(employee.id): raise ValueError(f"Employee ID {employee.id} already exists!")
+        if employee.id in self.__employee_index: raise ValueError(f"Employee ID {employee.id} already exists!")
         self.__employee_list.append(employee)
+        self.__employee_index[employee.id] = employee
+        self.__attach_gate(employee)
+        if isinstance(employee, Therapist):
+            self.__index_therapist(employee)
+            self.__drop_occupancy_matrix()
+        self.__repository.add_employee(employee)
+        self.invalidate_catalog()
 
     def add_treatment(self, treatment):
         if not isinstance(treatment, Treatment): raise TypeError("Must be a Treatment object")
-        if self.search_treatment_by_id(treatment.id): raise ValueError(f"Treatment ID {treatment.id} already exists!")
+        if treatment.id in self.__treatment_index: raise ValueError(f"Treatment ID {treatment.id} already exists!")
         self.__treatment_list.append(treatment)
+        self.__treatment_index[treatment.id] = treatment
+        self.invalidate_catalog()
 
     def add_customer(self, customer):
         if not isinstance(customer, Customer): raise TypeError("Must be a Customer object")
-        if self.search_customer_by_id(customer.id): raise ValueError(f"Customer ID {customer.id} already exists!")
+        if customer.id in self.__customer_index: raise ValueError(f"Customer ID {customer.id} already exists!")
         self.__customer_list.append(customer)
+        self.__customer_index[customer.id] = customer
+        if re.fullmatch(r"C\d+", customer.id):
+            self.__id_allocator.observe("C", int(customer.id[1:]))
+        customer.attach_broadcast(self.__broadcast_box)
+        self.__repository.add_customer(customer)
+
+    def add_broadcast(self, message: Message):
+        self.__broadcast_box.add(message)
+        self.__repository.add_broadcast(message, self.__broadcast_box.get_index(message.id))
+
+    def load_trusted(self, customer_list: list = (), employee_list: list = (), room_list: list = (),
+                     treatment_list: list = (), add_on_list: list = ()):
+        for item_list, target_list, index in ((customer_list, self.__customer_list, self.__customer_index),
+                                              (employee_list, self.__employee_list, self.__employee_index),
+                                              (room_list, self.__room_list, self.__room_index),
+                                              (treatment_list, self.__treatment_list, self.__treatment_index),
+                                              (add_on_list, self.__add_on_list, self.__add_on_index)):
+            target_list.extend(item_list)
+            index.update((item.id, item) for item in item_list)
+        for customer in customer_list:
+            customer.attach_broadcast(self.__broadcast_box)
+        for employee in employee_list:
+            self.__attach_gate(employee)
+            if isinstance(employee, Therapist):
+                self.__index_therapist(employee)
+        for room in room_list:
+            self.__attach_gate(room)
+            self.__index_room(room)
+        if employee_list or room_list:
+            self.__drop_occupancy_matrix()
+        if employee_list or treatment_list or room_list:
+            self.invalidate_catalog()
+        number_list = [int(customer.id[1:]) for customer in customer_list if re.fullmatch(r"C\d+", customer.id)]
+        if number_list:
+            self.__id_allocator.observe("C", max(number_list))
+        self.__repository.sync(self)
+
+    def add_notice_list(self, notice_list: list):
+        if not isinstance(notice_list, list): raise TypeError("Notices must be provided as a list")
+        for customer, message in notice_list:
+            customer.add_notice_list(message)
+        self.__repository.add_notice_list(notice_list)
+
+    def compact_notice(self, retention: timedelta, now: datetime = None):
+        if not isinstance(retention, timedelta): raise TypeError("Retention must be a timedelta object")
+        cutoff = (now or datetime.now()) - retention
+        archived = 0
+        for customer in list(self.__customer_list):
+            with self.operation():
+                archive_list, moved = customer.compact_notice(cutoff)
+                archived += len(archive_list) + moved
+                if archive_list:
+                    self.__repository.remove_notice_list(archive_list)
+                if moved:
+                    self.__repository.update_customer(customer)
+        return archived
 
     def add_room(self, room):
         if not isinstance(room, Room): raise TypeError("Must be a Room object")
-        if self.search_room_by_id(room.id): raise ValueError(f"Room ID {room.id} already exists!")
+        if room.id in self.__room_index: raise ValueError(f"Room ID {room.id} already exists!")
         self.__room_list.append(room)
+        self.__room_index[room.id] = room
+        self.__attach_gate(room)
+        self.__index_room(room)
+        self.__drop_occupancy_matrix()
+        self.__repository.add_room(room)
+        self.invalidate_catalog()
 
     def add_add_on_list(self, add_on):
         if not isinstance(add_on, AddOn): raise TypeError("Must be an AddOn object")
-        if self.search_add_on_by_id(add_on.id): raise ValueError(f"Add-on ID {add_on.id} already exists!")
+        if add_on.id in self.__add_on_index: raise ValueError(f"Add-on ID {add_on.id} already exists!")
         self.__add_on_list.append(add_on)
+        self.__add_on_index[add_on.id] = add_on
+
+    def remove_employee(self, id: str):
+        if not isinstance(id, str): raise TypeError("ID must be a string")
+        employee = self.__employee_index.pop(id, None)
+        if employee is None: raise ValueError(f"Employee ID {id} not found")
+        self.__employee_list.remove(employee)
+        if isinstance(employee, Therapist):
+            self.__unindex_therapist(employee)
+            self.__drop_occupancy_matrix()
+        self.__repository.remove_employee(employee)
+        self.invalidate_catalog()
+        return employee
+
+    def remove_treatment(self, id: str):
+        if not isinstance(id, str): raise TypeError("ID must be a string")
+        treatment = self.__treatment_index.pop(id, None)
+        if treatment is None: raise ValueError(f"Treatment ID {id} not found")
+        self.__treatment_list.remove(treatment)
+        self.invalidate_catalog()
+        return treatment
+
+    def remove_customer(self, id: str):
+        if not isinstance(id, str): raise TypeError("ID must be a string")
+        customer = self.__customer_index.pop(id, None)
+        if customer is None: raise ValueError(f"Customer ID {id} not found")
+        self.__customer_list.remove(customer)
+        self.__repository.remove_customer(customer)
+        return customer
+
+    def remove_room(self, id: str):
+        if not isinstance(id, str): raise TypeError("ID must be a string")
+        room = self.__room_index.pop(id, None)
+        if room is None: raise ValueError(f"Room ID {id} not found")
+        self.__room_list.remove(room)
+        self.__room_type_index[room.room_type].remove(room)
+        self.__drop_occupancy_matrix()
+        self.__repository.remove_room(room)
+        self.invalidate_catalog()
+        return room
+
+    def remove_add_on(self, id: str):
+        if not isinstance(id, str): raise TypeError("ID must be a string")
+        add_on = self.__add_on_index.pop(id, None)
+        if add_on is None: raise ValueError(f"Add-on ID {id} not found")
+        self.__add_on_list.remove(add_on)
+        return add_on
 
     def find_intersect_free_slot(self, room_slot: list, therapist_slot: list):
         if not isinstance(room_slot, list) or not isinstance(therapist_slot, list):
@@ -137,20 +447,233 @@ class Spa:
                 if room_slot[i].vacancy > 0 and therapist_slot[i].vacancy > 0:
                     list_of_intersect_free_slot.append(room_slot[i])
         return list_of_intersect_free_slot
+
+    def find_intersect_free_mask(self, room: Room, therapist: Employee, date_target: date):
+        if not isinstance(room, Room): raise TypeError("Must be a Room object")
+        if not isinstance(therapist, Employee): raise TypeError("Therapist must be an Employee object")
+        return room.calendar.get_free_mask(date_target) & therapist.calendar.get_free_mask(date_target)
+
+    def find_intersect_free_window(self, room: Room, therapist: Employee, date_target: date, slot_count: int):
+        return find_window_mask(self.find_intersect_free_mask(room, therapist, date_target), slot_count)
+
+    def search_free_window(self, therapist_list: list, room_list: list, start_date: date, end_date: date, slot_count: int, limit: int):
+        if not isinstance(therapist_list, list) or not isinstance(room_list, list):
+            raise TypeError("Therapists and rooms must be provided as lists")
+        if not isinstance(start_date, date) or not isinstance(end_date, date): raise TypeError("Must be a date object")
+        if not isinstance(limit, int): raise TypeError("Limit must be an integer")
+        if end_date < start_date: raise ValueError("End date must not be before start date")
+        if limit <= 0: raise ValueError("Limit must be > 0")
+
+        result = []
+        date_target = start_date
+        while date_target <= end_date:
+            day_result = []
+            for therapist in therapist_list:
+                therapist_mask = find_window_mask(therapist.calendar.get_free_mask(date_target), slot_count)
+                if not therapist_mask: continue
+                for room in room_list:
+                    start_mask = therapist_mask & find_window_mask(room.calendar.get_free_mask(date_target), slot_count)
+                    for start in mask_to_slot_order(start_mask):
+                        day_result.append((start, date_target, therapist, room))
+            day_result.sort(key=lambda window: window[0])
+            for start, d, therapist, room in day_result:
+                result.append((d, start, therapist, room))
+                if len(result) >= limit: return result
+            date_target += timedelta(days=1)
+        return result
     
+    def add_booking(self, booking: Booking):
+        if not isinstance(booking, Booking): raise TypeError("Must be a Booking object")
+        with self.__booking_lock:
+            if booking.id in self.__booking_index: raise ValueError(f"Booking ID {booking.id} already exists!")
+            self.__booking_index[booking.id] = booking
+            prefix, _, number = booking.id.rpartition("-")
+            if number.isdigit():
+                self.__id_allocator.observe(prefix, int(number))
+            self.__booking_by_date.setdefault(booking.date, {})[booking.id] = booking
+            self.__booking_by_status.setdefault(booking.status, {})[booking.id] = booking
+            for transaction in booking.treatment_list:
+                self.__booking_by_therapist.setdefault(transaction.therapist.id, {})[booking.id] = booking
+                self.__booking_by_room.setdefault(transaction.room.id, {})[booking.id] = booking
+        try:
+            self.__repository.add_booking(booking)
+        except BaseException:
+            self.__unindex_booking(booking)
+            raise
+
+    def __unindex_booking(self, booking: Booking):
+        with self.__booking_lock:
+            if self.__booking_index.get(booking.id) is not booking: return False
+            del self.__booking_index[booking.id]
+            self.__booking_by_date.get(booking.date, {}).pop(booking.id, None)
+            self.__booking_by_status.get(booking.status, {}).pop(booking.id, None)
+            for transaction in booking.treatment_list:
+                self.__booking_by_therapist.get(transaction.therapist.id, {}).pop(booking.id, None)
+                self.__booking_by_room.get(transaction.room.id, {}).pop(booking.id, None)
+        return True
+
+    def remove_booking(self, booking: Booking):
+        if not isinstance(booking, Booking): raise TypeError("Must be a Booking object")
+        if not self.__unindex_booking(booking): raise ValueError(f"Booking ID {booking.id} not found")
+        booking.customer.remove_booking(booking)
+        self.__repository.remove_booking(booking)
+
+    def update_booking_status(self, booking: Booking, old_status: str):
+        if not isinstance(booking, Booking): raise TypeError("Must be a Booking object")
+        with self.__booking_lock:
+            if booking.id not in self.__booking_index: return
+            self.__booking_by_status.get(old_status, {}).pop(booking.id, None)
+            self.__booking_by_status.setdefault(booking.status, {})[booking.id] = booking
+        self.__repository.update_booking_status(booking)
+
+    def reserve_treatment_transaction(self, transaction_list: list):
+        if not isinstance(transaction_list, list): raise TypeError("Transactions must be provided as a list")
+        with CalendarLock(transaction_list):
+            reserved_slot = []
+            reserved_addon = []
+            try:
+                for transaction in transaction_list:
+                    for time_order in transaction.time_slot:
+                        for entity in (transaction.room, transaction.therapist):
+                            slot = entity.get_slot_by_date_time(transaction.date, time_order)
+                            if slot is None:
+                                raise ValueError(f"{entity.id} is not open at {time_dict[time_order]}")
+                            reserved_slot.append((slot, transaction))
+                            slot.add_treatment_transaction(transaction)
+                    for addon in transaction.add_on_list:
+                        addon.reduce_amount(1)
+                        reserved_addon.append(addon)
+            except BaseException:
+                self.__release(reserved_slot, reserved_addon)
+                raise
+
+    def release_treatment_transaction(self, transaction_list: list):
+        if not isinstance(transaction_list, list): raise TypeError("Transactions must be provided as a list")
+        with CalendarLock(transaction_list):
+            reserved_slot = []
+            for transaction in transaction_list:
+                for time_order in transaction.time_slot:
+                    for entity in (transaction.room, transaction.therapist):
+                        slot = entity.get_slot_by_date_time(transaction.date, time_order)
+                        if slot is not None:
+                            reserved_slot.append((slot, transaction))
+            self.__release(reserved_slot, [addon for transaction in transaction_list for addon in transaction.add_on_list])
+
+    def __release(self, reserved_slot: list, reserved_addon: list):
+        for slot, transaction in reversed(reserved_slot):
+            try:
+                slot.remove_treatment_transaction(transaction)
+            except Exception:
+                logger.exception("Slot observer failed while releasing %s slot %s", slot.date, slot.slot_order)
+        for addon in reserved_addon:
+            addon.add_amount(1)
+
+    def create_booking(self, customer: Customer, date_target: date, transaction_list: list, booking_id: str = None):
+        if not isinstance(customer, Customer): raise TypeError("Must be a Customer object")
+        if not isinstance(date_target, date): raise TypeError("Must be a date object")
+        self.reserve_treatment_transaction(transaction_list)
+        logged = False
+        try:
+            if booking_id is None:
+                booking_id = self.create_booking_id(date_target)
+            if booking_id in self.__booking_index: raise ValueError(f"Booking ID {booking_id} already exists!")
+            booking = Booking(booking_id, customer, date_target, transaction_list, self)
+            self.log_operation("booking", {
+                "booking_id": booking_id,
+                "customer_id": customer.id,
+                "date": date_target.isoformat(),
+                "treatments": [{"treatment_id": transaction.treatment.id,
+                                "therapist_id": transaction.therapist.id,
+                                "room_id": transaction.room.id,
+                                "time_slot": list(transaction.time_slot),
+                                "addon": [addon.id for addon in transaction.add_on_list]}
+                               for transaction in transaction_list]
+            })
+            logged = self.__journal is not None
+            self.add_booking(booking)
+        except BaseException:
+            self.release_treatment_transaction(transaction_list)
+            if logged:
+                self.log_operation("rollback_booking", {"booking_id": booking_id})
+            raise
+        customer.book(booking)
+        return booking
+
+    def search_booking_by_id(self, id: str):
+        if not isinstance(id, str): raise TypeError("Booking ID must be a string")
+        return self.__booking_index.get(id)
+
+    def search_booking(self, date_target: date = None, status: str = None, therapist_id: str = None, room_id: str = None):
+        bucket_list = []
+        if date_target is not None: bucket_list.append(self.__booking_by_date.get(date_target, {}))
+        if status is not None: bucket_list.append(self.__booking_by_status.get(status, {}))
+        if therapist_id is not None: bucket_list.append(self.__booking_by_therapist.get(therapist_id, {}))
+        if room_id is not None: bucket_list.append(self.__booking_by_room.get(room_id, {}))
+        if not bucket_list: return list(self.__booking_index.values())
+        bucket_list.sort(key=len)
+        smallest, other_list = bucket_list[0], bucket_list[1:]
+        return [booking for booking_id, booking in smallest.items()
+                if all(booking_id in other for other in other_list)]
+
+    def search_revenue_by_date(self, date_target: date):
+        if not isinstance(date_target, date): raise TypeError("Must be a date object")
+        return self.__revenue_index.get(date_target)
+
+    def search_revenue_by_date_range(self, start_date: date, end_date: date):
+        if not isinstance(start_date, date) or not isinstance(end_date, date): raise TypeError("Must be a date object")
+        with self.__revenue_lock:
+            start = bisect.bisect_left(self.__revenue_date_list, start_date)
+            end = bisect.bisect_right(self.__revenue_date_list, end_date)
+            return [self.__revenue_index[date_target] for date_target in self.__revenue_date_list[start:end]]
+
+    def record_revenue(self, booking: Booking, total: float):
+        if not isinstance(booking, Booking): raise TypeError("Must be a Booking object")
+        if not isinstance(total, (int, float)): raise TypeError("Total must be a number")
+        if not booking.treatment_list: return
+        date_target = booking.treatment_list[0].date
+        with self.__revenue_lock:
+            revenue = self.__revenue_index.get(date_target)
+            if revenue is None:
+                revenue = RevenuePerDay(date_target)
+                self.__revenue_index[date_target] = revenue
+                self.__revenue_per_day_list.append(revenue)
+                bisect.insort(self.__revenue_date_list, date_target)
+            revenue.add_booking(booking, total)
+            self.__repository.update_revenue(revenue)
+
+    def load_revenue(self, revenue_list: list):
+        if not isinstance(revenue_list, list): raise TypeError("Revenue must be provided as a list")
+        with self.__revenue_lock:
+            for revenue in revenue_list:
+                if not isinstance(revenue, RevenuePerDay): raise TypeError("Must be a RevenuePerDay object")
+                old_revenue = self.__revenue_index.get(revenue.date)
+                if old_revenue is not None:
+                    self.__revenue_per_day_list.remove(old_revenue)
+                else:
+                    bisect.insort(self.__revenue_date_list, revenue.date)
+                self.__revenue_index[revenue.date] = revenue
+                self.__revenue_per_day_list.append(revenue)
+
+    def __drop_occupancy_matrix(self):
+        matrix = self.__occupancy_matrix
+        self.__occupancy_matrix = None
+        if matrix is not None:
+            matrix.close()
+
+    def get_occupancy_matrix(self, start_date: date, day_count: int):
+        matrix = self.__occupancy_matrix
+        if matrix is not None and matrix.covers(start_date, day_count):
+            return matrix
+        if matrix is not None:
+            matrix.close()
+        self.__occupancy_matrix = OccupancyMatrix(self, start_date, day_count)
+        return self.__occupancy_matrix
+
     def generate_customer_id(self) :
-        
-        current_count = len(self.customer_list)
-        
-        while True:
-            current_count += 1
-            new_id = f"C{current_count:04d}"
-            
-            if self.search_customer_by_id(new_id) is None:
-                return new_id
+        return self.__id_allocator.customer_id()
 
     def create_booking_id(self,d :date):
-        return f'BK-{d.year}{d.month if len(str(d.month)) > 1 else f"0{d.month}"}{d.day if len(str(d.day)) > 1 else f"0{d.day}"}-{spa.booking_count}'
+        return self.__id_allocator.booking_id(d)
 
 class Employee:
     def __init__(self, id: str, name: str):
@@ -160,25 +683,26 @@ class Employee:
             raise ValueError("Employee ID and Name cannot be empty")
         self.__id = id
         self.__name = name
-        self.__slot = []
+        self.__calendar = SlotCalendar()
 
     @property
     def id(self): return self.__id
     @property
-    def slot(self): return self.__slot
+    def slot(self): return self.__calendar.slot
+    @property
+    def calendar(self): return self.__calendar
     @property
     def name(self): return self.__name 
 
+    def add_slot(self, slot: Slot):
+        self.__calendar.add_slot(slot)
+
     def get_slot_by_date(self, date_target: date):
-        if not isinstance(date_target, date): raise TypeError("Must be a date object")
-        return [slot for slot in self.__slot if slot.date == date_target]
+        return self.__calendar.get_slot_by_date(date_target)
 
     def get_slot_by_date_time(self, date_target: date, time: int):
         if not isinstance(time, int): raise TypeError("Time order must be an integer")
-        for slot in self.get_slot_by_date(date_target):
-            if slot.slot_order == time:
-                return slot
-        return None
+        return self.__calendar.get_slot_by_date_time(date_target, time)
 
     def add_slot_by_time(self, slot_list: list, time: int):
         if not isinstance(slot_list, list): raise TypeError("Slot list must be a list")
@@ -217,24 +741,22 @@ class Admin(Employee):
         self.__login = False
 
 class RegistrationOfficer(Admin):
-    def add_slot(self, end_date_month: date, entity, vacancy: int):
+    def add_slot(self, end_date_month: date, entity, vacancy: int, weekday_list: list = None):
         if not isinstance(end_date_month, date): raise TypeError("Must be a date object")
+        if not isinstance(entity, (Room, Employee)): raise TypeError("Must be a Room or Employee object")
         if not isinstance(vacancy, int): raise TypeError("Vacancy must be an integer")
         if not self.login: raise PermissionError("Officer must login first")
         if vacancy < 0: raise ValueError("Vacancy cannot be negative")
         
-        year, month, end_date = end_date_month.year, end_date_month.month, end_date_month.day
-        for i in range(1, end_date + 1):
-            for n in range(1, 17):
-                slot = Slot(date(year, month, i), n, vacancy)
-                entity.slot.append(slot)
+        entity.calendar.open_date_range(end_date_month.replace(day=1), end_date_month, vacancy, weekday_list)
   
     def add_customer(self, customer: Customer):
         if not isinstance(customer, Customer): raise TypeError("Must be a Customer object")
         if not self.login: raise PermissionError("Officer must login first")
         self.spa.add_customer(customer)
-        notice_id = f"ENROLL_RESULT-{datetime.now().strftime('%Y%m%d%H%M%S')}"
-        customer.add_notice_list(Message(notice_id, customer, "Enroll success", datetime.now()))
+        now = datetime.now()
+        notice_id = self.spa.id_allocator.notice_id("ENROLL_RESULT", now)
+        self.spa.add_notice_list([(customer, Message(notice_id, customer, "Enroll success", now))])
   
     def add_employee(self, employee: Employee):
         if not isinstance(employee, Employee): raise TypeError("Must be an Employee object")
@@ -287,6 +809,8 @@ class RegistrationOfficer(Admin):
         return customer
     
 class Coupon:
+    __slots__ = ("__id", "__discount")
+
     def __init__(self, id: str, discount: float):
         self.__id = id
         self.__discount = discount
@@ -300,6 +824,8 @@ class Coupon:
         return self.__discount
 
 class Message:
+    __slots__ = ("__id", "__receiver", "__text", "__date", "__status")
+
     def __init__(self, id: str, receiver, text: str, date_received: datetime):
         if not isinstance(id, str) or not isinstance(text, str): raise TypeError("ID and text must be strings")
         if not isinstance(date_received, datetime): raise TypeError("Must be a datetime object")
@@ -322,6 +848,174 @@ class Message:
     def status(self, value):
         self.__status = value
 
+def notice_key(message: Message):
+    return (message.date, message.id)
+
+class BroadcastBox:
+    def __init__(self):
+        self.__message_list = []
+        self.__date_list = []
+        self.__index = {}
+
+    def __len__(self): return len(self.__message_list)
+
+    def add(self, message: Message):
+        if not isinstance(message, Message): raise TypeError("Must be a Message object")
+        if message.id in self.__index: raise ValueError(f"Broadcast ID {message.id} already exists!")
+        if self.__date_list and message.date < self.__date_list[-1]:
+            raise ValueError("Broadcasts must be added in date order")
+        self.__message_list.append(message)
+        self.__date_list.append(message.date)
+        self.__index[message.id] = len(self.__message_list) - 1
+
+    def get_index(self, id: str):
+        return self.__index.get(id)
+
+    def get_position(self, date_received: datetime):
+        return bisect.bisect_left(self.__date_list, date_received)
+
+    def get_position_after(self, date_received: datetime):
+        return bisect.bisect_right(self.__date_list, date_received)
+
+    def get_message(self, index: int):
+        return self.__message_list[index]
+
+    def get_message_list(self, start: int):
+        return self.__message_list[start:]
+
+class NoticeBox:
+    def __init__(self, owner):
+        self.__owner = owner
+        self.__message_list = []
+        self.__index = {}
+        self.__unread_list = []
+        self.__broadcast_box = None
+        self.__broadcast_start = 0
+        self.__broadcast_read = 0
+        self.__lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_NoticeBox__lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__lock = threading.Lock()
+
+    def __len__(self): return len(self.__message_list)
+
+    @property
+    def message_list(self): return self.__message_list
+    @property
+    def broadcast_start(self): return self.__broadcast_start
+    @property
+    def broadcast_read(self): return self.__broadcast_read
+    @property
+    def unread_count(self):
+        count = len(self.__unread_list)
+        if self.__broadcast_box is not None:
+            count += len(self.__broadcast_box) - self.__broadcast_start - self.__broadcast_read.bit_count()
+        return count
+
+    def attach_broadcast(self, broadcast_box: BroadcastBox, start: int = None, read: int = 0):
+        if not isinstance(broadcast_box, BroadcastBox): raise TypeError("Must be a BroadcastBox object")
+        with self.__lock:
+            if self.__broadcast_box is not None: return
+            self.__broadcast_box = broadcast_box
+            self.__broadcast_start = len(broadcast_box) if start is None else start
+            self.__broadcast_read = read
+
+    def add(self, message: Message):
+        if not isinstance(message, Message): raise TypeError("Must be a Message object")
+        with self.__lock:
+            if message.id in self.__index: raise ValueError(f"Notice ID {message.id} already exists!")
+            self.__index[message.id] = message
+            self.__insert(self.__message_list, message)
+            if message.status == "UNREAD":
+                self.__insert(self.__unread_list, message)
+
+    @staticmethod
+    def __insert(message_list: list, message: Message):
+        if not message_list or (message.date, message.id) >= (message_list[-1].date, message_list[-1].id):
+            message_list.append(message)
+        else:
+            bisect.insort_right(message_list, message, key=notice_key)
+
+    def search_notice_by_id(self, id: str):
+        return self.__index.get(id)
+
+    def __broadcast_view(self, index: int, message: Message):
+        view = Message(message.id, self.__owner, message.text, message.date)
+        if self.__broadcast_read >> (index - self.__broadcast_start) & 1:
+            view.status = "READ"
+        return view
+
+    def __unread_broadcast(self, cursor: tuple, limit: int):
+        if self.__broadcast_box is None: return []
+        end = len(self.__broadcast_box) if cursor is None else self.__broadcast_box.get_position_after(cursor[0])
+        width = end - self.__broadcast_start
+        if width <= 0: return []
+        mask = ~self.__broadcast_read & ((1 << width) - 1)
+        result = []
+        while mask:
+            offset = mask.bit_length() - 1
+            mask ^= 1 << offset
+            index = self.__broadcast_start + offset
+            message = self.__broadcast_box.get_message(index)
+            if cursor is not None and notice_key(message) >= cursor: continue
+            if limit is not None and len(result) >= limit and message.date != result[-1][1].date: break
+            result.append((index, message))
+        result.sort(key=lambda item: notice_key(item[1]), reverse=True)
+        return [self.__broadcast_view(index, message) for index, message in result[:limit]]
+
+    def get_unread_list(self, before: datetime = None, limit: int = None, before_id: str = None):
+        cursor = None if before is None else (before,) if before_id is None else (before, before_id)
+        with self.__lock:
+            end = len(self.__unread_list)
+            if cursor is not None:
+                end = bisect.bisect_left(self.__unread_list, cursor, key=notice_key)
+            start = 0 if limit is None else max(0, end - limit)
+            personal = self.__unread_list[start:end][::-1]
+            broadcast = self.__unread_broadcast(cursor, limit)
+        merged = heapq.merge(personal, broadcast, key=notice_key, reverse=True)
+        return list(merged if limit is None else itertools.islice(merged, limit))
+
+    def read(self, notice_id: str):
+        with self.__lock:
+            message = self.__index.get(notice_id)
+            if message is not None:
+                if message.status == "UNREAD":
+                    message.status = "READ"
+                    position = bisect.bisect_left(self.__unread_list, notice_key(message), key=notice_key)
+                    while self.__unread_list[position] is not message:
+                        position += 1
+                    del self.__unread_list[position]
+                return message
+            if self.__broadcast_box is None: return None
+            index = self.__broadcast_box.get_index(notice_id)
+            if index is None or index < self.__broadcast_start: return None
+            self.__broadcast_read |= 1 << (index - self.__broadcast_start)
+            return self.__broadcast_view(index, self.__broadcast_box.get_message(index))
+
+    def compact(self, cutoff: datetime):
+        with self.__lock:
+            archive_list = [message for message in self.__message_list
+                            if message.status == "READ" and message.date < cutoff]
+            if archive_list:
+                self.__message_list = [message for message in self.__message_list
+                                       if message.status != "READ" or message.date >= cutoff]
+                for message in archive_list:
+                    del self.__index[message.id]
+            moved = 0
+            if self.__broadcast_box is not None:
+                expired = self.__broadcast_box.get_position(cutoff) - self.__broadcast_start
+                read_prefix = (~self.__broadcast_read & (self.__broadcast_read + 1)).bit_length() - 1
+                moved = max(0, min(expired, read_prefix))
+                self.__broadcast_start += moved
+                self.__broadcast_read >>= moved
+            return archive_list, moved
+
 class Customer:
     def __init__(self, id: str, name: str):
         if not isinstance(id, str) or not isinstance(name, str):
@@ -330,7 +1024,7 @@ class Customer:
         self.__id = id
         self.__name = name
         self.__booking_list = []
-        self.__notice_list = []
+        self.__notice_box = NoticeBox(self)
         self.__coupon_list = []
         self.__wellness_record = []
         self.__missed_count = 0
@@ -344,17 +1038,33 @@ class Customer:
     @property
     def missed_count(self): return self.__missed_count
     @property
-    def notice_list(self): return self.__notice_list
+    def coupon_list(self): return self.__coupon_list
+    @property
+    def notice_list(self): return self.__notice_box.message_list
+    @property
+    def unread_notice_count(self): return self.__notice_box.unread_count
     @property
     def wellness_record(self): return self.__wellness_record
     @property
     def discount(self): return 0.0
     @property
     def booking_quota(self): return 0
+    @property
+    def broadcast_start(self): return self.__notice_box.broadcast_start
+    @property
+    def broadcast_read(self): return self.__notice_box.broadcast_read
+
+    @missed_count.setter
+    def missed_count(self, value: int):
+        if not isinstance(value, int): raise TypeError("Missed count must be an integer")
+        if value < 0: raise ValueError("Missed count cannot be negative")
+        self.__missed_count = value
+
+    def attach_broadcast(self, broadcast_box: BroadcastBox, start: int = None, read: int = 0):
+        self.__notice_box.attach_broadcast(broadcast_box, start, read)
 
     def add_notice_list(self, message: Message):
-        if not isinstance(message, Message): raise TypeError("Must be a Message object")
-        self.__notice_list.append(message)
+        self.__notice_box.add(message)
 
     def add_coupon_list(self, coupon: Coupon):
         if not isinstance(coupon, Coupon): raise TypeError("Must be a Coupon object")
@@ -372,7 +1082,7 @@ class Customer:
         return None
 
     def remove_coupon_by_id(self, coupon_id: str):
-        if not isinstance(id, str): raise TypeError("Coupon ID Must be a string")
+        if not isinstance(coupon_id, str): raise TypeError("Coupon ID Must be a string")
         coupon = self.search_coupon_by_id(coupon_id)
         self.__coupon_list.remove(coupon)
 
@@ -384,6 +1094,10 @@ class Customer:
 
     def book(self,booking:Booking):
         self.__booking_list.append(booking)
+
+    def remove_booking(self, booking: Booking):
+        if booking in self.__booking_list:
+            self.__booking_list.remove(booking)
   
     def add_treatment_transaction(self, booking_id: str, treatment_transaction):
         if not isinstance(booking_id, str): raise TypeError("Booking ID must be a string")
@@ -407,19 +1121,19 @@ class Customer:
                 completed_booking_list.append(booking)
         return completed_booking_list
 
-    def check_notice(self):
-        unread_notice = []
-        for notice in self.__notice_list:
-            if notice.status == "UNREAD":
-                unread_notice.append(notice)
-        return unread_notice
+    def check_notice(self, before: datetime = None, limit: int = None, before_id: str = None):
+        if before is not None and not isinstance(before, datetime): raise TypeError("Cursor must be a datetime object")
+        if before_id is not None and not isinstance(before_id, str): raise TypeError("Cursor ID must be a string")
+        if before_id is not None and before is None: raise ValueError("Cursor ID requires a cursor date")
+        if limit is not None and (not isinstance(limit, int) or limit <= 0): raise ValueError("Limit must be a positive integer")
+        return self.__notice_box.get_unread_list(before, limit, before_id)
 
     def read_notice(self, notice_id: str):
-        for notice in self.__notice_list:
-            if notice.id == notice_id:
-                notice.status = "READ"
-                return notice
-        return None
+        return self.__notice_box.read(notice_id)
+
+    def compact_notice(self, cutoff: datetime):
+        if not isinstance(cutoff, datetime): raise TypeError("Cutoff must be a datetime object")
+        return self.__notice_box.compact(cutoff)
     
     def change_personal_info(self, new_name:str):
         if not isinstance (new_name, str) or not new_name.strip():
@@ -483,6 +1197,8 @@ class Platinum(Customer):
     def booking_quota(self): return self.__booking_quota
 
 class TreatmentTransaction:
+    __slots__ = ("__customer", "__treatment", "__date", "__room", "__time_slot", "__add_on_list", "__therapist", "__status")
+
     def __init__(self, customer, treatment, date_target: date, room, time_slot: list, therapist, add_on_list: list):
         if not isinstance(customer, Customer): raise TypeError("Must be a Customer object")
         if not isinstance(treatment, Treatment): raise TypeError("Must be a Treatment object")
@@ -501,6 +1217,19 @@ class TreatmentTransaction:
         self.__therapist = therapist
         self.__status = ""
 
+    @classmethod
+    def trusted(cls, customer, treatment, date_target: date, room, time_slot: list, therapist, add_on_list: list):
+        transaction = cls.__new__(cls)
+        transaction.__customer = customer
+        transaction.__treatment = treatment
+        transaction.__date = date_target
+        transaction.__room = room
+        transaction.__time_slot = time_slot
+        transaction.__add_on_list = add_on_list
+        transaction.__therapist = therapist
+        transaction.__status = ""
+        return transaction
+
     @property
     def customer(self): return self.__customer
     @property  
@@ -517,6 +1246,7 @@ class TreatmentTransaction:
     def therapist(self): return self.__therapist
 
     def cancle(self):
+      if self.__status == "CANCLE": return True
       for time_order in self.__time_slot:
           room_slot = self.room.get_slot_by_date_time(self.__date, time_order)
           therapist_slot = self.therapist.get_slot_by_date_time(self.__date, time_order)
@@ -528,11 +1258,15 @@ class TreatmentTransaction:
       return self.__status == "CANCLE"
 
 class Treatment:
-    def __init__(self, id: str, name: str, price: float, duration: int, room_type: str):
+    def __init__(self, id: str, name: str, price: float, duration: int, room_type: str, skill: SkillSets = None):
         if not isinstance(id, str) or not isinstance(name, str) or not isinstance(room_type, str):
             raise TypeError("ID, name, and room type must be strings")
         if not isinstance(price, (int, float)): raise TypeError("Price must be a number")
         if not isinstance(duration, int): raise TypeError("Duration must be an integer")
+        if skill is None:
+            skill = next((item for item in SkillSets if item.value == name), None)
+            if skill is None: raise ValueError(f"Treatment {id} must declare a required skill")
+        if not isinstance(skill, SkillSets): raise TypeError("Skill must be a SkillSets object")
 
         if price < 0: raise ValueError("Treatment price cannot be negative")
         if duration <= 0: raise ValueError("Treatment duration must be > 0")
@@ -542,10 +1276,13 @@ class Treatment:
         self.__price = float(price)
         self.__duration = duration
         self.__room_type = room_type
+        self.__skill = skill
 
     @property
     def id(self): return self.__id
     @property
+    def skill(self): return self.__skill
+    @property
     def price(self): return self.__price
     @property
     def room_type(self): return self.__room_type
@@ -553,6 +1290,8 @@ class Treatment:
     def name(self): return self.__name
     @property
     def duration(self): return self.__duration
+    @property
+    def slot_count(self): return -(-self.__duration // SLOT_MINUTES)
 
 class AddOn:
     def __init__(self, id: str, name: str, price: float, amount: int):
@@ -566,6 +1305,16 @@ class AddOn:
         self.__name = name
         self.__price = float(price)
         self.__amount = amount
+        self.__lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_AddOn__lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__lock = threading.Lock()
 
     @property
     def id(self): return self.__id
@@ -579,47 +1328,57 @@ class AddOn:
     def reduce_amount(self, value: int):
         if not isinstance(value, int): raise TypeError("Reduction value must be an integer")
         if value < 0: raise ValueError("Reduction value cannot be negative")
-        if self.__amount < value:
-            raise ValueError(f"Not enough stock for {self.__name} (Available: {self.__amount})")
-        self.__amount -= value
+        with self.__lock:
+            if self.__amount < value:
+                raise ValueError(f"Not enough stock for {self.__name} (Available: {self.__amount})")
+            self.__amount -= value
 
     def add_amount(self, value: int):
         if not isinstance(value, int): raise TypeError("Reduction value must be an integer")
         if value < 0: raise ValueError("Reduction value cannot be negative")
-        self.__amount += value
+        with self.__lock:
+            self.__amount += value
     
     def is_ava(self):
         return self.__amount > 0
 
 class Room:
-    def __init__(self, id: str):
+    def __init__(self, id: str, capacity: int = 1):
         if not isinstance(id, str): raise TypeError("Room ID must be a string")
         if not id: raise ValueError("Room ID cannot be empty")
+        if not isinstance(capacity, int): raise TypeError("Capacity must be an integer")
+        if capacity < 1: raise ValueError("Room capacity must be at least 1")
         self.__id = id
-        self.__slot = []
+        self.__capacity = capacity
+        self.__calendar = SlotCalendar()
         self.__resource_list = []
 
     @property
     def id(self): return self.__id
     @property
-    def slot(self): return self.__slot
+    def capacity(self): return self.__capacity
+    @property
+    def slot(self): return self.__calendar.slot
+    @property
+    def calendar(self): return self.__calendar
     @property
     def resource_list(self): return self.__resource_list
+    @property
+    def room_type(self): return ""
 
     def add_resource_list(self, resource: Resource):
         if not isinstance(resource, Resource): raise TypeError("Must be a Resource object")
         self.__resource_list.append(resource)
 
+    def add_slot(self, slot: Slot):
+        self.__calendar.add_slot(slot)
+
     def get_slot_by_date(self, date_target: date):
-        if not isinstance(date_target, date): raise TypeError("Must be a date object")
-        return [slot for slot in self.__slot if slot.date == date_target]
+        return self.__calendar.get_slot_by_date(date_target)
 
     def get_slot_by_date_time(self, date_target: date, time_order: int):
         if not isinstance(time_order, int): raise TypeError("Time order must be an integer")
-        for slot in self.get_slot_by_date(date_target):
-            if slot.slot_order == time_order:
-                return slot
-        return None
+        return self.__calendar.get_slot_by_date_time(date_target, time_order)
 
     def add_slot_by_time(self, slot_list: list, time_order: int):
         if not isinstance(slot_list, list): raise TypeError("Must be a list of slots")
@@ -640,15 +1399,19 @@ class DryPrivateRoom(Room):
         self.__price = float(price)
     @property
     def price(self): return self.__price
+    @property
+    def room_type(self): return "DRY-PV"
 
 class DrySharedRoom(Room):
-    def __init__(self, id: str, price: float):
-        super().__init__(id)
+    def __init__(self, id: str, price: float, capacity: int = 10):
+        super().__init__(id, capacity)
         if not isinstance(price, (int, float)): raise TypeError("Price must be a number")
         if price < 0: raise ValueError("Room price cannot be negative")
         self.__price = float(price)
     @property
     def price(self): return self.__price
+    @property
+    def room_type(self): return "DRY-SH"
 
 class WetPrivateRoom(Room):
     def __init__(self, id: str, price: float):
@@ -658,17 +1421,23 @@ class WetPrivateRoom(Room):
         self.__price = float(price)
     @property
     def price(self): return self.__price
+    @property
+    def room_type(self): return "WET-PV"
 
 class WetSharedRoom(Room):
-    def __init__(self, id: str, price: float):
-        super().__init__(id)
+    def __init__(self, id: str, price: float, capacity: int = 10):
+        super().__init__(id, capacity)
         if not isinstance(price, (int, float)): raise TypeError("Price must be a number")
         if price < 0: raise ValueError("Room price cannot be negative")
         self.__price = float(price)
     @property
     def price(self): return self.__price
+    @property
+    def room_type(self): return "WET-SH"
 
 class Slot:
+    __slots__ = ("__date", "__slot_order", "__vacancy", "__treatment_transaction", "__calendar")
+
     def __init__(self, date_target: date, slot_order: int, vacancy: int):
         if not isinstance(date_target, date): raise TypeError("Must be a date object")
         if not isinstance(slot_order, int) or not isinstance(vacancy, int): 
@@ -679,7 +1448,18 @@ class Slot:
         self.__date = date_target
         self.__slot_order = slot_order
         self.__vacancy = vacancy
-        self.__treatment_transaction = []
+        self.__treatment_transaction = ()
+        self.__calendar = None
+
+    @classmethod
+    def trusted(cls, date_target: date, slot_order: int, vacancy: int, calendar: SlotCalendar = None):
+        slot = cls.__new__(cls)
+        slot.__date = date_target
+        slot.__slot_order = slot_order
+        slot.__vacancy = vacancy
+        slot.__treatment_transaction = ()
+        slot.__calendar = calendar
+        return slot
 
     @property
     def date(self): return self.__date
@@ -687,87 +1467,377 @@ class Slot:
     def slot_order(self): return self.__slot_order
     @property
     def vacancy(self): return self.__vacancy
+    @property
+    def calendar(self): return self.__calendar
 
     @vacancy.setter
     def vacancy(self, value: int):
         if not isinstance(value, int): raise TypeError("Vacancy must be an integer")
         if value < 0: raise ValueError("Vacancy cannot be negative")
         self.__vacancy = value
+        self.__update_calendar()
+
+    @calendar.setter
+    def calendar(self, value: SlotCalendar):
+        if not isinstance(value, SlotCalendar): raise TypeError("Must be a SlotCalendar object")
+        self.__calendar = value
 
     @property
     def treatment_transaction(self): return self.__treatment_transaction
 
+    def __update_calendar(self):
+        if self.__calendar is not None:
+            self.__calendar.update_slot(self)
+
     def add_treatment_transaction(self, transaction: TreatmentTransaction):
         if not isinstance(transaction, TreatmentTransaction): raise TypeError("Must be a TreatmentTransaction object")
         if self.__vacancy <= 0:
             raise ValueError(f"Cannot add transaction: Slot {self.__slot_order} is full!")
+        if not self.__treatment_transaction:
+            self.__treatment_transaction = []
         self.__treatment_transaction.append(transaction)
         self.__vacancy -= 1
+        self.__update_calendar()
 
     def remove_treatment_transaction(self, transaction: TreatmentTransaction):
         if not isinstance(transaction, TreatmentTransaction): raise TypeError("Must be a TreatmentTransaction object")
         if transaction in self.__treatment_transaction:
             self.__treatment_transaction.remove(transaction)
             self.__vacancy += 1
+            self.__update_calendar()
 
     def is_ava(self):
         return self.__vacancy > 0
+
+SLOT_PER_DAY = 16
+SLOT_MINUTES = 30
+FULL_DAY_MASK = (1 << SLOT_PER_DAY) - 1
+
+def mask_to_slot_order(mask: int):
+    return [i + 1 for i in range(SLOT_PER_DAY) if mask >> i & 1]
+
+def find_window_mask(mask: int, length: int):
+    if not isinstance(length, int): raise TypeError("Window length must be an integer")
+    if length <= 0: raise ValueError("Window length must be > 0")
+    window = mask
+    for shift in range(1, length):
+        window &= mask >> shift
+    return window
+
+class SlotCalendar:
+    def __init__(self):
+        self.__day_list = {}
+        self.__free_mask = {}
+        self.__rule_list = []
+        self.__observer_list = []
+        self.__lock_list = {}
+        self.__lock = threading.Lock()
+        self.__gate = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_SlotCalendar__lock"]
+        state["_SlotCalendar__gate"] = None
+        state["_SlotCalendar__lock_list"] = {}
+        state["_SlotCalendar__observer_list"] = []
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__lock = threading.Lock()
+
+    @property
+    def slot(self):
+        return [slot for d in sorted(self.__day_list) for slot in self.__day_list[d] if slot is not None]
+    @property
+    def rule_list(self): return self.__rule_list
+
+    def attach_gate(self, gate: CheckpointGate):
+        if gate is not None and not isinstance(gate, CheckpointGate): raise TypeError("Must be a CheckpointGate object")
+        self.__gate = gate
+
+    def open_date_range(self, start_date: date, end_date: date, vacancy: int, weekday_list: list = None):
+        if not isinstance(start_date, date) or not isinstance(end_date, date): raise TypeError("Must be a date object")
+        if not isinstance(vacancy, int): raise TypeError("Vacancy must be an integer")
+        if weekday_list is not None and not isinstance(weekday_list, list): raise TypeError("Weekdays must be a list")
+        if end_date < start_date: raise ValueError("End date must not be before start date")
+        if vacancy < 0: raise ValueError("Vacancy cannot be negative")
+        weekday_set = frozenset(weekday_list) if weekday_list is not None else None
+        self.__rule_list.append((start_date, end_date, vacancy, weekday_set))
+
+    def get_default_vacancy(self, date_target: date):
+        for start_date, end_date, vacancy, weekday_set in reversed(self.__rule_list):
+            if start_date <= date_target <= end_date and (weekday_set is None or date_target.weekday() in weekday_set):
+                return vacancy
+        return None
+
+    def get_lock(self, date_target: date):
+        lock = self.__lock_list.get(date_target)
+        if lock is None:
+            with self.__lock:
+                lock = self.__lock_list.setdefault(date_target, threading.Lock())
+        return lock
+
+    def __materialize(self, date_target: date):
+        day = self.__day_list.get(date_target)
+        if day is not None: return day
+        gate = self.__gate
+        with gate.shared() if gate is not None else nullcontext(), self.__lock:
+            day = self.__day_list.get(date_target)
+            if day is not None: return day
+            vacancy = self.get_default_vacancy(date_target)
+            if vacancy is None: return None
+            day = [Slot.trusted(date_target, n, vacancy, self) for n in range(1, SLOT_PER_DAY + 1)]
+            self.__free_mask[date_target] = FULL_DAY_MASK if vacancy > 0 else 0
+            self.__day_list[date_target] = day
+        return day
+
+    def add_slot(self, slot: Slot):
+        if not isinstance(slot, Slot): raise TypeError("Must be a Slot object")
+        day = self.__day_list.get(slot.date)
+        if day is None:
+            day = [None] * SLOT_PER_DAY
+            self.__day_list[slot.date] = day
+        if day[slot.slot_order - 1] is not None:
+            raise ValueError(f"Slot {slot.slot_order} on {slot.date} already exists")
+        day[slot.slot_order - 1] = slot
+        slot.calendar = self
+        self.update_slot(slot)
+
+    def load_day(self, date_target: date, vacancy_list: list):
+        gate = self.__gate
+        with gate.shared() if gate is not None else nullcontext(), self.__lock:
+            day = [Slot.trusted(date_target, n, vacancy, self) for n, vacancy in enumerate(vacancy_list, 1)]
+            self.__day_list[date_target] = day
+            mask = 0
+            for n, vacancy in enumerate(vacancy_list):
+                if vacancy > 0: mask |= 1 << n
+            self.__free_mask[date_target] = mask
+        for observer in self.__observer_list:
+            for slot in day:
+                observer.update_slot(self, slot)
+        return day
+
+    def update_slot(self, slot: Slot):
+        bit = 1 << (slot.slot_order - 1)
+        mask = self.__free_mask.get(slot.date, 0)
+        self.__free_mask[slot.date] = mask | bit if slot.vacancy > 0 else mask & ~bit
+        error = None
+        for observer in list(self.__observer_list):
+            try:
+                observer.update_slot(self, slot)
+            except Exception as e:
+                error = error or e
+        if error is not None: raise error
+
+    def add_observer(self, observer):
+        if observer not in self.__observer_list:
+            self.__observer_list.append(observer)
+
+    def remove_observer(self, observer):
+        if observer in self.__observer_list:
+            self.__observer_list.remove(observer)
+
+    def get_free_mask(self, date_target: date):
+        if not isinstance(date_target, date): raise TypeError("Must be a date object")
+        mask = self.__free_mask.get(date_target)
+        if mask is not None: return mask
+        return FULL_DAY_MASK if self.get_default_vacancy(date_target) else 0
+
+    def get_vacancy_by_date(self, date_target: date):
+        day = self.__day_list.get(date_target)
+        if day is None: return [self.get_default_vacancy(date_target) or 0] * SLOT_PER_DAY
+        return [slot.vacancy if slot is not None else 0 for slot in day]
+
+    def get_capacity_by_date(self, date_target: date):
+        day = self.__day_list.get(date_target)
+        if day is None: return [self.get_default_vacancy(date_target) or 0] * SLOT_PER_DAY
+        return [slot.vacancy + len(slot.treatment_transaction) if slot is not None else 0 for slot in day]
+
+    def get_slot_by_date(self, date_target: date):
+        if not isinstance(date_target, date): raise TypeError("Must be a date object")
+        day = self.__day_list.get(date_target)
+        if day is None:
+            vacancy = self.get_default_vacancy(date_target)
+            if vacancy is None: return []
+            return [Slot.trusted(date_target, n, vacancy) for n in range(1, SLOT_PER_DAY + 1)]
+        return [slot for slot in day if slot is not None]
+
+    def get_slot_by_date_time(self, date_target: date, slot_order: int):
+        if not isinstance(date_target, date): raise TypeError("Must be a date object")
+        if not (1 <= slot_order <= SLOT_PER_DAY): return None
+        day = self.__materialize(date_target)
+        if day is None: return None
+        return day[slot_order - 1]
+
+class CalendarLock:
+    def __init__(self, transaction_list: list):
+        lock_by_key = {}
+        for transaction in transaction_list:
+            lock_by_key[("ROOM", transaction.room.id, transaction.date)] = transaction.room.calendar.get_lock(transaction.date)
+            lock_by_key[("EMPLOYEE", transaction.therapist.id, transaction.date)] = transaction.therapist.calendar.get_lock(transaction.date)
+        self.__lock_list = [lock_by_key[key] for key in sorted(lock_by_key)]
+
+    def __enter__(self):
+        for lock in self.__lock_list:
+            lock.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        for lock in reversed(self.__lock_list):
+            lock.release()
+        return False
+
+class OccupancyMatrix:
+    def __init__(self, spa: Spa, start_date: date, day_count: int):
+        if np is None: raise ImportError("numpy is required for OccupancyMatrix")
+        if not isinstance(spa, Spa): raise TypeError("Must be a Spa object")
+        if not isinstance(start_date, date): raise TypeError("Must be a date object")
+        if not isinstance(day_count, int): raise TypeError("Day count must be an integer")
+        if day_count <= 0: raise ValueError("Day count must be > 0")
+        self.__start_date = start_date
+        self.__day_count = day_count
+        self.__room_list = list(spa.room_list)
+        self.__therapist_list = [employee for employee in spa.employee_list if isinstance(employee, Therapist)]
+        self.__room_vacancy, self.__room_capacity = self.__build(self.__room_list)
+        self.__therapist_vacancy, self.__therapist_capacity = self.__build(self.__therapist_list)
+        self.__position = {}
+        for i, room in enumerate(self.__room_list):
+            self.__position[room.calendar] = (self.__room_vacancy, self.__room_capacity, i)
+        for i, therapist in enumerate(self.__therapist_list):
+            self.__position[therapist.calendar] = (self.__therapist_vacancy, self.__therapist_capacity, i)
+        for calendar in self.__position:
+            calendar.add_observer(self)
+
+    @property
+    def start_date(self): return self.__start_date
+    @property
+    def day_count(self): return self.__day_count
+    @property
+    def room_list(self): return self.__room_list
+    @property
+    def therapist_list(self): return self.__therapist_list
+    @property
+    def room_vacancy(self): return self.__room_vacancy
+    @property
+    def therapist_vacancy(self): return self.__therapist_vacancy
+
+    def __build(self, entity_list: list):
+        vacancy = np.zeros((len(entity_list), self.__day_count, SLOT_PER_DAY), dtype=np.int32)
+        capacity = np.zeros_like(vacancy)
+        for i, entity in enumerate(entity_list):
+            for day in range(self.__day_count):
+                date_target = self.__start_date + timedelta(days=day)
+                vacancy[i, day] = entity.calendar.get_vacancy_by_date(date_target)
+                capacity[i, day] = entity.calendar.get_capacity_by_date(date_target)
+        return vacancy, capacity
+
+    def covers(self, start_date: date, day_count: int):
+        return self.__start_date <= start_date and \
+            start_date + timedelta(days=day_count) <= self.__start_date + timedelta(days=self.__day_count)
+
+    def close(self):
+        for calendar in self.__position:
+            calendar.remove_observer(self)
+        self.__position = {}
+
+    def update_slot(self, calendar: SlotCalendar, slot: Slot):
+        day = (slot.date - self.__start_date).days
+        if not (0 <= day < self.__day_count): return
+        vacancy, capacity, i = self.__position[calendar]
+        vacancy[i, day, slot.slot_order - 1] = slot.vacancy
+        capacity[i, day, slot.slot_order - 1] = slot.vacancy + len(slot.treatment_transaction)
+
+    def free_capacity_by_room_type(self):
+        result = {}
+        free_per_day = self.__room_vacancy.sum(axis=2)
+        for i, room in enumerate(self.__room_list):
+            room_type = f"ROOM-{room.room_type}"
+            if room_type not in result:
+                result[room_type] = np.zeros(self.__day_count, dtype=np.int64)
+            result[room_type] += free_per_day[i]
+        return result
+
+    def therapist_utilization(self):
+        capacity = self.__therapist_capacity.sum(axis=(1, 2))
+        used = capacity - self.__therapist_vacancy.sum(axis=(1, 2))
+        utilization = np.divide(used, capacity, out=np.zeros(len(capacity)), where=capacity > 0)
+        return {therapist.id: float(utilization[i]) for i, therapist in enumerate(self.__therapist_list)}
+
+    def __window(self, vacancy, slot_count: int):
+        free = vacancy > 0
+        width = SLOT_PER_DAY - slot_count + 1
+        if width <= 0: return np.zeros(free.shape[:-1] + (0,), dtype=bool)
+        window = free[..., :width].copy()
+        for shift in range(1, slot_count):
+            window &= free[..., shift:shift + width]
+        return window
+
+    def first_free_window(self, slot_count: int, room_list: list = None, therapist_list: list = None):
+        if not isinstance(slot_count, int): raise TypeError("Slot count must be an integer")
+        if slot_count <= 0: raise ValueError("Slot count must be > 0")
+        room_row = [i for i, room in enumerate(self.__room_list) if room_list is None or room in room_list]
+        therapist_row = [i for i, therapist in enumerate(self.__therapist_list) if therapist_list is None or therapist in therapist_list]
+        if not room_row or not therapist_row: return None
+        room_window = self.__window(self.__room_vacancy[room_row], slot_count)
+        therapist_window = self.__window(self.__therapist_vacancy[therapist_row], slot_count)
+        both = room_window.any(axis=0) & therapist_window.any(axis=0)
+        hit = np.argwhere(both)
+        if len(hit) == 0: return None
+        day, start = (int(value) for value in hit[0])
+        room = self.__room_list[room_row[int(np.argmax(room_window[:, day, start]))]]
+        therapist = self.__therapist_list[therapist_row[int(np.argmax(therapist_window[:, day, start]))]]
+        return self.__start_date + timedelta(days=day), start + 1, room, therapist
   
 class Administrative(Admin):
     def calculate_revenue_per_day(self, date_target: date):
         if not isinstance(date_target, date): raise TypeError("Must be a date object")
-        booking_count = 0
-        total_sum = 0
-        treatment_count = {
-            "Traditional Thai Massage": 0,
-            "Aroma Therapy": 0,
-            "Deep Tissue Massage": 0,
-            "Hydrotherapy Pool": 0
-        }
-        addon_count = {
-            "Premium Essential Oil": 0,
-            "Herbal Compress": 0,
-            "Detox Scrub": 0,
-            "After-Service Snack Set": 0
-        }
-        
-        for customer in self.spa.customer_list:
-            for booking in customer.booking_list:
-                if len(booking.treatment_list) > 0 and booking.treatment_list[0].date == date_target and booking.status == "Completed":
-                    booking_count += 1
-                    if booking.coupon_used_record is not None:
-                        coupon_used = booking.coupon_used_record.id
-                    else:
-                        coupon_used = "None"
-                    total_sum += booking.calculate_total(coupon_used)
-                    for transaction in booking.treatment_list:
-                        treatment_count[transaction.treatment.name] += 1
-                        for addon in transaction.add_on_list:
-                            addon_count[addon.name] += 1
-
-        report_revenue = {
-                            "date": date_target,
-                            "total": total_sum,
-                            "booking_count": booking_count,
-                            "treatment_count": treatment_count,
-                            "addon_count": addon_count
-                        }
-        return report_revenue
+        revenue = self.spa.search_revenue_by_date(date_target)
+        if revenue is None:
+            revenue = RevenuePerDay(date_target)
+        return revenue.to_report([treatment.name for treatment in self.spa.treatment_list],
+                                 [add_on.name for add_on in self.spa.add_on_list])
     
+    def calculate_revenue_report(self, start_date: date, end_date: date, group_by: str = "day", dimension: str = None):
+        if not isinstance(start_date, date) or not isinstance(end_date, date): raise TypeError("Must be a date object")
+        if end_date < start_date: raise ValueError("End date must not be before start date")
+        if group_by not in ("day", "week", "month"): raise ValueError("group_by must be day, week or month")
+        if dimension is not None and dimension not in REVENUE_DIMENSION:
+            raise ValueError(f"dimension must be one of {', '.join(REVENUE_DIMENSION)}")
+
+        report = {}
+        for revenue in self.spa.search_revenue_by_date_range(start_date, end_date):
+            date_target = revenue.date
+            if group_by == "day":
+                period = date_target.isoformat()
+            elif group_by == "week":
+                iso_year, iso_week, _ = date_target.isocalendar()
+                period = f"{iso_year}-W{iso_week:02d}"
+            else:
+                period = f"{date_target.year}-{date_target.month:02d}"
+            row = report.get(period)
+            if row is None:
+                row = {"period": period, "total": 0, "booking_count": 0, "breakdown": {}}
+                report[period] = row
+            row["total"] += revenue.total
+            row["booking_count"] += revenue.booking_count
+            if dimension is not None:
+                for key, (cell_revenue, cell_count) in revenue.breakdown[dimension].items():
+                    cell = row["breakdown"].setdefault(key, {"revenue": 0.0, "count": 0})
+                    cell["revenue"] += cell_revenue
+                    cell["count"] += cell_count
+        return list(report.values())
+
     def send_promotion(self, promo_text: str):
         if not isinstance(promo_text, str) or not promo_text.strip():
             raise ValueError("Promotion must be non-empty string")
         
-        customer_list = self.spa.customer_list 
-        count = 0
+        count = len(self.spa.customer_list)
         now = datetime.now()
+        promo_msg = Message(self.spa.id_allocator.notice_id("PROMOTION", now), None, promo_text, now)
 
-        for customer in customer_list:
-            notice_id = f"PROMOTION-{now.strftime('%Y%m%d%H%M%S')}-{customer.id}"
-            promo_msg = Message(notice_id, customer, promo_text, now)
-            customer.add_notice_list(promo_msg)
-            count += 1
-            
+        self.spa.add_broadcast(promo_msg)
+        self.spa.log_operation("promotion", {"notice_id": promo_msg.id, "text": promo_text, "at": now.isoformat()})
         return f"Promotion sent {count} person"
     
 class Payment(ABC):
@@ -805,10 +1875,13 @@ class Card(Payment):
         return "True", f"Payment Success✅, {total} ฿ deducted from your card (Card id : {number})"
 
 class Booking:
-    def __init__(self, id: str, customer: Customer, date_target: date,treat_list:list[TreatmentTransaction]):
+    __slots__ = ("__id", "__customer", "__date", "__treatment_list", "__coupon_used_record", "__status", "__spa", "__lock")
+
+    def __init__(self, id: str, customer: Customer, date_target: date,treat_list:list[TreatmentTransaction], spa: Spa = None):
         if not isinstance(id, str): raise TypeError("Booking ID must be a string")
         if not isinstance(customer, Customer): raise TypeError("Must be a Customer object")
         if not isinstance(date_target, date): raise TypeError("Must be a date object")
+        if spa is not None and not isinstance(spa, Spa): raise TypeError("Must be a Spa object")
         if not id: raise ValueError("Booking ID cannot be empty")
         
         self.__id = id
@@ -817,6 +1890,17 @@ class Booking:
         self.__treatment_list = treat_list
         self.__coupon_used_record = None
         self.__status = "Waiting deposit"
+        self.__spa = spa
+        self.__lock = threading.Lock()
+
+    def __getstate__(self):
+        return (self.__id, self.__customer, self.__date, self.__treatment_list,
+                self.__coupon_used_record, self.__status, self.__spa)
+
+    def __setstate__(self, state):
+        (self.__id, self.__customer, self.__date, self.__treatment_list,
+         self.__coupon_used_record, self.__status, self.__spa) = state
+        self.__lock = threading.Lock()
 
     @property
     def id(self): return self.__id
@@ -828,11 +1912,25 @@ class Booking:
     def status(self): return self.__status
     @property
     def coupon_used_record(self): return self.__coupon_used_record
+    @property
+    def customer(self): return self.__customer
 
     @status.setter
     def status(self, value: str):
         if not isinstance(value, str): raise TypeError("Status must be a string")
+        with self.__lock:
+            self.__set_status(value)
+
+    @coupon_used_record.setter
+    def coupon_used_record(self, value: Coupon):
+        if not isinstance(value, Coupon): raise TypeError("Must be a Coupon object")
+        self.__coupon_used_record = value
+
+    def __set_status(self, value: str):
+        old_status = self.__status
         self.__status = value
+        if self.__spa is not None:
+            self.__spa.update_booking_status(self, old_status)
 
     def calculate_total(self, coupon_id: str):
         if coupon_id != "None":
@@ -862,41 +1960,126 @@ class Booking:
         if not isinstance(payment, Payment): raise TypeError("Must be a Payment object")
         if not isinstance(total, (int, float)): raise TypeError("Total must be a number")
         if total < 0: raise ValueError("Total cannot be negative")
-        if self.__status == "Checked-In":
-            status, text = payment.pay_expenses(total, **kwargs)
-            if status == "True":
-                self.__status = "Completed"
-            return text
-        return f"Can not pay❌, Booking status is not Checked-In, Booking status now: {self.__status}"        
+        with self.__lock:
+            if self.__status == "Checked-In":
+                status, text = payment.pay_expenses(total, **kwargs)
+                if status == "True":
+                    self.__set_status("Completed")
+                    if self.__spa is not None:
+                        self.__spa.record_revenue(self, total)
+                return text
+            return f"Can not pay❌, Booking status is not Checked-In, Booking status now: {self.__status}"        
 
     def pay_deposit(self, payment: Payment, deposit: float, **kwargs):
         if not isinstance(payment, Payment): raise TypeError("Must be a Payment object")
         if not isinstance(deposit, (int, float)): raise TypeError("Deposit must be a number")
         if deposit < 0: raise ValueError("Deposit cannot be negative")
-        if self.__status == "Waiting deposit":
-            status, text = payment.pay_deposit(deposit, **kwargs)
-            if status == "True":
-                self.__status = "Confirmed"
-            return text
-        return f"Can not pay❌, Booking status is not Waiting deposit, Booking status now: {self.__status}"
+        with self.__lock:
+            if self.__status == "Waiting deposit":
+                status, text = payment.pay_deposit(deposit, **kwargs)
+                if status == "True":
+                    self.__set_status("Confirmed")
+                return text
+            return f"Can not pay❌, Booking status is not Waiting deposit, Booking status now: {self.__status}"
         
 
     def cancle(self):
-        if self.__status == "Confirmed" or self.__status == "Waiting deposit":
-            for transaction in self.__treatment_list:
-                transaction.cancle()
-            self.__status = "Cancelled"
-            return "Cancel Success✅"
+        with CalendarLock(self.__treatment_list), self.__lock:
+            if self.__status == "Confirmed" or self.__status == "Waiting deposit":
+                for transaction in self.__treatment_list:
+                    transaction.cancle()
+                self.__set_status("Cancelled")
+                if self.__spa is not None:
+                    self.__spa.log_operation("cancel", {"booking_id": self.__id})
+                return "Cancel Success✅"
         return f"Booking status can not cancelled, Booking status now: {self.__status}"
         
 
     def check_in(self):
-        if self.__status != "Confirmed":
-            return f"Can not check in❌, Booking status is not Confirmed, Booking status now: {self.__status}"
-        self.__status = "Checked-In"
-        return "Checked-In Success✅"
+        with self.__lock:
+            if self.__status != "Confirmed":
+                return f"Can not check in❌, Booking status is not Confirmed, Booking status now: {self.__status}"
+            self.__set_status("Checked-In")
+            return "Checked-In Success✅"
+
+REVENUE_DIMENSION = ("treatment", "therapist", "room_type")
+
+class RevenuePerDay:
+    __slots__ = ("__date", "__total", "__booking_count", "__treatment_count", "__addon_count", "__breakdown")
+
+    def __init__(self, date_target: date):
+        if not isinstance(date_target, date): raise TypeError("Must be a date object")
+        self.__date = date_target
+        self.__total = 0
+        self.__booking_count = 0
+        self.__treatment_count = {}
+        self.__addon_count = {}
+        self.__breakdown = {dimension: {} for dimension in REVENUE_DIMENSION}
+
+    @classmethod
+    def trusted(cls, date_target: date, total: float, booking_count: int, treatment_count: dict, addon_count: dict, breakdown: dict):
+        revenue = cls.__new__(cls)
+        revenue.__date = date_target
+        revenue.__total = total
+        revenue.__booking_count = booking_count
+        revenue.__treatment_count = treatment_count
+        revenue.__addon_count = addon_count
+        revenue.__breakdown = {dimension: breakdown.get(dimension, {}) for dimension in REVENUE_DIMENSION}
+        return revenue
+
+    @property
+    def date(self): return self.__date
+    @property
+    def total(self): return self.__total
+    @property
+    def booking_count(self): return self.__booking_count
+    @property
+    def treatment_count(self): return self.__treatment_count
+    @property
+    def addon_count(self): return self.__addon_count
+    @property
+    def breakdown(self): return self.__breakdown
+
+    def __add_cell(self, dimension: str, key: str, revenue: float):
+        cell = self.__breakdown[dimension].get(key)
+        if cell is None:
+            cell = [0.0, 0]
+            self.__breakdown[dimension][key] = cell
+        cell[0] += revenue
+        cell[1] += 1
+
+    def add_booking(self, booking: Booking, total: float):
+        if not isinstance(booking, Booking): raise TypeError("Must be a Booking object")
+        if not isinstance(total, (int, float)): raise TypeError("Total must be a number")
+        self.__booking_count += 1
+        self.__total += total
+        price_sum = sum(transaction.treatment.price for transaction in booking.treatment_list)
+        for transaction in booking.treatment_list:
+            name = transaction.treatment.name
+            self.__treatment_count[name] = self.__treatment_count.get(name, 0) + 1
+            share = total * transaction.treatment.price / price_sum if price_sum else 0.0
+            self.__add_cell("treatment", transaction.treatment.id, share)
+            self.__add_cell("therapist", transaction.therapist.id, share)
+            self.__add_cell("room_type", transaction.room.room_type, share)
+            for addon in transaction.add_on_list:
+                self.__addon_count[addon.name] = self.__addon_count.get(addon.name, 0) + 1
+
+    def to_report(self, treatment_name_list: list = (), addon_name_list: list = ()):
+        treatment_count = dict.fromkeys(treatment_name_list, 0)
+        treatment_count.update(self.__treatment_count)
+        addon_count = dict.fromkeys(addon_name_list, 0)
+        addon_count.update(self.__addon_count)
+        return {
+            "date": self.__date,
+            "total": self.__total,
+            "booking_count": self.__booking_count,
+            "treatment_count": treatment_count,
+            "addon_count": addon_count
+        }
 
 class WellnessRecord:
+    __slots__ = ("__therapist", "__wellness_record")
+
     def __init__(self, therapist: Therapist, record: str):
         self.__therapist = therapist
         self.__wellness_record = record
@@ -915,9 +2098,29 @@ class Therapist(Employee):
         self.__skill = skill
         self.__points = 0
         self.__ratings = []
+        self.__observer_list = []
     @property
     def skill(self):
       return self.__skill
+
+    @skill.setter
+    def skill(self, value: SkillSets):
+        if not isinstance(value, SkillSets): raise TypeError("Skill must be a SkillSets object")
+        self.__skill = value
+        for observer in self.__observer_list:
+            observer.update_skill(self)
+
+    def add_observer(self, observer):
+        if observer not in self.__observer_list:
+            self.__observer_list.append(observer)
+
+    def remove_observer(self, observer):
+        if observer in self.__observer_list:
+            self.__observer_list.remove(observer)
+
+    def is_qualified(self, treatment: Treatment):
+        if not isinstance(treatment, Treatment): raise TypeError("Must be a Treatment object")
+        return treatment.skill is self.__skill
     
     @property
     def ratings(self): 
@@ -953,6 +2156,624 @@ class Resource:
         self.__amount = amount
         self.__status = "Available"
 
+class Repository(ABC):
+    @abstractmethod
+    def sync(self, spa: Spa): pass
+    @abstractmethod
+    def add_customer(self, customer: Customer): pass
+    @abstractmethod
+    def update_customer(self, customer: Customer): pass
+    @abstractmethod
+    def remove_customer(self, customer: Customer): pass
+    @abstractmethod
+    def add_employee(self, employee: Employee): pass
+    @abstractmethod
+    def remove_employee(self, employee: Employee): pass
+    @abstractmethod
+    def add_room(self, room: Room): pass
+    @abstractmethod
+    def remove_room(self, room: Room): pass
+    @abstractmethod
+    def add_booking(self, booking: Booking): pass
+    @abstractmethod
+    def remove_booking(self, booking: Booking): pass
+    @abstractmethod
+    def update_booking_status(self, booking: Booking): pass
+    @abstractmethod
+    def add_notice_list(self, notice_list: list): pass
+    @abstractmethod
+    def remove_notice_list(self, notice_list: list): pass
+    @abstractmethod
+    def add_broadcast(self, message: Message, seq: int): pass
+    @abstractmethod
+    def update_notice(self, customer: Customer, message: Message): pass
+    @abstractmethod
+    def add_wellness_record(self, customer: Customer, index: int): pass
+    @abstractmethod
+    def use_coupon(self, booking: Booking): pass
+    @abstractmethod
+    def update_revenue(self, revenue: RevenuePerDay): pass
+
+    def load(self, spa: Spa): return False
+    def close(self): pass
+
+class InMemoryRepository(Repository):
+    def sync(self, spa: Spa): pass
+    def add_customer(self, customer: Customer): pass
+    def update_customer(self, customer: Customer): pass
+    def remove_customer(self, customer: Customer): pass
+    def add_employee(self, employee: Employee): pass
+    def remove_employee(self, employee: Employee): pass
+    def add_room(self, room: Room): pass
+    def remove_room(self, room: Room): pass
+    def add_booking(self, booking: Booking): pass
+    def remove_booking(self, booking: Booking): pass
+    def update_booking_status(self, booking: Booking): pass
+    def add_notice_list(self, notice_list: list): pass
+    def remove_notice_list(self, notice_list: list): pass
+    def add_broadcast(self, message: Message, seq: int): pass
+    def update_notice(self, customer: Customer, message: Message): pass
+    def add_wellness_record(self, customer: Customer, index: int): pass
+    def use_coupon(self, booking: Booking): pass
+    def update_revenue(self, revenue: RevenuePerDay): pass
+
+CUSTOMER_CLASS = {"bronze": Bronze, "silver": Silver, "gold": Gold, "platinum": Platinum}
+
+SQLITE_TABLE_LIST = ("customer", "employee", "room", "slot", "booking", "treatment_transaction", "notice", "broadcast", "wellness_record",
+                     "id_sequence", "coupon", "booking_coupon", "revenue")
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS customer (id TEXT PRIMARY KEY, name TEXT NOT NULL, member_type TEXT NOT NULL, missed_count INTEGER NOT NULL,
+    broadcast_start INTEGER NOT NULL, broadcast_read TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS employee (id TEXT PRIMARY KEY, name TEXT NOT NULL, role TEXT NOT NULL, skill TEXT);
+CREATE TABLE IF NOT EXISTS room (id TEXT PRIMARY KEY, room_type TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS slot (entity_id TEXT NOT NULL, date TEXT NOT NULL, slot_order INTEGER NOT NULL, vacancy INTEGER NOT NULL,
+    PRIMARY KEY (entity_id, date, slot_order)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS booking (id TEXT PRIMARY KEY, customer_id TEXT NOT NULL, date TEXT NOT NULL, status TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS booking_customer ON booking (customer_id);
+CREATE INDEX IF NOT EXISTS booking_date_status ON booking (date, status);
+CREATE TABLE IF NOT EXISTS treatment_transaction (booking_id TEXT NOT NULL, seq INTEGER NOT NULL, treatment_id TEXT NOT NULL,
+    therapist_id TEXT NOT NULL, room_id TEXT NOT NULL, date TEXT NOT NULL, time_slot TEXT NOT NULL, addon TEXT NOT NULL,
+    PRIMARY KEY (booking_id, seq)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS transaction_therapist ON treatment_transaction (therapist_id, date);
+CREATE INDEX IF NOT EXISTS transaction_room ON treatment_transaction (room_id, date);
+CREATE TABLE IF NOT EXISTS notice (id TEXT PRIMARY KEY, customer_id TEXT NOT NULL, text TEXT NOT NULL, date TEXT NOT NULL, status TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS notice_customer ON notice (customer_id, status);
+CREATE TABLE IF NOT EXISTS broadcast (seq INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE, text TEXT NOT NULL, date TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS wellness_record (customer_id TEXT NOT NULL, seq INTEGER NOT NULL, therapist_id TEXT NOT NULL, record TEXT NOT NULL,
+    PRIMARY KEY (customer_id, seq)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS id_sequence (key TEXT PRIMARY KEY, value INTEGER NOT NULL) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS coupon (customer_id TEXT NOT NULL, seq INTEGER NOT NULL, id TEXT NOT NULL, discount REAL NOT NULL,
+    PRIMARY KEY (customer_id, seq)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS booking_coupon (booking_id TEXT PRIMARY KEY, id TEXT NOT NULL, discount REAL NOT NULL) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS revenue (date TEXT PRIMARY KEY, total REAL NOT NULL, booking_count INTEGER NOT NULL,
+    treatment_count TEXT NOT NULL, addon_count TEXT NOT NULL, breakdown TEXT NOT NULL) WITHOUT ROWID;
+"""
+
+class SQLiteRepository(Repository):
+    def __init__(self, path: str, pool_size: int = 8):
+        if not isinstance(path, str): raise TypeError("Database path must be a string")
+        if not isinstance(pool_size, int) or pool_size < 1: raise ValueError("Pool size must be a positive integer")
+        self.__path = path
+        self.__pool = queue.Queue()
+        for _ in range(pool_size):
+            connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("PRAGMA busy_timeout=5000")
+            if self.__pool.empty():
+                connection.executescript(SQLITE_SCHEMA)
+            self.__pool.put(connection)
+        self.__entity_by_calendar = {}
+        self.__id_allocator = None
+
+    @property
+    def path(self): return self.__path
+
+    @contextmanager
+    def connection(self):
+        connection = self.__pool.get()
+        try:
+            connection.execute("BEGIN")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+        finally:
+            self.__pool.put(connection)
+
+    def __customer_row(self, customer: Customer):
+        return (customer.id, customer.name, type(customer).__name__.lower(), customer.missed_count,
+                customer.broadcast_start, format(customer.broadcast_read, "x"))
+
+    def __employee_row(self, employee: Employee):
+        skill = employee.skill.name if isinstance(employee, Therapist) else None
+        return (employee.id, employee.name, type(employee).__name__, skill)
+
+    def __booking_row(self, booking: Booking):
+        return (booking.id, booking.customer.id, booking.date.isoformat(), booking.status)
+
+    def __transaction_row_list(self, booking: Booking):
+        return [(booking.id, seq, transaction.treatment.id, transaction.therapist.id, transaction.room.id,
+                 transaction.date.isoformat(), ",".join(map(str, transaction.time_slot)),
+                 ",".join(addon.id for addon in transaction.add_on_list))
+                for seq, transaction in enumerate(booking.treatment_list)]
+
+    def __coupon_row_list(self, customer: Customer):
+        return [(customer.id, seq, coupon.id, coupon.discount) for seq, coupon in enumerate(customer.coupon_list)]
+
+    def __revenue_row(self, revenue: RevenuePerDay):
+        return (revenue.date.isoformat(), revenue.total, revenue.booking_count, json.dumps(revenue.treatment_count),
+                json.dumps(revenue.addon_count), json.dumps(revenue.breakdown))
+
+    def __save_coupon_list(self, connection, customer: Customer):
+        connection.execute("DELETE FROM coupon WHERE customer_id = ?", (customer.id,))
+        connection.executemany("INSERT OR REPLACE INTO coupon VALUES (?, ?, ?, ?)", self.__coupon_row_list(customer))
+
+    def __notice_row(self, customer: Customer, message: Message):
+        return (message.id, customer.id, message.text, message.date.isoformat(), message.status)
+
+    def __slot_row(self, entity_id: str, slot: Slot):
+        return (entity_id, slot.date.isoformat(), slot.slot_order, slot.vacancy)
+
+    def __save_sequence(self, connection, key: str):
+        if self.__id_allocator is None: return
+        value = self.__id_allocator.state().get(key)
+        if value is not None:
+            connection.execute("INSERT OR REPLACE INTO id_sequence VALUES (?, ?)", (key, value))
+
+    def __watch(self, entity):
+        self.__entity_by_calendar[entity.calendar] = entity.id
+        entity.calendar.add_observer(self)
+
+    def sync(self, spa: Spa):
+        if not isinstance(spa, Spa): raise TypeError("Must be a Spa object")
+        entity_list = spa.room_list + spa.employee_list
+        with self.connection() as connection:
+            for table in SQLITE_TABLE_LIST:
+                connection.execute(f"DELETE FROM {table}")
+            connection.executemany("INSERT OR REPLACE INTO customer VALUES (?, ?, ?, ?, ?, ?)",
+                                   [self.__customer_row(customer) for customer in spa.customer_list])
+            connection.executemany("INSERT OR REPLACE INTO employee VALUES (?, ?, ?, ?)",
+                                   [self.__employee_row(employee) for employee in spa.employee_list])
+            connection.executemany("INSERT OR REPLACE INTO room VALUES (?, ?)",
+                                   [(room.id, room.room_type) for room in spa.room_list])
+            connection.executemany("INSERT OR REPLACE INTO slot VALUES (?, ?, ?, ?)",
+                                   [self.__slot_row(entity.id, slot) for entity in entity_list for slot in entity.slot])
+            booking_list = [booking for customer in spa.customer_list for booking in customer.booking_list]
+            connection.executemany("INSERT OR REPLACE INTO booking VALUES (?, ?, ?, ?)",
+                                   [self.__booking_row(booking) for booking in booking_list])
+            connection.executemany("INSERT OR REPLACE INTO treatment_transaction VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                   [row for booking in booking_list for row in self.__transaction_row_list(booking)])
+            connection.executemany("INSERT OR REPLACE INTO notice VALUES (?, ?, ?, ?, ?)",
+                                   [self.__notice_row(customer, message) for customer in spa.customer_list
+                                    for message in customer.notice_list])
+            broadcast_box = spa.broadcast_box
+            connection.executemany("INSERT OR REPLACE INTO broadcast VALUES (?, ?, ?, ?)",
+                                   [(seq, message.id, message.text, message.date.isoformat())
+                                    for seq, message in enumerate(broadcast_box.get_message_list(0))])
+            connection.executemany("INSERT OR REPLACE INTO wellness_record VALUES (?, ?, ?, ?)",
+                                   [(customer.id, seq, record.therapist.id, record.wellness_record)
+                                    for customer in spa.customer_list for seq, record in enumerate(customer.wellness_record)])
+            connection.executemany("INSERT OR REPLACE INTO id_sequence VALUES (?, ?)", spa.id_allocator.state().items())
+            connection.executemany("INSERT OR REPLACE INTO coupon VALUES (?, ?, ?, ?)",
+                                   [row for customer in spa.customer_list for row in self.__coupon_row_list(customer)])
+            connection.executemany("INSERT OR REPLACE INTO booking_coupon VALUES (?, ?, ?)",
+                                   [(booking.id, booking.coupon_used_record.id, booking.coupon_used_record.discount)
+                                    for booking in booking_list if booking.coupon_used_record is not None])
+            connection.executemany("INSERT OR REPLACE INTO revenue VALUES (?, ?, ?, ?, ?, ?)",
+                                   [self.__revenue_row(revenue) for revenue in spa.revenue_per_day_list])
+        self.__id_allocator = spa.id_allocator
+        for entity in entity_list:
+            self.__watch(entity)
+
+    def load(self, spa: Spa):
+        if not isinstance(spa, Spa): raise TypeError("Must be a Spa object")
+        with self.connection() as connection:
+            customer_row_list = connection.execute("SELECT * FROM customer ORDER BY id").fetchall()
+            if not customer_row_list: return False
+            slot_row_list = connection.execute("SELECT * FROM slot").fetchall()
+            booking_row_list = connection.execute("SELECT * FROM booking ORDER BY id").fetchall()
+            transaction_row_list = connection.execute("SELECT * FROM treatment_transaction ORDER BY booking_id, seq").fetchall()
+            notice_row_list = connection.execute("SELECT * FROM notice ORDER BY date, id").fetchall()
+            broadcast_row_list = connection.execute("SELECT * FROM broadcast ORDER BY seq").fetchall()
+            wellness_row_list = connection.execute("SELECT * FROM wellness_record ORDER BY customer_id, seq").fetchall()
+            sequence_row_list = connection.execute("SELECT * FROM id_sequence").fetchall()
+            coupon_row_list = connection.execute("SELECT * FROM coupon ORDER BY customer_id, seq").fetchall()
+            booking_coupon_row_list = connection.execute("SELECT * FROM booking_coupon").fetchall()
+            revenue_row_list = connection.execute("SELECT * FROM revenue ORDER BY date").fetchall()
+
+        with bulk_load():
+            for seq, id, text, date_text in broadcast_row_list:
+                if spa.broadcast_box.get_index(id) is None:
+                    spa.add_broadcast(Message(id, None, text, datetime.fromisoformat(date_text)))
+                if spa.broadcast_box.get_index(id) != seq: raise ValueError(f"Broadcast {id} is out of sequence")
+
+            customer_list = []
+            for id, name, member_type, missed_count, broadcast_start, broadcast_read in customer_row_list:
+                customer = CUSTOMER_CLASS[member_type](id, name)
+                customer.missed_count = missed_count
+                customer.attach_broadcast(spa.broadcast_box, broadcast_start, int(broadcast_read, 16))
+                customer_list.append(customer)
+            for customer in list(spa.customer_list):
+                spa.remove_customer(customer.id)
+            spa.load_trusted(customer_list=customer_list)
+            for customer_id, _, id, discount in coupon_row_list:
+                spa.search_customer_by_id(customer_id).add_coupon_list(Coupon(id, discount))
+
+            notice_number_list = []
+            for id, customer_id, text, date_text, status in notice_row_list:
+                customer = spa.search_customer_by_id(customer_id)
+                message = Message(id, customer, text, datetime.fromisoformat(date_text))
+                message.status = status
+                customer.add_notice_list(message)
+            for id in [row[0] for row in notice_row_list] + [row[1] for row in broadcast_row_list]:
+                number = id.rsplit("-", 1)[-1]
+                if number.isdigit(): notice_number_list.append(int(number))
+            if notice_number_list:
+                spa.id_allocator.observe("NOTICE", max(notice_number_list))
+
+            transaction_by_booking = {}
+            for booking_id, _, treatment_id, therapist_id, room_id, date_text, time_slot, addon in transaction_row_list:
+                transaction_by_booking.setdefault(booking_id, []).append(
+                    (treatment_id, therapist_id, room_id, date.fromisoformat(date_text),
+                     [int(order) for order in time_slot.split(",") if order], [id for id in addon.split(",") if id]))
+            active_count = {}
+            for booking_id, _, _, status in booking_row_list:
+                if status == "Cancelled": continue
+                for _, therapist_id, room_id, date_target, time_slot, _ in transaction_by_booking.get(booking_id, []):
+                    for entity_id in (therapist_id, room_id):
+                        for time_order in time_slot:
+                            key = (entity_id, date_target, time_order)
+                            active_count[key] = active_count.get(key, 0) + 1
+
+            vacancy_by_day = {}
+            for entity_id, date_text, slot_order, vacancy in slot_row_list:
+                vacancy_by_day.setdefault((entity_id, date.fromisoformat(date_text)), [None] * SLOT_PER_DAY)[slot_order - 1] = vacancy
+            for (entity_id, date_target), vacancy_list in vacancy_by_day.items():
+                entity = spa.search_room_by_id(entity_id) or spa.search_employee_by_id(entity_id)
+                if entity is None: continue
+                default = entity.calendar.get_default_vacancy(date_target) or 0
+                entity.calendar.load_day(date_target, [default if vacancy is None else vacancy + active_count.get((entity_id, date_target, n), 0)
+                                                       for n, vacancy in enumerate(vacancy_list, 1)])
+
+            for booking_id, customer_id, date_text, status in booking_row_list:
+                customer = spa.search_customer_by_id(customer_id)
+                transaction_list = []
+                for treatment_id, therapist_id, room_id, date_target, time_slot, addon_list in transaction_by_booking.get(booking_id, []):
+                    treatment = spa.search_treatment_by_id(treatment_id)
+                    therapist = spa.search_employee_by_id(therapist_id)
+                    room = spa.search_room_by_id(room_id)
+                    add_on_list = [spa.search_add_on_by_id(id) for id in addon_list]
+                    if customer is None or None in (treatment, therapist, room) or None in add_on_list:
+                        raise ValueError(f"Booking {booking_id} references an unknown customer, treatment, employee, room or add-on")
+                    transaction_list.append(TreatmentTransaction.trusted(customer, treatment, date_target, room, time_slot,
+                                                                         therapist, add_on_list))
+                if status != "Cancelled":
+                    spa.reserve_treatment_transaction(transaction_list)
+                booking = Booking(booking_id, customer, date.fromisoformat(date_text), transaction_list, spa)
+                spa.add_booking(booking)
+                customer.book(booking)
+                if booking.status != status:
+                    booking.status = status
+
+            for customer_id, _, therapist_id, record in wellness_row_list:
+                spa.search_customer_by_id(customer_id).add_wellness_record(WellnessRecord(spa.search_employee_by_id(therapist_id), record))
+            for booking_id, id, discount in booking_coupon_row_list:
+                spa.search_booking_by_id(booking_id).coupon_used_record = Coupon(id, discount)
+            spa.load_revenue([RevenuePerDay.trusted(date.fromisoformat(date_text), total, booking_count, json.loads(treatment_count),
+                                                    json.loads(addon_count), json.loads(breakdown))
+                              for date_text, total, booking_count, treatment_count, addon_count, breakdown in revenue_row_list])
+            spa.id_allocator.load_state(dict(sequence_row_list))
+        return True
+
+    def update_slot(self, calendar: SlotCalendar, slot: Slot):
+        entity_id = self.__entity_by_calendar.get(calendar)
+        if entity_id is None: return
+        with self.connection() as connection:
+            connection.execute("INSERT OR REPLACE INTO slot VALUES (?, ?, ?, ?)", self.__slot_row(entity_id, slot))
+
+    def add_customer(self, customer: Customer):
+        with self.connection() as connection:
+            connection.execute("INSERT OR REPLACE INTO customer VALUES (?, ?, ?, ?, ?, ?)", self.__customer_row(customer))
+            self.__save_coupon_list(connection, customer)
+            self.__save_sequence(connection, "C")
+
+    def update_customer(self, customer: Customer):
+        self.add_customer(customer)
+
+    def remove_customer(self, customer: Customer):
+        with self.connection() as connection:
+            connection.execute("DELETE FROM customer WHERE id = ?", (customer.id,))
+            connection.execute("DELETE FROM coupon WHERE customer_id = ?", (customer.id,))
+
+    def add_employee(self, employee: Employee):
+        with self.connection() as connection:
+            connection.execute("INSERT OR REPLACE INTO employee VALUES (?, ?, ?, ?)", self.__employee_row(employee))
+        self.__watch(employee)
+
+    def remove_employee(self, employee: Employee):
+        employee.calendar.remove_observer(self)
+        self.__entity_by_calendar.pop(employee.calendar, None)
+        with self.connection() as connection:
+            connection.execute("DELETE FROM employee WHERE id = ?", (employee.id,))
+
+    def add_room(self, room: Room):
+        with self.connection() as connection:
+            connection.execute("INSERT OR REPLACE INTO room VALUES (?, ?)", (room.id, room.room_type))
+        self.__watch(room)
+
+    def remove_room(self, room: Room):
+        room.calendar.remove_observer(self)
+        self.__entity_by_calendar.pop(room.calendar, None)
+        with self.connection() as connection:
+            connection.execute("DELETE FROM room WHERE id = ?", (room.id,))
+
+    def add_booking(self, booking: Booking):
+        with self.connection() as connection:
+            connection.execute("INSERT OR REPLACE INTO booking VALUES (?, ?, ?, ?)", self.__booking_row(booking))
+            connection.executemany("INSERT OR REPLACE INTO treatment_transaction VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                   self.__transaction_row_list(booking))
+            self.__save_sequence(connection, booking.id.rpartition("-")[0])
+
+    def remove_booking(self, booking: Booking):
+        with self.connection() as connection:
+            connection.execute("DELETE FROM treatment_transaction WHERE booking_id = ?", (booking.id,))
+            connection.execute("DELETE FROM booking WHERE id = ?", (booking.id,))
+            connection.execute("DELETE FROM booking_coupon WHERE booking_id = ?", (booking.id,))
+
+    def update_booking_status(self, booking: Booking):
+        with self.connection() as connection:
+            connection.execute("UPDATE booking SET status = ? WHERE id = ?", (booking.status, booking.id))
+
+    def add_notice_list(self, notice_list: list):
+        with self.connection() as connection:
+            connection.executemany("INSERT OR REPLACE INTO notice VALUES (?, ?, ?, ?, ?)",
+                                   [self.__notice_row(customer, message) for customer, message in notice_list])
+            self.__save_sequence(connection, "NOTICE")
+
+    def remove_notice_list(self, notice_list: list):
+        with self.connection() as connection:
+            connection.executemany("DELETE FROM notice WHERE id = ?", [(message.id,) for message in notice_list])
+
+    def add_broadcast(self, message: Message, seq: int):
+        with self.connection() as connection:
+            connection.execute("INSERT OR REPLACE INTO broadcast VALUES (?, ?, ?, ?)",
+                               (seq, message.id, message.text, message.date.isoformat()))
+            self.__save_sequence(connection, "NOTICE")
+
+    def update_notice(self, customer: Customer, message: Message):
+        with self.connection() as connection:
+            connection.execute("UPDATE notice SET status = ? WHERE id = ?", (message.status, message.id))
+            connection.execute("UPDATE customer SET broadcast_read = ? WHERE id = ?",
+                               (format(customer.broadcast_read, "x"), customer.id))
+
+    def add_wellness_record(self, customer: Customer, index: int):
+        record = customer.wellness_record[index]
+        with self.connection() as connection:
+            connection.execute("INSERT OR REPLACE INTO wellness_record VALUES (?, ?, ?, ?)",
+                               (customer.id, index, record.therapist.id, record.wellness_record))
+
+    def use_coupon(self, booking: Booking):
+        coupon = booking.coupon_used_record
+        with self.connection() as connection:
+            connection.execute("INSERT OR REPLACE INTO booking_coupon VALUES (?, ?, ?)", (booking.id, coupon.id, coupon.discount))
+            self.__save_coupon_list(connection, booking.customer)
+
+    def update_revenue(self, revenue: RevenuePerDay):
+        with self.connection() as connection:
+            connection.execute("INSERT OR REPLACE INTO revenue VALUES (?, ?, ?, ?, ?, ?)", self.__revenue_row(revenue))
+
+    def close(self):
+        for calendar in self.__entity_by_calendar:
+            calendar.remove_observer(self)
+        self.__entity_by_calendar = {}
+        self.__id_allocator = None
+        while not self.__pool.empty():
+            self.__pool.get().close()
+
+@contextmanager
+def bulk_load():
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+WAL_SEGMENT_BYTES = 64 * 1024 * 1024
+SNAPSHOT_KEEP = 2
+
+class CheckpointGate:
+    def __init__(self):
+        self.__condition = threading.Condition()
+        self.__active = 0
+        self.__exclusive = False
+        self.__waiting = 0
+        self.__local = threading.local()
+
+    @contextmanager
+    def shared(self):
+        depth = getattr(self.__local, "depth", 0)
+        if depth:
+            self.__local.depth = depth + 1
+            try:
+                yield
+            finally:
+                self.__local.depth = depth
+            return
+        with self.__condition:
+            while self.__exclusive or self.__waiting:
+                self.__condition.wait()
+            self.__active += 1
+        self.__local.depth = 1
+        try:
+            yield
+        finally:
+            self.__local.depth = 0
+            with self.__condition:
+                self.__active -= 1
+                if self.__active == 0:
+                    self.__condition.notify_all()
+
+    @contextmanager
+    def exclusive(self):
+        with self.__condition:
+            self.__waiting += 1
+            while self.__exclusive or self.__active:
+                self.__condition.wait()
+            self.__waiting -= 1
+            self.__exclusive = True
+        try:
+            yield
+        finally:
+            with self.__condition:
+                self.__exclusive = False
+                self.__condition.notify_all()
+
+class OperationLog:
+    def __init__(self, directory: str, next_lsn: int = 1, segment_bytes: int = WAL_SEGMENT_BYTES):
+        if not isinstance(directory, str): raise TypeError("Directory must be a string")
+        if not isinstance(next_lsn, int) or next_lsn < 1: raise ValueError("LSN must be a positive integer")
+        os.makedirs(directory, exist_ok=True)
+        self.__directory = directory
+        self.__segment_bytes = segment_bytes
+        self.__gate = CheckpointGate()
+        self.__condition = threading.Condition()
+        self.__pending = []
+        self.__next_lsn = next_lsn
+        self.__durable_lsn = next_lsn - 1
+        self.__snapshot_lsn = next_lsn - 1
+        self.__rotate = False
+        self.__closed = False
+        self.__stop = threading.Event()
+        self.__file = self.__open_segment(next_lsn)
+        self.__writer = threading.Thread(target=self.__write_loop, name="spa-wal-writer", daemon=True)
+        self.__writer.start()
+        self.__checkpointer = None
+
+    @property
+    def directory(self): return self.__directory
+    @property
+    def gate(self): return self.__gate
+    @property
+    def last_lsn(self): return self.__next_lsn - 1
+    @property
+    def durable_lsn(self): return self.__durable_lsn
+
+    def __open_segment(self, first_lsn: int):
+        return open(os.path.join(self.__directory, f"wal-{first_lsn:012d}.log"), "ab")
+
+    def append(self, op: str, payload: dict):
+        if not isinstance(op, str): raise TypeError("Operation must be a string")
+        if not isinstance(payload, dict): raise TypeError("Payload must be a dict")
+        with self.__condition:
+            if self.__closed: raise RuntimeError("Operation log is closed")
+            lsn = self.__next_lsn
+            self.__next_lsn += 1
+            self.__pending.append(json.dumps({"lsn": lsn, "op": op, "data": payload}, ensure_ascii=False) + "\n")
+            self.__condition.notify_all()
+        return lsn
+
+    def sync(self, lsn: int = None):
+        with self.__condition:
+            target = self.__next_lsn - 1 if lsn is None else lsn
+            while self.__durable_lsn < target and not self.__closed:
+                self.__condition.wait()
+
+    def __write_loop(self):
+        while True:
+            with self.__condition:
+                while not self.__pending and not self.__rotate and not self.__closed:
+                    self.__condition.wait()
+                batch = self.__pending
+                self.__pending = []
+                last_lsn = self.__next_lsn - 1
+                rotate = self.__rotate
+                self.__rotate = False
+                closed = self.__closed
+            if batch:
+                self.__file.write("".join(batch).encode("utf-8"))
+                self.__file.flush()
+                os.fsync(self.__file.fileno())
+            if rotate or self.__file.tell() >= self.__segment_bytes:
+                self.__file.close()
+                self.__file = self.__open_segment(last_lsn + 1)
+            with self.__condition:
+                self.__durable_lsn = last_lsn
+                self.__condition.notify_all()
+            if closed and not batch:
+                self.__file.close()
+                return
+
+    def checkpoint(self, spa: Spa):
+        if not isinstance(spa, Spa): raise TypeError("Must be a Spa object")
+        with self.__gate.exclusive():
+            lsn = self.__next_lsn - 1
+            data = pickle.dumps(spa, protocol=pickle.HIGHEST_PROTOCOL)
+            with self.__condition:
+                self.__rotate = True
+                self.__condition.notify_all()
+        path = os.path.join(self.__directory, f"snapshot-{lsn:012d}.pkl")
+        with open(path + ".tmp", "wb") as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(path + ".tmp", path)
+        self.__snapshot_lsn = lsn
+        self.__compact()
+        return lsn
+
+    def __compact(self):
+        snapshot_list = list_snapshot(self.__directory)
+        for _, path in snapshot_list[SNAPSHOT_KEEP:]:
+            os.remove(path)
+        oldest_lsn = snapshot_list[:SNAPSHOT_KEEP][-1][0]
+        segment_list = list_segment(self.__directory)
+        for (_, path), (next_first_lsn, _) in zip(segment_list, segment_list[1:]):
+            if next_first_lsn <= oldest_lsn + 1:
+                os.remove(path)
+
+    def start_checkpoint(self, spa: Spa, interval: float):
+        if not isinstance(interval, (int, float)) or interval <= 0: raise ValueError("Interval must be positive")
+        def run():
+            while not self.__stop.wait(interval):
+                try:
+                    if self.last_lsn > self.__snapshot_lsn:
+                        self.checkpoint(spa)
+                except Exception:
+                    logger.exception("Checkpoint failed")
+        self.__checkpointer = threading.Thread(target=run, name="spa-checkpoint", daemon=True)
+        self.__checkpointer.start()
+
+    def close(self):
+        self.__stop.set()
+        if self.__checkpointer is not None:
+            self.__checkpointer.join()
+        with self.__condition:
+            self.__closed = True
+            self.__condition.notify_all()
+        self.__writer.join()
+
+def list_snapshot(directory: str):
+    result = []
+    for name in os.listdir(directory):
+        match = re.fullmatch(r"snapshot-(\d+)\.pkl", name)
+        if match:
+            result.append((int(match.group(1)), os.path.join(directory, name)))
+    return sorted(result, reverse=True)
+
+def list_segment(directory: str):
+    result = []
+    for name in os.listdir(directory):
+        match = re.fullmatch(r"wal-(\d+)\.log", name)
+        if match:
+            result.append((int(match.group(1)), os.path.join(directory, name)))
+    return sorted(result)
+
 # ==========================================
 # 2. SYSTEM INITIALIZATION
 # ==========================================
@@ -962,12 +2783,12 @@ def init_system():
   spa = Spa(name="LADKRABANG SPA")
 
   # Service //
-  massage1 = Treatment(id="TM-01", name='Traditional Thai Massage', price=600, duration=60, room_type='DRY')
-  massage2 = Treatment(id="TM-02", name='Traditional Thai Massage', price=850, duration=90, room_type='DRY')
-  massage3 = Treatment(id="TM-03", name='Traditional Thai Massage', price=1100, duration=120, room_type='DRY')
-  massage4 = Treatment(id="DT-03", name='Deep Tissue Massage', price=1200, duration=60, room_type='DRY')
-  aroma = Treatment(id="AT-02", name='Aroma Therapy', price=1500, duration=90, room_type='DRY')
-  pool = Treatment(id="HP-04", name='Hydrotherapy Pool', price=800, duration=60, room_type='WET')
+  massage1 = Treatment(id="TM-01", name='Traditional Thai Massage', price=600, duration=60, room_type='DRY', skill=SkillSets.TM)
+  massage2 = Treatment(id="TM-02", name='Traditional Thai Massage', price=850, duration=90, room_type='DRY', skill=SkillSets.TM)
+  massage3 = Treatment(id="TM-03", name='Traditional Thai Massage', price=1100, duration=120, room_type='DRY', skill=SkillSets.TM)
+  massage4 = Treatment(id="DT-03", name='Deep Tissue Massage', price=1200, duration=60, room_type='DRY', skill=SkillSets.DT)
+  aroma = Treatment(id="AT-02", name='Aroma Therapy', price=1500, duration=90, room_type='DRY', skill=SkillSets.AT)
+  pool = Treatment(id="HP-04", name='Hydrotherapy Pool', price=800, duration=60, room_type='WET', skill=SkillSets.HP)
 
   # Customer //
   c1 = Silver(id="C0001", name="Batman")
@@ -1114,12 +2935,360 @@ def init_system():
    
   return spa
 
-spa = init_system()
+def replay_operation(spa: Spa, op: str, data: dict):
+    if op == "enroll":
+        customer_class = CUSTOMER_CLASS[data["member_type"]]
+        customer = customer_class(data["customer_id"], data["name"])
+        spa.add_customer(customer)
+        spa.add_notice_list([(customer, Message(data["notice_id"], customer, "Enroll success", datetime.fromisoformat(data["at"])))])
+        spa.id_allocator.observe("NOTICE", int(data["notice_id"].rsplit("-", 1)[1]))
+    elif op == "booking":
+        customer = spa.search_customer_by_id(data["customer_id"])
+        d = date.fromisoformat(data["date"])
+        transaction_list = []
+        for treat in data["treatments"]:
+            addon_list = [spa.search_add_on_by_id(id) for id in treat["addon"]]
+            transaction_list.append(TreatmentTransaction.trusted(customer, spa.search_treatment_by_id(treat["treatment_id"]), d,
+                                                                 spa.search_room_by_id(treat["room_id"]), treat["time_slot"],
+                                                                 spa.search_employee_by_id(treat["therapist_id"]), addon_list))
+        spa.create_booking(customer, d, transaction_list, data["booking_id"])
+    elif op == "rollback_booking":
+        booking = spa.search_booking_by_id(data["booking_id"])
+        spa.remove_booking(booking)
+        spa.release_treatment_transaction(booking.treatment_list)
+    elif op == "cancel":
+        spa.search_booking_by_id(data["booking_id"]).cancle()
+    elif op == "check_in":
+        spa.search_booking_by_id(data["booking_id"]).check_in()
+    elif op == "deposit" or op == "expenses":
+        booking = spa.search_booking_by_id(data["booking_id"])
+        if data["payment_type"].lower() == "cash":
+            payment, kwargs = Cash(), {"money": data["payment_value"]}
+        else:
+            payment, kwargs = Card(), {"number": str(data["payment_value"])}
+        if op == "deposit":
+            booking.pay_deposit(payment, 1000, **kwargs)
+        else:
+            booking.pay_expenses(payment, booking.calculate_total(data["coupon_id"]), **kwargs)
+    elif op == "wellness":
+        therapist = spa.search_employee_by_id(data["therapist_id"])
+        therapist.create_wellness_record(text_record=data["text_record"], customer=spa.search_customer_by_id(data["customer_id"]))
+    elif op == "read_notice":
+        spa.search_customer_by_id(data["customer_id"]).read_notice(data["notice_id"])
+    elif op == "update_info":
+        spa.search_customer_by_id(data["customer_id"]).change_personal_info(data["new_name"])
+    elif op == "promotion":
+        spa.add_broadcast(Message(data["notice_id"], None, data["text"], datetime.fromisoformat(data["at"])))
+        spa.id_allocator.observe("NOTICE", int(data["notice_id"].rsplit("-", 1)[1]))
+    elif op == "rating":
+        spa.search_customer_by_id(data["customer_id"]).rating_employee(spa.search_employee_by_id(data["employee_id"]), data["score"])
+    else:
+        raise ValueError(f"Unknown operation {op}")
+
+def recover_system(directory: str, checkpoint_interval: float = 300):
+    os.makedirs(directory, exist_ok=True)
+    spa = None
+    lsn = 0
+    with bulk_load():
+        for snapshot_lsn, path in list_snapshot(directory):
+            try:
+                with open(path, "rb") as file:
+                    spa = pickle.load(file)
+                lsn = snapshot_lsn
+                break
+            except (OSError, EOFError, pickle.UnpicklingError):
+                continue
+        fresh = spa is None
+        if fresh:
+            spa = load_seed()
+
+        for _, path in list_segment(directory):
+            with open(path, "rb") as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    if record["lsn"] <= lsn: continue
+                    replay_operation(spa, record["op"], record["data"])
+                    lsn = record["lsn"]
+
+    journal = OperationLog(directory, lsn + 1)
+    spa.attach_journal(journal)
+    if fresh or journal.last_lsn > list_snapshot(directory)[0][0]:
+        journal.checkpoint(spa)
+    journal.start_checkpoint(spa, checkpoint_interval)
+    return spa
+
+SPA_CACHE_DIR = os.environ.get("SPA_CACHE_DIR") or os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "spa")
+SEED_SNAPSHOT = os.path.join(SPA_CACHE_DIR, "seed.pkl")
+
+def load_seed():
+    try:
+        if os.path.getmtime(SEED_SNAPSHOT) >= os.path.getmtime(__file__):
+            with open(SEED_SNAPSHOT, "rb") as file:
+                return pickle.load(file)
+    except (OSError, EOFError, AttributeError, pickle.UnpicklingError):
+        pass
+    spa = init_system()
+    try:
+        os.makedirs(SPA_CACHE_DIR, exist_ok=True)
+        temp_path = f"{SEED_SNAPSHOT}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as file:
+            pickle.dump(spa, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, SEED_SNAPSHOT)
+    except OSError:
+        pass
+    return spa
+
+class NoticeRetention:
+    def __init__(self, spa: Spa, retention: timedelta, interval: float):
+        if not isinstance(retention, timedelta): raise TypeError("Retention must be a timedelta object")
+        if not isinstance(interval, (int, float)) or interval <= 0: raise ValueError("Interval must be positive")
+        self.__spa = spa
+        self.__retention = retention
+        self.__interval = interval
+        self.__stop = threading.Event()
+        self.__worker = None
+
+    def start(self):
+        def run():
+            while not self.__stop.wait(self.__interval):
+                try:
+                    self.__spa.compact_notice(self.__retention)
+                except Exception:
+                    logger.exception("Notice compaction failed")
+        self.__worker = threading.Thread(target=run, name="spa-notice-retention", daemon=True)
+        self.__worker.start()
+
+    def close(self):
+        self.__stop.set()
+        if self.__worker is not None:
+            self.__worker.join()
+
+SPA_DATA_DIR = os.environ.get("SPA_DATA_DIR")
+SPA_DATABASE = os.environ.get("SPA_DATABASE")
+SPA_NOTICE_RETENTION_DAYS = float(os.environ.get("SPA_NOTICE_RETENTION_DAYS", 90))
+
+spa = None
+notice_retention = None
+blocking_executor = None
+
+def start_system():
+    global spa, notice_retention, blocking_executor
+    if spa is not None: return spa
+    if SPA_DATA_DIR:
+        system = recover_system(SPA_DATA_DIR, float(os.environ.get("SPA_CHECKPOINT_INTERVAL", 300)))
+    else:
+        system = load_seed()
+    if SPA_DATABASE:
+        repository = SQLiteRepository(SPA_DATABASE)
+        if not SPA_DATA_DIR:
+            repository.load(system)
+        system.attach_repository(repository)
+    notice_retention = NoticeRetention(system, timedelta(days=SPA_NOTICE_RETENTION_DAYS),
+                                       float(os.environ.get("SPA_NOTICE_COMPACT_INTERVAL", 3600)))
+    notice_retention.start()
+    blocking_executor = ThreadPoolExecutor(int(os.environ.get("SPA_BLOCKING_WORKERS", 16)), thread_name_prefix="spa-blocking")
+    spa = system
+    return spa
+
+def stop_system():
+    global spa, notice_retention, blocking_executor
+    if spa is None: return
+    notice_retention.close()
+    notice_retention = None
+    blocking_executor.shutdown()
+    blocking_executor = None
+    if spa.journal is not None:
+        spa.journal.close()
+    spa.repository.close()
+    spa = None
 
 # ==========================================
 # 3. API ROUTES & PYDANTIC VALIDATION (OUTER LAYER)
 # ==========================================
 
+class EncodedList(list):
+    def __init__(self, item_list: list):
+        super().__init__(item_list)
+        self.body = to_json(item_list)
+
+def encode_response(result):
+    if isinstance(result, EncodedList):
+        return Response(content=result.body, media_type="application/json")
+    return result
+
+class CatalogCache:
+    def __init__(self):
+        self.__version = None
+        self.__response = {}
+        self.__lock = threading.Lock()
+
+    def get(self, key, build):
+        version = (id(spa), spa.catalog_version)
+        response = self.__response
+        if self.__version != version:
+            with self.__lock:
+                if self.__version != version:
+                    self.__response = response = {}
+                    self.__version = version
+                else:
+                    response = self.__response
+        result = response.get(key)
+        if result is None:
+            result = EncodedList(build())
+            response[key] = result
+        return result
+
+catalog_cache = CatalogCache()
+
+class SlotQueryCache:
+    def __init__(self, max_size: int, ttl: float):
+        if not isinstance(max_size, int) or max_size <= 0: raise ValueError("Cache size must be a positive integer")
+        if not isinstance(ttl, (int, float)) or ttl <= 0: raise ValueError("TTL must be positive")
+        self.__max_size = max_size
+        self.__ttl = ttl
+        self.__lock = threading.Lock()
+        self.__spa = None
+        self.__entry = OrderedDict()
+        self.__dependency = {}
+        self.__flight = {}
+        self.__changed = {}
+        self.__epoch = 0
+        self.__calendar_set = set()
+        self.__metric = dict.fromkeys(("hit", "miss", "coalesced", "invalidated", "expired", "evicted"), 0)
+        self.__saved_seconds = 0.0
+
+    def __reset(self):
+        for calendar in self.__calendar_set:
+            calendar.remove_observer(self)
+        self.__calendar_set = set()
+        self.__entry.clear()
+        self.__dependency.clear()
+        self.__changed.clear()
+        self.__spa = spa
+
+    def __drop(self, key):
+        _, _, _, _, dependency_list = self.__entry.pop(key)
+        for dependency in dependency_list:
+            key_set = self.__dependency.get(dependency)
+            if key_set is not None:
+                key_set.discard(key)
+                if not key_set: del self.__dependency[dependency]
+
+    def __lookup(self, key, get_calendar_list):
+        with self.__lock:
+            if self.__spa is not spa: self.__reset()
+            version = spa.catalog_version
+            entry = self.__entry.get(key)
+            if entry is not None:
+                expire_at, entry_version, result, cost, _ = entry
+                if expire_at > monotonic() and entry_version == version:
+                    self.__entry.move_to_end(key)
+                    self.__metric["hit"] += 1
+                    self.__saved_seconds += cost
+                    return "hit", result
+                self.__drop(key)
+                self.__metric["expired"] += 1
+            flight = self.__flight.get(key)
+            if flight is not None:
+                self.__metric["coalesced"] += 1
+                return "wait", flight
+            flight = Future()
+            flight.set_running_or_notify_cancel()
+            self.__flight[key] = flight
+            self.__metric["miss"] += 1
+            calendar_list = get_calendar_list()
+            for calendar in calendar_list:
+                if calendar not in self.__calendar_set:
+                    calendar.add_observer(self)
+                    self.__calendar_set.add(calendar)
+            return "lead", (flight, version, self.__epoch, calendar_list)
+
+    def __lead(self, key, date_target: date, compute, lead: tuple):
+        flight, version, start_epoch, calendar_list = lead
+        try:
+            started = monotonic()
+            result = compute()
+            cost = monotonic() - started
+        except BaseException as error:
+            with self.__lock:
+                del self.__flight[key]
+            flight.set_exception(error)
+            raise
+
+        with self.__lock:
+            del self.__flight[key]
+            dependency_list = [(calendar, date_target) for calendar in calendar_list]
+            if self.__spa is spa and all(self.__changed.get(dependency, 0) <= start_epoch for dependency in dependency_list):
+                self.__entry[key] = (monotonic() + self.__ttl, version, result, cost, dependency_list)
+                for dependency in dependency_list:
+                    self.__dependency.setdefault(dependency, set()).add(key)
+                while len(self.__entry) > self.__max_size:
+                    self.__drop(next(iter(self.__entry)))
+                    self.__metric["evicted"] += 1
+            if not self.__flight:
+                self.__changed.clear()
+        flight.set_result(result)
+        return result
+
+    def get(self, key, date_target: date, compute, get_calendar_list):
+        state, value = self.__lookup(key, get_calendar_list)
+        if state == "hit": return value
+        if state == "wait": return value.result()
+        return self.__lead(key, date_target, compute, value)
+
+    async def get_async(self, key, date_target: date, compute, get_calendar_list, executor):
+        state, value = self.__lookup(key, get_calendar_list)
+        if state == "hit": return value
+        if state == "wait": return await asyncio.wrap_future(value)
+        return await asyncio.get_running_loop().run_in_executor(executor, self.__lead, key, date_target, compute, value)
+
+    def update_slot(self, calendar: SlotCalendar, slot: Slot):
+        dependency = (calendar, slot.date)
+        with self.__lock:
+            self.__epoch += 1
+            if self.__flight:
+                self.__changed[dependency] = self.__epoch
+            for key in self.__dependency.pop(dependency, ()):
+                if key in self.__entry:
+                    self.__drop(key)
+                    self.__metric["invalidated"] += 1
+
+    def metrics(self):
+        with self.__lock:
+            lookup = self.__metric["hit"] + self.__metric["miss"] + self.__metric["coalesced"]
+            return dict(self.__metric, size=len(self.__entry), max_size=self.__max_size, ttl=self.__ttl,
+                        hit_rate=(self.__metric["hit"] + self.__metric["coalesced"]) / lookup if lookup else 0.0,
+                        saved_seconds=self.__saved_seconds)
+
+slot_cache = SlotQueryCache(int(os.environ.get("SPA_SLOT_CACHE_SIZE", 4096)),
+                            float(os.environ.get("SPA_SLOT_CACHE_TTL", 5)))
+
+def route(method: str, path: str, persistent: bool = False, blocking: bool = False, coroutine=None, **kwargs):
+    register = getattr(app, method)(path, **kwargs)
+    def decorator(handler):
+        if not SPA_ASYNC_ROUTES:
+            @functools.wraps(handler)
+            def endpoint(*args, **kwargs):
+                return encode_response(handler(*args, **kwargs))
+        elif coroutine is not None:
+            @functools.wraps(handler)
+            async def endpoint(*args, **kwargs):
+                return encode_response(await coroutine(*args, **kwargs))
+        else:
+            @functools.wraps(handler)
+            async def endpoint(*args, **kwargs):
+                if blocking or (persistent and spa.persistent):
+                    call = functools.partial(handler, *args, **kwargs)
+                    return encode_response(await asyncio.get_running_loop().run_in_executor(blocking_executor, call))
+                return encode_response(handler(*args, **kwargs))
+        register(endpoint)
+        return handler
+    return decorator
+
 time_dict = {
   1: "8:00-8:30", 2: "8:30-9:00", 3: "9:00-9:30", 4: "9:30-10:00",
   5: "10:00-10:30", 6: "10:30-11:00", 7: "11:00-11:30", 8: "11:30-12:00",
@@ -1127,18 +3296,15 @@ time_dict = {
   13: "14:00-14:30", 14: "14:30-15:00", 15: "15:00-15:30", 16: "15:30-16:00",
 }
 
-treatment_dict = {
-  "Traditional Thai Massage" : ["TM-01", "TM-02", "TM-03"],
-  "Aroma Therapy" : ["AT-02"],
-  "Deep Tissue Massage" : ["DT-03"],
-  "Hydrotherapy Pool" : ["HP-04"],
-}
-
 def make_time_index_to_str(slot_list):
     time_start = time_dict[slot_list[0]].split("-")[0]
     time_end = time_dict[slot_list[-1]].split("-")[-1]
     return (time_start, time_end)
 
+def make_window_str(start: int, slot_count: int):
+    time_start, time_end = make_time_index_to_str([start, start + slot_count - 1])
+    return f"{time_start}-{time_end}"
+
 def change_str_to_index_list(str_time):
     result = []
     found_start_time = False
@@ -1183,13 +3349,18 @@ class ResponseEnrollCustomer(BaseModel):
     name="enroll_customer",
     description="Enroll a customer with name and member type (bronze, silver, gold, platinum)."
 )
-@app.post("/enrollCustomer", response_model=ResponseEnrollCustomer)
+@route("post", "/enrollCustomer", persistent=True, response_model=ResponseEnrollCustomer)
 def enroll_customer(req: RequestEnrollCustomer):
 
     try:
         officer = spa.search_employee_by_id("WEB0001")
-        
-        customer = officer.enroll_new_customer(req.customer_name, req.member_type)
+
+        with spa.operation():
+            customer = officer.enroll_new_customer(req.customer_name, req.member_type)
+            notice = customer.notice_list[-1]
+            spa.log_operation("enroll", {"customer_id": customer.id, "name": customer.name,
+                                         "member_type": req.member_type.strip().lower(),
+                                         "notice_id": notice.id, "at": notice.date.isoformat()})
 
         return ResponseEnrollCustomer(
             status="SUCCESS",
@@ -1209,6 +3380,9 @@ def enroll_customer(req: RequestEnrollCustomer):
 
 class RequestCheckNotice(BaseModel):
     customer_id: str
+    before: datetime | None = None
+    before_id: str | None = None
+    limit: int = Field(20, ge=1, le=100)
 
 class ResponseNotice(BaseModel):
     notice_id: str
@@ -1216,7 +3390,7 @@ class ResponseNotice(BaseModel):
     message: str
     status: str
 
-@app.post("/getCustomerNameById", response_model=str)
+@route("post", "/getCustomerNameById", response_model=str)
 @mcp.tool(
     name="getCustomerNameById",
     description=
@@ -1229,11 +3403,12 @@ class ResponseNotice(BaseModel):
 )
 def get_customer_name_from_id(customer_id: str):
     customer = spa.search_customer_by_id(customer_id)
+    if not customer: raise HTTPException(status_code=404, detail="Customer not found")
     return customer.name
 
 
 
-@app.post("/getCustomerIdByName", response_model=str)
+@route("post", "/getCustomerIdByName", response_model=str)
 @mcp.tool(
     name="getCustomerIdByName",
     description="""
@@ -1245,6 +3420,7 @@ def get_customer_name_from_id(customer_id: str):
 )
 def get_customer_id_from_name(customer_name: str):
     customer = spa.search_customer_by_name(customer_name)
+    if not customer: raise HTTPException(status_code=404, detail="Customer not found")
     return customer.id
 
 
@@ -1253,18 +3429,24 @@ def get_customer_id_from_name(customer_name: str):
     name="checkNotice",
     description=
     """
-    Check message
+    Check unread messages, newest first.
 
     Parameters:
     - customer_id: The unique ID of the customer.
+    - before, before_id: Optional cursor. Only messages that sort before this (date, notice_id)
+      pair are returned; pass the date and notice_id of the last message of the previous page
+      to get the next page. With only before, messages older than that date are returned.
+    - limit: Maximum number of messages to return (1-100, default 20).
     """
 )
-@app.post("/checkNotice", response_model=list[ResponseNotice])
+@route("post", "/checkNotice", response_model=list[ResponseNotice])
 def check_notice(req: RequestCheckNotice):
     customer = spa.search_customer_by_id(req.customer_id)
     if not customer: raise HTTPException(status_code=404, detail="Customer not found")
 
-    unread_notice = customer.check_notice()
+    if req.before_id is not None and req.before is None:
+        raise HTTPException(status_code=400, detail="before_id requires before")
+    unread_notice = customer.check_notice(req.before, req.limit, req.before_id)
 
     notice_list = []
     for notice in unread_notice:
@@ -1277,11 +3459,27 @@ def check_notice(req: RequestCheckNotice):
         notice_list.append(temp)
     return notice_list
 
+@mcp.tool(
+    name="countUnreadNotice",
+    description=
+    """
+    Count unread messages
+
+    Parameters:
+    - customer_id: The unique ID of the customer.
+    """
+)
+@route("post", "/countUnreadNotice", response_model=int)
+def count_unread_notice(req: RequestCheckNotice):
+    customer = spa.search_customer_by_id(req.customer_id)
+    if not customer: raise HTTPException(status_code=404, detail="Customer not found")
+    return customer.unread_notice_count
+
 class RequestReadNotice(BaseModel):
     customer_id: str
     notice_id: str
 
-@app.post("/readNotice", response_model=ResponseNotice)
+@route("post", "/readNotice", persistent=True, response_model=ResponseNotice)
 @mcp.tool(
     name="readNotice",
     description="""
@@ -1299,7 +3497,11 @@ def read_notice(req: RequestReadNotice):
     customer = spa.search_customer_by_id(req.customer_id)
     if not customer: raise HTTPException(status_code=404, detail="Customer not found")
 
-    notice = customer.read_notice(req.notice_id)
+    with spa.operation():
+        notice = customer.read_notice(req.notice_id)
+        if notice is not None:
+            spa.repository.update_notice(customer, notice)
+            spa.log_operation("read_notice", {"customer_id": customer.id, "notice_id": notice.id})
 
     if notice is None:
         raise  HTTPException(
@@ -1328,7 +3530,7 @@ class ResponseTreatment(BaseModel):
     duration: int
     price: float
 
-@app.post("/requstViewTreatmentList", response_model=list[ResponseTreatment])
+@route("post", "/requstViewTreatmentList", response_model=list[ResponseTreatment])
 @mcp.tool(name="ViewTreatmentList",
           description=
           """
@@ -1342,16 +3544,19 @@ def request_to_view_treatment_list(req: RequestViewTreatmentList):
     customer = spa.search_customer_by_id(req.customer_id)
     if customer == None:
         raise HTTPException(status_code=401, detail="Customer is not registered")
-    temp_treatment_list = []
-    for treatment in spa.treatment_list:
-        show_treatment = ResponseTreatment(
-            id=treatment.id, 
-            name=treatment.name,
-            duration=treatment.duration, 
-            price=treatment.price
-        )
-        temp_treatment_list.append(show_treatment)
-    return temp_treatment_list
+
+    def build():
+        temp_treatment_list = []
+        for treatment in spa.treatment_list:
+            show_treatment = ResponseTreatment(
+                id=treatment.id, 
+                name=treatment.name,
+                duration=treatment.duration, 
+                price=treatment.price
+            )
+            temp_treatment_list.append(show_treatment)
+        return temp_treatment_list
+    return catalog_cache.get("treatment_list", build)
 
 class RequestViewTherapistByTreatment(BaseModel):
     customer_id: str
@@ -1362,7 +3567,7 @@ class ResponseTherapistFromSearch(BaseModel):
     name: str
     skill: str
 
-@app.post("/requestViewTherapistByTreatment", response_model=list[ResponseTherapistFromSearch])
+@route("post", "/requestViewTherapistByTreatment", response_model=list[ResponseTherapistFromSearch])
 @mcp.tool(name="ViewTherapistByTreatment",
           description=
           """
@@ -1380,17 +3585,18 @@ def request_view_therapist_by_treatment(req: RequestViewTherapistByTreatment):
         raise HTTPException(status_code=403, detail="Customer is not registered")
     if treatment is None:
         raise HTTPException(status_code=402, detail="Treatment Not Found")
-    temp_therapist_list = []
-    for employee in spa.employee_list:
-        if isinstance(employee, Therapist):
-            if treatment.id in treatment_dict.get(employee.skill.value, []):
-                therapist = ResponseTherapistFromSearch(
-                    therapist_id=employee.id,
-                    name=employee.name,
-                    skill=employee.skill.value
-                )
-                temp_therapist_list.append(therapist)
-    return temp_therapist_list
+
+    def build():
+        temp_therapist_list = []
+        for employee in spa.get_qualified_therapist_list(treatment):
+            therapist = ResponseTherapistFromSearch(
+                therapist_id=employee.id,
+                name=employee.name,
+                skill=employee.skill.value
+            )
+            temp_therapist_list.append(therapist)
+        return temp_therapist_list
+    return catalog_cache.get(("therapist_list", treatment.id), build)
 
 
 
@@ -1415,12 +3621,64 @@ class ResponseGetSlot(BaseModel):
     day: int
     slot: list[ResponseSlot]
 
-@app.post("/getSlot", response_model=list[ResponseGetSlot])
+def make_slot_query(req: RequestGetSlot):
+    try:
+        date_class = date(req.year, req.month, req.day)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format")
+
+    customer = spa.search_customer_by_id(req.customer_id)
+    if not customer: raise HTTPException(status_code=404, detail="Customer not found")
+
+    therapist = spa.search_employee_by_id(req.therapist_id)
+    if not therapist: raise HTTPException(status_code=404, detail="Therapist not found")
+
+    treatment = spa.search_treatment_by_id(req.treatment_id)
+    if not treatment: raise HTTPException(status_code=404, detail="Treatment not found")
+
+    if not isinstance(therapist, Therapist) or not therapist.is_qualified(treatment):
+      raise HTTPException(
+            status_code=400, 
+            detail="The requested treatment does not match the selected therapist's skill ⚠️"
+        )
+
+    room_type = f'{treatment.room_type}-{req.room_type}'
+    room_list = spa.get_room_list_by_type(room_type)
+    
+    if not room_list: raise HTTPException(status_code=404, detail="Room type not found")
+
+    slot_count = treatment.slot_count
+
+    def compute():
+        result = []
+        for room in room_list:
+            start_mask = spa.find_intersect_free_window(room, therapist, date_class, slot_count)
+            
+            if start_mask: 
+                result.append(
+                    ResponseGetSlot(
+                        room_id=room.id, year=date_class.year,
+                        month=date_class.month, day=date_class.day,
+                        slot=[ResponseSlot(time=make_window_str(start, slot_count)) for start in mask_to_slot_order(start_mask)]
+                    )
+                )
+        return EncodedList(result)
+    return ((treatment.id, therapist.id, room_type, date_class), date_class, compute,
+            lambda: [therapist.calendar] + [room.calendar for room in room_list])
+
+async def find_free_slot_async(req: RequestGetSlot):
+    return await slot_cache.get_async(*make_slot_query(req), blocking_executor)
+
+@route("post", "/getSlot", coroutine=find_free_slot_async, response_model=list[ResponseGetSlot])
 @mcp.tool(name="checkAvailableSlot",
           description=
           """
             View Available slot 
 
+            Every returned time is a bookable window that already matches the
+            treatment duration (e.g. '10:00-11:00' for a 60 minute treatment).
+            Pass it unchanged as 'time' to requestBooking.
+
             Parameters:
             - customer_id: The unique ID of the customer.
             - therapist_id: The unique ID of the therapst.
@@ -1433,47 +3691,113 @@ class ResponseGetSlot(BaseModel):
           """
           )
 def find_free_slot(req: RequestGetSlot):
-    try:
-        date_class = date(req.year, req.month, req.day)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid date format")
+    return slot_cache.get(*make_slot_query(req))
+
+
+class RequestSlotCacheMetrics(BaseModel):
+    admin_id: str
+
+class ResponseSlotCacheMetrics(BaseModel):
+    hit: int
+    miss: int
+    coalesced: int
+    invalidated: int
+    expired: int
+    evicted: int
+    size: int
+    max_size: int
+    ttl: float
+    hit_rate: float
+    saved_seconds: float
+
+@route("post", "/requestSlotCacheMetrics", response_model=ResponseSlotCacheMetrics)
+@mcp.tool(
+    name="requestSlotCacheMetrics",
+    description="""
+    Show hit rate and saved computation time of the available slot cache (Admin only).
+
+    Parameters:
+    - admin_id: The ID of the admin.
+    """
+)
+def request_slot_cache_metrics(req: RequestSlotCacheMetrics):
+    admin = spa.search_employee_by_id(req.admin_id)
+    if not admin or not isinstance(admin, Administrative):
+        raise HTTPException(status_code=403, detail="Administrative not found")
+    return ResponseSlotCacheMetrics(**slot_cache.metrics())
+
+class RequestSearchSlot(BaseModel):
+    customer_id: str = Field(..., min_length=1)
+    treatment_id: str = Field(..., min_length=1)
+    therapist_id: str | None = None
+    room_type: str = Field(..., min_length=1)
+    start_date: date
+    end_date: date
+    limit: int = Field(10, ge=1, le=100)
+
+class ResponseSearchSlot(BaseModel):
+    therapist_id: str
+    therapist_name: str
+    room_id: str
+    date: date
+    time: str
+
+SEARCH_SLOT_MAX_DAYS = 92
+
+@route("post", "/searchAvailableSlot", response_model=list[ResponseSearchSlot])
+@mcp.tool(name="searchAvailableSlot",
+          description=
+          """
+            Search the earliest bookable windows for a treatment over a date range,
+            across every qualified therapist (or only one if therapist_id is given).
+            Results are ordered earliest first and each time can be passed unchanged
+            to requestBooking together with its therapist_id and room_id.
+
+            Parameters:
+            - customer_id: The unique ID of the customer.
+            - treatment_id: The unique ID of the treatment.
+            - therapist_id: (optional) The unique ID of the therapist.
+            - room_type : PV for privateRoom,SH for shareRoom
+            - start_date: first day to search (YYYY-MM-DD)
+            - end_date: last day to search (YYYY-MM-DD), at most 92 days after start_date
+            - limit: maximum number of windows to return (default 10)
+          """
+          )
+def search_free_slot(req: RequestSearchSlot):
+    if req.end_date < req.start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    if (req.end_date - req.start_date).days >= SEARCH_SLOT_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range must be at most {SEARCH_SLOT_MAX_DAYS} days")
 
     customer = spa.search_customer_by_id(req.customer_id)
     if not customer: raise HTTPException(status_code=404, detail="Customer not found")
 
-    therapist = spa.search_employee_by_id(req.therapist_id)
-    if not therapist: raise HTTPException(status_code=404, detail="Therapist not found")
-
     treatment = spa.search_treatment_by_id(req.treatment_id)
     if not treatment: raise HTTPException(status_code=404, detail="Treatment not found")
 
-    if treatment.id not in treatment_dict.get(therapist.skill.value,[]):
-      raise HTTPException(
-            status_code=400, 
-            detail="The requested treatment does not match the selected therapist's skill ⚠️"
-        )
+    therapist_list = spa.get_qualified_therapist_list(treatment)
+    if req.therapist_id is not None:
+        therapist = spa.search_employee_by_id(req.therapist_id)
+        if not therapist: raise HTTPException(status_code=404, detail="Therapist not found")
+        if therapist not in therapist_list:
+            raise HTTPException(
+                status_code=400,
+                detail="The requested treatment does not match the selected therapist's skill ⚠️"
+            )
+        therapist_list = [therapist]
 
-    therapist_slot = therapist.get_slot_by_date(date_class)
-    room_type_str = f'ROOM-{treatment.room_type}-{req.room_type}'
-    room_list = spa.get_room_by_room_type(room_type_str)
-    
+    room_list = spa.get_room_list_by_type(f'{treatment.room_type}-{req.room_type}')
     if not room_list: raise HTTPException(status_code=404, detail="Room type not found")
 
-    result = []
-    for room in room_list:
-        room_slot = room.get_slot_by_date(date_class)
-        free_slots = spa.find_intersect_free_slot(room_slot, therapist_slot)
-        
-        if free_slots: 
-            result.append(
-                ResponseGetSlot(
-                    room_id=room.id, year=free_slots[0].date.year,
-                    month=free_slots[0].date.month, day=free_slots[0].date.day,
-                    slot=[ResponseSlot(time=time_dict[slot.slot_order]) for slot in free_slots]
-                )
-            )
-    return result
-
+    slot_count = treatment.slot_count
+    window_list = spa.search_free_window(therapist_list, room_list, req.start_date, req.end_date, slot_count, req.limit)
+    return [
+        ResponseSearchSlot(
+            therapist_id=therapist.id, therapist_name=therapist.name,
+            room_id=room.id, date=d, time=make_window_str(start, slot_count)
+        )
+        for d, start, therapist, room in window_list
+    ]
 
 
 
@@ -1482,7 +3806,7 @@ class RequestCancleBooking(BaseModel):
     booking_id: str = Field(..., min_length=1)
     customer_id: str = Field(..., min_length=1)
   
-@app.post("/cancelBooking", response_model=str)
+@route("post", "/cancelBooking", persistent=True, response_model=str)
 @mcp.tool(
     name="cancelBooking",
     description="""
@@ -1501,10 +3825,11 @@ def cancel_booking(req: RequestCancleBooking):
     customer = spa.search_customer_by_id(req.customer_id)
     if not customer: raise HTTPException(status_code=404, detail="Customer not found")
 
-    booking = customer.search_booking_by_id(req.booking_id)
-    if not booking: raise HTTPException(status_code=404, detail="Booking not found")
+    booking = spa.search_booking_by_id(req.booking_id)
+    if not booking or booking.customer is not customer: raise HTTPException(status_code=404, detail="Booking not found")
 
-    result = booking.cancle()
+    with spa.operation():
+        result = booking.cancle()
     return result
 
 
@@ -1540,7 +3865,7 @@ class ResponseRequestBooking(BaseModel):
     detail:list[ResponseTreatmentError]
 
 
-@app.post("/requestBooking", response_model=ResponseRequestBooking)
+@route("post", "/requestBooking", persistent=True, response_model=ResponseRequestBooking)
 @mcp.tool(
     name="requestBooking",
     description="""
@@ -1579,21 +3904,25 @@ def request_booking(req: RequestBooking):
       if treatment is None:
           error_list.append(ErrorMessage(error_code="TREATMENT_NOT_FOUND",error_message=f"{treat.treatment_id} is not exist"))
 
-      if room is None or therapist is None or treatment is None:
+      if therapist is not None and treatment is not None:
+          if not isinstance(therapist, Therapist) or not therapist.is_qualified(treatment):
+              error_list.append(ErrorMessage(error_code="EMPLOYEE_NOT_QUALIFIED",error_message=f"{therapist.id} cannot perform {treatment.id}"))
+
+      if room is None or therapist is None or treatment is None or error_list:
         treatment_error_list.append(ResponseTreatmentError(treatment_id=treat.treatment_id,
                                                             error=error_list))
       else:
         slots = change_str_to_index_list(treat.time)
         if not slots: error_list.append(ErrorMessage(error_code="TIME_WRONG_FORMAT",error_message=f"this '{treat.time}' is not valid"))
-        if slots and len(slots)*30 != treatment.duration : error_list.append(ErrorMessage(error_code="TIME_WRONG_FORMAT",error_message=f"Time must be exactly {treatment.duration} minutes."))
+        if slots and len(slots) != treatment.slot_count : error_list.append(ErrorMessage(error_code="TIME_WRONG_FORMAT",error_message=f"Time must be exactly {treatment.slot_count * SLOT_MINUTES} minutes."))
 
         time_not_ava = []
         for time_slot in slots:
             room_slot = room.get_slot_by_date_time(d,time_slot)
-            if  not room_slot.is_ava():
+            if  room_slot is None or not room_slot.is_ava():
               error_list.append(ErrorMessage(error_code="ROOM_NOT_AVAILABLE",error_message=f"{room.id} is not available at {time_dict[time_slot]}"))
             therapist_slot = therapist.get_slot_by_date_time(d,time_slot)
-            if  not therapist_slot.is_ava():
+            if  therapist_slot is None or not therapist_slot.is_ava():
                error_list.append(ErrorMessage(error_code="EMPLOYEE_NOT_AVAILABLE",error_message=f"{therapist.id} is not available at {time_dict[time_slot]}"))
     
         addon_list = []
@@ -1616,21 +3945,16 @@ def request_booking(req: RequestBooking):
     if len(treatment_error_list) != 0:
         return  ResponseRequestBooking(status="FAIL",booking_id="",detail=treatment_error_list)
   
-    booking_id = spa.create_booking_id(d)
-    for treat in treatment_transaction_list:
-      room = treat.room
-      therapist = treat.therapist
-      for time in treat.time_slot:
-        room.add_treatment_trasaction_at_date_time(treat,d,time)
-        therapist.add_treatment_trasaction_at_date_time(treat,d,time)
-      addon_list = treat.add_on_list
-      for addon in addon_list:
-        addon.reduce_amount(1)
-    booking = Booking(booking_id,customer,d,treatment_transaction_list)
-    customer.book(booking)
-
-
-    return ResponseRequestBooking(status="SUCCESS",booking_id=booking_id,detail=[])
+    try:
+        with spa.operation():
+            booking = spa.create_booking(customer, d, treatment_transaction_list)
+    except ValueError as e:
+        error = ErrorMessage(error_code="SLOT_NOT_AVAILABLE",error_message=str(e))
+        return ResponseRequestBooking(status="FAIL",booking_id="",
+                                      detail=[ResponseTreatmentError(treatment_id=treat.treatment.id,error=[error])
+                                              for treat in treatment_transaction_list])
+
+    return ResponseRequestBooking(status="SUCCESS",booking_id=booking.id,detail=[])
 
 class RequestCheckBooking(BaseModel):
     customer_id: str
@@ -1671,8 +3995,28 @@ class ResponseBooking(BaseModel):
 
 ResponseBooking.model_rebuild()
 
+def make_response_booking(booking: Booking):
+    temp_treatment_list = []
+    for treatment_transaction in booking.treatment_list:
+        time_start, time_end = make_time_index_to_str(treatment_transaction.time_slot)
+        treatment = ResponseTreatmentTransaction(
+            id=treatment_transaction.treatment.id, 
+            name=treatment_transaction.treatment.name,
+            room=treatment_transaction.room.id,
+            time=f"{time_start}-{time_end}",
+            addon_list=[addon.name for addon in treatment_transaction.add_on_list],
+            therapist=ResponseTherapist(therapist_id=treatment_transaction.therapist.id, name=treatment_transaction.therapist.name)
+        )
+        temp_treatment_list.append(treatment)
+    return ResponseBooking(
+        booking_id=booking.id,
+        booking_date=booking.treatment_list[0].date,
+        booking_status=booking.status,
+        treatment_list=temp_treatment_list
+    )
 
-@app.post("/requestToCheckActiveBooking",response_model=list[ResponseBooking])
+
+@route("post", "/requestToCheckActiveBooking",response_model=list[ResponseBooking])
 @mcp.tool(
     name="checkActiveBooking",
     description="""
@@ -1690,30 +4034,9 @@ def request_to_check_active_booking(req: RequestCheckBooking):
     if customer is None:
         raise HTTPException(status_code=403, detail="Customer is not registered")
     active_booking = customer.get_active_booking()
-    temp_booking_list = []
-    for booking in active_booking:
-        temp_treatment_list = []
-        for treatment_transaction in booking.treatment_list:
-            time_start, time_end = make_time_index_to_str(treatment_transaction.time_slot)
-            treatment = ResponseTreatmentTransaction(
-                id=treatment_transaction.treatment.id, 
-                name=treatment_transaction.treatment.name,
-                room=treatment_transaction.room.id,
-                time=f"{time_start}-{time_end}",
-                addon_list=[addon.name for addon in treatment_transaction.add_on_list],
-                therapist=ResponseTherapist(therapist_id=treatment_transaction.therapist.id, name=treatment_transaction.therapist.name)
-            )
-            temp_treatment_list.append(treatment)
-        res_booking = ResponseBooking(
-            booking_id=booking.id,
-            booking_date=booking.treatment_list[0].date,
-            booking_status=booking.status,
-            treatment_list=temp_treatment_list
-        )
-        temp_booking_list.append(res_booking)
-    return temp_booking_list
+    return [make_response_booking(booking) for booking in active_booking]
 
-@app.post("/requestToCheckBookingHistory",response_model=list[ResponseBooking])
+@route("post", "/requestToCheckBookingHistory",response_model=list[ResponseBooking])
 @mcp.tool(
     name="checkBookingHistory",
     description="""
@@ -1732,34 +4055,41 @@ def request_to_check_booking_history(req: RequestCheckBooking):
     if customer is None:
         raise HTTPException(status_code=403, detail="Customer is not registered")
     completed_booking = customer.get_completed_booking()
-    temp_booking_list = []
-    for booking in completed_booking:
-        temp_treatment_list = []
-        for treatment_transaction in booking.treatment_list:
-            time_start, time_end = make_time_index_to_str(treatment_transaction.time_slot)
-            treatment = ResponseTreatmentTransaction(
-                id=treatment_transaction.treatment.id, 
-                name=treatment_transaction.treatment.name,
-                room=treatment_transaction.room.id,
-                time=f"{time_start}-{time_end}",
-                addon_list=[addon.name for addon in treatment_transaction.add_on_list],
-                therapist=ResponseTherapist(therapist_id=treatment_transaction.therapist.id, name=treatment_transaction.therapist.name)
-            )
-            temp_treatment_list.append(treatment)
-        res_booking = ResponseBooking(
-            booking_id=booking.id,
-            booking_date=booking.treatment_list[0].date,
-            booking_status=booking.status,
-            treatment_list=temp_treatment_list
-        )
-        temp_booking_list.append(res_booking)
-    return temp_booking_list
+    return [make_response_booking(booking) for booking in completed_booking]
+
+class RequestSearchBooking(BaseModel):
+    admin_id: str
+    booking_date: date | None = None
+    status: str | None = None
+    therapist_id: str | None = None
+    room_id: str | None = None
+
+@route("post", "/requestSearchBooking",response_model=list[ResponseBooking])
+@mcp.tool(
+    name="searchBooking",
+    description="""
+    Search bookings across all customers (Admin only). Every filter is optional and filters are combined.
+    Parameters:
+    - admin_id: The ID of the admin.
+    - booking_date: Booking date (YYYY-MM-DD).
+    - status: 'Waiting deposit', 'Confirmed', 'Checked-In', 'Completed' or 'Cancelled'.
+    - therapist_id: The ID of a therapist on the booking.
+    - room_id: The ID of a room on the booking.
+    IMPORTANT: Pass arguments as top-level fields.
+    """
+)
+def request_search_booking(req: RequestSearchBooking):
+    admin = spa.search_employee_by_id(req.admin_id)
+    if not admin or not isinstance(admin, Admin):
+        raise HTTPException(status_code=403, detail="Admin not found")
+    booking_list = spa.search_booking(req.booking_date, req.status, req.therapist_id, req.room_id)
+    return [make_response_booking(booking) for booking in booking_list]
 
 class RequestToCheckIn(BaseModel):
     customer_id: str
     booking_id: str
 
-@app.post("/requestToCheckIn",response_model=str)
+@route("post", "/requestToCheckIn", persistent=True,response_model=str)
 @mcp.tool(
     name="checkIn",
     description="""
@@ -1775,15 +4105,21 @@ def request_to_check_in(req: RequestToCheckIn):
     customer = spa.search_customer_by_id(req.customer_id)
     if customer is None:
         raise HTTPException(status_code=403, detail="Customer is not registered")
-    booking = customer.search_booking_by_id(req.booking_id)
-    return booking.check_in()
+    booking = spa.search_booking_by_id(req.booking_id)
+    if not booking or booking.customer is not customer:
+        raise HTTPException(status_code=404, detail="Booking not found")
+    with spa.operation():
+        result = booking.check_in()
+        if booking.status == "Checked-In":
+            spa.log_operation("check_in", {"booking_id": booking.id})
+    return result
     
 class RequestCreateWellnessRecord(BaseModel):
     therapist_id: str
     customer_id: str
     text_record: str
 
-@app.post("/requestToCreateWellnessRecord",response_model=str)
+@route("post", "/requestToCreateWellnessRecord", persistent=True,response_model=str)
 @mcp.tool(
     name="createWellnessRecord",
     description="""
@@ -1802,7 +4138,11 @@ def request_to_create_wellness_record(req: RequestCreateWellnessRecord):
     reciever = spa.search_customer_by_id(req.customer_id)
     if reciever is None:
         raise HTTPException(status_code=403, detail="Customer is not registered")
-    return therapist.create_wellness_record(text_record=req.text_record, customer=reciever)
+    with spa.operation():
+        result = therapist.create_wellness_record(text_record=req.text_record, customer=reciever)
+        spa.repository.add_wellness_record(reciever, len(reciever.wellness_record) - 1)
+        spa.log_operation("wellness", {"therapist_id": therapist.id, "customer_id": reciever.id, "text_record": req.text_record})
+    return result
 
 class RequestShowWellnessRecord(BaseModel):
     therapist_id: str
@@ -1813,7 +4153,7 @@ class ResponseShowWellnessRecord(BaseModel):
     therapist_name: str
     wellness_record: str
 
-@app.post("/requestToShowWellnessRecord",response_model=list[ResponseShowWellnessRecord])
+@route("post", "/requestToShowWellnessRecord",response_model=list[ResponseShowWellnessRecord])
 @mcp.tool(
     name="showWellnessRecord",
     description="""
@@ -1849,7 +4189,7 @@ class RequestToPay(BaseModel):
   payment_value:int
   coupon_id: str
 
-@app.post("/requestToPayExpenses",response_model=str)
+@route("post", "/requestToPayExpenses", blocking=True,response_model=str)
 @mcp.tool(
     name="payExpenses",
     description="""
@@ -1868,23 +4208,31 @@ def request_to_pay_expenses(req :RequestToPay):
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
         
-    booking = customer.search_booking_by_id(req.booking_id)
-    if not booking:
+    booking = spa.search_booking_by_id(req.booking_id)
+    if not booking or booking.customer is not customer:
         raise HTTPException(status_code=404, detail="Booking not found")
 
-    total = booking.calculate_total(req.coupon_id)
-    if total is False:
-        raise HTTPException(status_code=400, detail="Not found coupon⚠️")
+    if req.payment_type not in ("Cash", "Card"):
+        raise HTTPException(status_code=400, detail="Invalid payment type")
 
-    if req.payment_type == "Cash":
-        cash = Cash()
-        return booking.pay_expenses(cash, total, money=req.payment_value)
-    elif req.payment_type == "Card":
-        card = Card()
-        return booking.pay_expenses(card, total, number=str(req.payment_value))
-    else: raise HTTPException(status_code=400, detail="Invalid payment type")      
+    with spa.operation():
+        total = booking.calculate_total(req.coupon_id)
+        if total is False:
+            raise HTTPException(status_code=400, detail="Not found coupon⚠️")
+        if req.coupon_id != "None":
+            spa.repository.use_coupon(booking)
 
-@app.post("/requestToPayDeposit",response_model=str)
+        if req.payment_type == "Cash":
+            cash = Cash()
+            result = booking.pay_expenses(cash, total, money=req.payment_value)
+        else:
+            card = Card()
+            result = booking.pay_expenses(card, total, number=str(req.payment_value))
+        spa.log_operation("expenses", {"booking_id": booking.id, "payment_type": req.payment_type,
+                                       "payment_value": req.payment_value, "coupon_id": req.coupon_id})
+    return result      
+
+@route("post", "/requestToPayDeposit", blocking=True,response_model=str)
 @mcp.tool(
     name="requestToPayDeposit",
     description="""
@@ -1907,19 +4255,27 @@ def request_to_pay_deposit(req :RequestToPay):
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
         
-    booking = customer.search_booking_by_id(req.booking_id)
-    if not booking:
+    booking = spa.search_booking_by_id(req.booking_id)
+    if not booking or booking.customer is not customer:
         raise HTTPException(status_code=404, detail="Booking not found")
 
     total = 1000 #ค่ามัดจำ
     
-    if req.payment_type.lower() == "cash":
-        cash = Cash()
-        return booking.pay_deposit(cash, total, money=req.payment_value)
-    elif req.payment_type.lower() == "card":
-        card = Card()
-        return booking.pay_deposit(card, total, number=str(req.payment_value))
-    else: raise HTTPException(status_code=400, detail="Invalid payment type")   
+    if req.payment_type.lower() not in ("cash", "card"):
+        raise HTTPException(status_code=400, detail="Invalid payment type")
+
+    with spa.operation():
+        old_status = booking.status
+        if req.payment_type.lower() == "cash":
+            cash = Cash()
+            result = booking.pay_deposit(cash, total, money=req.payment_value)
+        else:
+            card = Card()
+            result = booking.pay_deposit(card, total, number=str(req.payment_value))
+        if booking.status != old_status:
+            spa.log_operation("deposit", {"booking_id": booking.id, "payment_type": req.payment_type,
+                                          "payment_value": req.payment_value, "coupon_id": req.coupon_id})
+    return result   
 
 
 
@@ -1941,7 +4297,7 @@ class ResponseReportPerDay(BaseModel):
   addon_list_count: dict[str, int]
   treatment_list_count: dict[str, int]
 
-@app.post("/requestToCalculateRevenuePerDay",response_model=ResponseReportPerDay)
+@route("post", "/requestToCalculateRevenuePerDay",response_model=ResponseReportPerDay)
 @mcp.tool(
     name="calculateRevenuePerDay",
     description="""
@@ -1969,6 +4325,90 @@ def request_to_calculate_revenue_per_day(req :RequestToCalculateRevenuePerDay):
                                 )
   return result
 
+class RequestOccupancyReport(BaseModel):
+    admin_id: str
+    year: int = Field(..., ge=2024)
+    month: int = Field(..., ge=1, le=12)
+
+class ResponseOccupancyReport(BaseModel):
+    start_date: date
+    day_count: int
+    free_capacity: dict[str, list[int]]
+    therapist_utilization: dict[str, float]
+
+@route("post", "/requestOccupancyReport", response_model=ResponseOccupancyReport)
+@mcp.tool(
+    name="requestOccupancyReport",
+    description="""
+    Monthly planning report (Admin only): free room capacity per room type per day
+    and utilization (0.0-1.0) per therapist.
+    Parameters:
+    - admin_id: The ID of the administrative officer.
+    - year: Year (integer).
+    - month: Month (1-12).
+    IMPORTANT: Pass arguments as top-level fields.
+    """
+)
+def request_occupancy_report(req: RequestOccupancyReport):
+    admin = spa.search_employee_by_id(req.admin_id)
+    if not admin or not isinstance(admin, Administrative):
+        raise HTTPException(status_code=403, detail="Administrative not found")
+    if np is None:
+        raise HTTPException(status_code=501, detail="Occupancy report requires numpy")
+
+    start_date = date(req.year, req.month, 1)
+    day_count = ((start_date + timedelta(days=31)).replace(day=1) - start_date).days
+    matrix = spa.get_occupancy_matrix(start_date, day_count)
+    offset = (start_date - matrix.start_date).days
+    free_capacity = {room_type: free[offset:offset + day_count].tolist()
+                     for room_type, free in matrix.free_capacity_by_room_type().items()}
+    return ResponseOccupancyReport(
+        start_date=start_date,
+        day_count=day_count,
+        free_capacity=free_capacity,
+        therapist_utilization=matrix.therapist_utilization()
+    )
+
+class RequestRevenueReport(BaseModel):
+    admin_id: str
+    start_date: date
+    end_date: date
+    group_by: str = "day"
+    dimension: str | None = None
+
+class ResponseRevenueCell(BaseModel):
+    revenue: float
+    count: int
+
+class ResponseRevenuePeriod(BaseModel):
+    period: str
+    total: float
+    booking_count: int
+    breakdown: dict[str, ResponseRevenueCell]
+
+@route("post", "/requestRevenueReport", response_model=list[ResponseRevenuePeriod])
+@mcp.tool(
+    name="requestRevenueReport",
+    description="""
+    Revenue report over a date range (Admin only), built from daily pre-aggregated totals.
+    Parameters:
+    - admin_id: The ID of the administrative officer.
+    - start_date: First day of the range (YYYY-MM-DD).
+    - end_date: Last day of the range (YYYY-MM-DD).
+    - group_by: 'day', 'week' or 'month' (default 'day').
+    - dimension: (optional) 'treatment', 'therapist' or 'room_type' to break each period down.
+    IMPORTANT: Pass arguments as top-level fields.
+    """
+)
+def request_revenue_report(req: RequestRevenueReport):
+    admin = spa.search_employee_by_id(req.admin_id)
+    if not admin or not isinstance(admin, Administrative):
+        raise HTTPException(status_code=403, detail="Administrative not found")
+    try:
+        report = admin.calculate_revenue_report(req.start_date, req.end_date, req.group_by, req.dimension)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return [ResponseRevenuePeriod(**row) for row in report]
 
 
 
@@ -1987,7 +4427,7 @@ class Request_employee_schedule(BaseModel):
   year:int
   month:int
   day:int
-@app.post("/requestEmployeeSchedule",response_model=ResponseEmployeeSchedule)
+@route("post", "/requestEmployeeSchedule",response_model=ResponseEmployeeSchedule)
 @mcp.tool(
     name="requestEmployeeSchedule",
     description="""
@@ -2039,7 +4479,7 @@ class RequestRoomSchedule(BaseModel):
   year:int
   month:int
   day:int
-@app.post("/requestRoomSchedule",response_model=ResponseRoomSchedule)
+@route("post", "/requestRoomSchedule",response_model=ResponseRoomSchedule)
 @mcp.tool(
     name="requestRoomSchedule",
     description="""
@@ -2075,7 +4515,7 @@ class RequestChangeInfo(BaseModel):
     customer_id: str
     new_name: str
 
-@app.patch("/customer/update-info")
+@route("patch", "/customer/update-info", persistent=True)
 @mcp.tool(
     name="updateCustomerInfo",
     description="""
@@ -2093,7 +4533,10 @@ def update_customer_info(req: RequestChangeInfo):
         raise HTTPException(status_code=404, detail="Customer not found")
     
     try:
-        result_message = customer.change_personal_info(req.new_name)
+        with spa.operation():
+            result_message = customer.change_personal_info(req.new_name)
+            spa.repository.update_customer(customer)
+            spa.log_operation("update_info", {"customer_id": customer.id, "new_name": req.new_name})
         return {"status": "SUCCESS", "message": result_message}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -2103,7 +4546,7 @@ class RequestSendPromotion(BaseModel):
     admin_id: str
     promo_text: str
 
-@app.post("/sendPromotion")
+@route("post", "/sendPromotion", persistent=True)
 @mcp.tool(
     name="sendPromotion",
     description="""
@@ -2122,7 +4565,8 @@ def send_promotion(req: RequestSendPromotion):
         raise HTTPException(status_code=403, detail="Administrative not found")
     
     try:
-        result_message = admin.send_promotion(req.promo_text)
+        with spa.operation():
+            result_message = admin.send_promotion(req.promo_text)
         return {"status": "SUCCESS", "message": result_message}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -2133,7 +4577,7 @@ class RequestRateEmployee(BaseModel):
     employee_id: str
     score: int
 
-@app.post("/rateEmployee")
+@route("post", "/rateEmployee", persistent=True)
 @mcp.tool(
     name="rateEmployee",
     description="""
@@ -2156,7 +4600,9 @@ def rate_employee(req: RequestRateEmployee):
         raise HTTPException(status_code=404, detail="Therapist id not found")
         
     try:
-        message = customer.rating_employee(employee, req.score)
+        with spa.operation():
+            message = customer.rating_employee(employee, req.score)
+            spa.log_operation("rating", {"customer_id": customer.id, "employee_id": employee.id, "score": req.score})
         
         return {
             "status": "SUCCESS",
@@ -2170,7 +4616,174 @@ def rate_employee(req: RequestRateEmployee):
         }
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+BATCH_MAX_STEP = 20
+
+def make_batch_operation(handler, state=None, require_change: bool = False):
+    hint = get_type_hints(handler)
+    hint.pop("return", None)
+    model = next(iter(hint.values()), None)
+    if isinstance(model, type) and issubclass(model, BaseModel) and len(hint) == 1:
+        return handler, model, state, require_change
+    return handler, None, state, require_change
+
+def booking_status_state(req):
+    booking = spa.search_booking_by_id(req.booking_id)
+    return booking.status if booking is not None else None
+
+def booking_count_state(req):
+    customer = spa.search_customer_by_id(req.customer_id)
+    return len(customer.booking_list) if customer is not None else None
+
+def unread_notice_state(req):
+    customer = spa.search_customer_by_id(req.customer_id)
+    return customer.unread_notice_count if customer is not None else None
+
+BATCH_OPERATION = {
+    "getCustomerNameById": make_batch_operation(get_customer_name_from_id),
+    "getCustomerIdByName": make_batch_operation(get_customer_id_from_name),
+    "checkNotice": make_batch_operation(check_notice),
+    "countUnreadNotice": make_batch_operation(count_unread_notice),
+    "readNotice": make_batch_operation(read_notice, unread_notice_state),
+    "ViewTreatmentList": make_batch_operation(request_to_view_treatment_list),
+    "ViewTherapistByTreatment": make_batch_operation(request_view_therapist_by_treatment),
+    "checkAvailableSlot": make_batch_operation(find_free_slot),
+    "searchAvailableSlot": make_batch_operation(search_free_slot),
+    "requestBooking": make_batch_operation(request_booking, booking_count_state, require_change=True),
+    "cancelBooking": make_batch_operation(cancel_booking, booking_status_state, require_change=True),
+    "requestToPayDeposit": make_batch_operation(request_to_pay_deposit, booking_status_state, require_change=True),
+    "checkActiveBooking": make_batch_operation(request_to_check_active_booking),
+    "checkBookingHistory": make_batch_operation(request_to_check_booking_history),
+    "searchBooking": make_batch_operation(request_search_booking),
+}
+
+class BatchReferenceError(Exception):
+    pass
+
+def resolve_batch_reference(value, result_by_id: dict):
+    if isinstance(value, dict):
+        return {key: resolve_batch_reference(item, result_by_id) for key, item in value.items()}
+    if isinstance(value, list):
+        return [resolve_batch_reference(item, result_by_id) for item in value]
+    if not isinstance(value, str) or not value.startswith("$"):
+        return value
+    if value.startswith("$$"):
+        return value[1:]
+    step_id, *path = value[1:].split(".")
+    if step_id not in result_by_id:
+        raise BatchReferenceError(f"{value}: step '{step_id}' has no result")
+    result = result_by_id[step_id]
+    for part in path:
+        try:
+            result = result[int(part)] if isinstance(result, list) else result[part]
+        except (KeyError, IndexError, ValueError, TypeError):
+            raise BatchReferenceError(f"{value}: '{part}' not found")
+    return result
+
+class BatchStep(BaseModel):
+    id: str = Field(..., min_length=1)
+    op: str = Field(..., min_length=1)
+    args: dict[str, Any] = {}
+
+class RequestBatch(BaseModel):
+    steps: list[BatchStep] = Field(..., min_length=1, max_length=BATCH_MAX_STEP)
+    stop_on_error: bool = True
+
+class ResponseBatchStep(BaseModel):
+    id: str
+    op: str
+    status: str
+    status_code: int
+    result: Any = None
+    error: str | None = None
+    committed: bool = False
+
+class ResponseBatch(BaseModel):
+    status: str
+    steps: list[ResponseBatchStep]
+
+@route("post", "/batch", persistent=True, blocking=True, response_model=ResponseBatch)
+@mcp.tool(
+    name="batch",
+    description=f"""
+    Run several tools in one call, in order, and return every step's result.
+    Use it to chain lookups and bookings without a round-trip per tool.
+
+    Parameters:
+    - steps: List of {{"id": step name, "op": tool name, "args": tool arguments}} (at most {BATCH_MAX_STEP}).
+      Supported op: {", ".join(BATCH_OPERATION)}.
+      Arguments are the same top-level fields the single tool takes.
+      A string argument "$<step id>" is replaced by that step's result, and "$<step id>.<key or index>..."
+      picks a field from it, e.g. "$find.0.slot.0.time". Write "$$" for a literal "$".
+    - stop_on_error: Skip the remaining steps after the first failed step (default true).
+
+    Each step reports status OK, ERROR or SKIPPED with its own status_code, result and error.
+    A booking, cancel or deposit step that leaves the booking unchanged (a FAIL booking result,
+    an already cancelled booking, a deposit in the wrong status) is an ERROR step (status_code 409).
+    Steps are not rolled back: committed is true only for a step that changed spa data,
+    so after an ERROR check which earlier steps already took effect.
+    """
+)
+def batch(req: RequestBatch):
+    result_by_id = {}
+    step_id_set = set()
+    step_list = []
+    failed = False
+    for step in req.steps:
+        if failed and req.stop_on_error:
+            step_list.append(ResponseBatchStep(id=step.id, op=step.op, status="SKIPPED", status_code=424,
+                                               error="Skipped after an earlier step failed"))
+            continue
+        state, request, before = None, None, None
+        try:
+            if step.id in step_id_set: raise BatchReferenceError(f"Duplicate step id '{step.id}'")
+            step_id_set.add(step.id)
+            operation = BATCH_OPERATION.get(step.op)
+            if operation is None:
+                raise HTTPException(status_code=404, detail=f"Unknown op '{step.op}'")
+            handler, model, state, require_change = operation
+            args = resolve_batch_reference(step.args, result_by_id)
+            if model is not None:
+                request = model(**args)
+                before = state(request) if state is not None else None
+                result = handler(request)
+            else:
+                result = handler(**args)
+            result = to_jsonable_python(result)
+        except HTTPException as e:
+            status_code, error = e.status_code, str(e.detail)
+        except BatchReferenceError as e:
+            status_code, error = 424, str(e)
+        except ValidationError as e:
+            status_code, error = 422, str(e)
+        except (TypeError, ValueError) as e:
+            status_code, error = 400, str(e)
+        except Exception as e:
+            logger.exception("Batch step %s (%s) failed", step.id, step.op)
+            status_code, error = 500, f"{type(e).__name__}: {e}"
+        else:
+            committed = state is not None and state(request) != before
+            if require_change and not committed:
+                failed = True
+                error = f"{step.op} reported {result['status']}" if isinstance(result, dict) and "status" in result else str(result)
+                step_list.append(ResponseBatchStep(id=step.id, op=step.op, status="ERROR", status_code=409, result=result,
+                                                   error=error))
+                continue
+            result_by_id[step.id] = result
+            step_list.append(ResponseBatchStep(id=step.id, op=step.op, status="OK", status_code=200, result=result,
+                                               committed=committed))
+            continue
+        failed = True
+        committed = state is not None and request is not None and state(request) != before
+        step_list.append(ResponseBatchStep(id=step.id, op=step.op, status="ERROR", status_code=status_code, error=error,
+                                           committed=committed))
+
+    ok_count = sum(1 for step in step_list if step.status == "OK")
+    status = "SUCCESS" if ok_count == len(step_list) else ("FAIL" if ok_count == 0 else "PARTIAL")
+    return ResponseBatch(status=status, steps=step_list)
     
 if __name__ == "__main__":
-    uvicorn.run("spa:app", host="127.0.0.1", port=8000, log_level="info")
-    # mcp.run()
\ No newline at end of file
+    if SPA_ENABLE_MCP:
+        mcp.run()
+    else:
+        uvicorn.run("spa:app", host="127.0.0.1", port=8000, log_level="info")
\ No newline at end of file
@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import spa as spa_module
+
+@pytest.fixture
+def system(monkeypatch):
+    system = spa_module.init_system()
+    monkeypatch.setattr(spa_module, "spa", system)
+    return system
+
+@pytest.fixture
+def client(monkeypatch):
+    from fastapi.testclient import TestClient
+    monkeypatch.setattr(spa_module, "SPA_DATA_DIR", None)
+    monkeypatch.setattr(spa_module, "SPA_DATABASE", None)
+    with TestClient(spa_module.app) as client:
+        yield client
+
+def book(customer_id: str, date_target, therapist_id: str, treatment_id: str, room_id: str, time: str, addon: list = ()):
+    return spa_module.request_booking(spa_module.RequestBooking(
+        customer_id=customer_id, year=date_target.year, month=date_target.month, day=date_target.day,
+        treatments=[spa_module.RequestTreatment(therapist_id=therapist_id, treatment_id=treatment_id,
+                                                room_id=room_id, time=time, addon=list(addon))]))
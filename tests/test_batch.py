@@ -0,0 +1,109 @@
+import threading
+from datetime import datetime
+
+import pytest
+
+import spa as spa_module
+from spa import Message
+
+def booking_step(step_id: str, day: int = 15):
+    return {"id": step_id, "op": "requestBooking", "args": {
+        "customer_id": "$cid", "year": 2026, "month": 1, "day": day,
+        "treatments": [{"therapist_id": "$therapist.0.therapist_id", "treatment_id": "TM-01",
+                        "room_id": "$slot.0.room_id", "time": "$slot.0.slot.0.time", "addon": []}]}}
+
+LOOKUP_STEP_LIST = [
+    {"id": "cid", "op": "getCustomerIdByName", "args": {"customer_name": "Batman"}},
+    {"id": "therapist", "op": "ViewTherapistByTreatment", "args": {"customer_id": "$cid", "treatment_id": "TM-01"}},
+    {"id": "slot", "op": "checkAvailableSlot", "args": {
+        "customer_id": "$cid", "therapist_id": "$therapist.0.therapist_id", "treatment_id": "TM-01",
+        "room_type": "PV", "year": 2026, "month": 1, "day": 15}},
+]
+
+def run_batch(client, step_list: list, stop_on_error: bool = True):
+    response = client.post("/batch", json={"steps": step_list, "stop_on_error": stop_on_error})
+    assert response.status_code == 200
+    return response.json()
+
+def test_steps_resolve_earlier_results(client):
+    body = run_batch(client, LOOKUP_STEP_LIST + [booking_step("book"),
+                                                 {"id": "active", "op": "checkActiveBooking", "args": {"customer_id": "$cid"}}])
+    assert body["status"] == "SUCCESS"
+    step = {step["id"]: step for step in body["steps"]}
+    assert step["cid"]["result"] == "C0001"
+    assert step["book"]["result"]["status"] == "SUCCESS"
+    assert step["book"]["committed"] and not step["slot"]["committed"]
+    assert [booking["booking_id"] for booking in step["active"]["result"]] == [step["book"]["result"]["booking_id"]]
+    assert step["active"]["result"][0]["treatment_list"][0]["time"] == step["slot"]["result"][0]["slot"][0]["time"]
+
+def test_domain_failure_is_an_error_step(client):
+    body = run_batch(client, LOOKUP_STEP_LIST + [booking_step("first"), booking_step("second"),
+                                                 {"id": "after", "op": "checkNotice", "args": {"customer_id": "$cid"}}])
+    assert body["status"] == "PARTIAL"
+    step = {step["id"]: step for step in body["steps"]}
+    assert step["first"]["status"] == "OK" and step["first"]["committed"]
+    assert step["second"]["status"] == "ERROR"
+    assert step["second"]["status_code"] == 409
+    assert step["second"]["result"]["status"] == "FAIL"
+    assert not step["second"]["committed"]
+    assert step["after"]["status"] == "SKIPPED"
+
+def test_unexpected_exception_fails_only_its_step(client, monkeypatch):
+    def broken(req):
+        raise RuntimeError("disk on fire")
+    monkeypatch.setitem(spa_module.BATCH_OPERATION, "checkNotice", (broken, spa_module.RequestCheckNotice, None, False))
+    body = run_batch(client, [{"id": "notice", "op": "checkNotice", "args": {"customer_id": "C0001"}},
+                              {"id": "name", "op": "getCustomerNameById", "args": {"customer_id": "C0001"}}],
+                     stop_on_error=False)
+    assert body["status"] == "PARTIAL"
+    assert body["steps"][0]["status_code"] == 500
+    assert body["steps"][0]["error"] == "RuntimeError: disk on fire"
+    assert body["steps"][1]["status"] == "OK"
+
+def test_reference_errors(client):
+    body = run_batch(client, [{"id": "a", "op": "getCustomerNameById", "args": {"customer_id": "$missing"}},
+                              {"id": "b", "op": "getCustomerIdByName", "args": {"customer_name": "$$Batman"}},
+                              {"id": "b", "op": "getCustomerNameById", "args": {"customer_id": "C0001"}},
+                              {"id": "c", "op": "noSuchOp", "args": {}}],
+                     stop_on_error=False)
+    assert [(step["status"], step["status_code"]) for step in body["steps"]] == [
+        ("ERROR", 424), ("ERROR", 404), ("ERROR", 424), ("ERROR", 404)]
+    assert body["steps"][1]["error"] == "Customer not found"
+    assert body["status"] == "FAIL"
+
+def test_rejected_cancel_and_deposit_are_error_steps(client):
+    body = run_batch(client, LOOKUP_STEP_LIST + [booking_step("book"),
+                                                 {"id": "cancel", "op": "cancelBooking",
+                                                  "args": {"customer_id": "$cid", "booking_id": "$book.booking_id"}},
+                                                 {"id": "again", "op": "cancelBooking",
+                                                  "args": {"customer_id": "$cid", "booking_id": "$book.booking_id"}},
+                                                 {"id": "deposit", "op": "requestToPayDeposit",
+                                                  "args": {"customer_id": "$cid", "booking_id": "$book.booking_id",
+                                                           "payment_type": "Cash", "payment_value": 1000, "coupon_id": "None"}}],
+                     stop_on_error=False)
+    step = {step["id"]: step for step in body["steps"]}
+    assert step["cancel"]["status"] == "OK" and step["cancel"]["committed"]
+    for step_id in ("again", "deposit"):
+        assert (step[step_id]["status"], step[step_id]["status_code"]) == ("ERROR", 409)
+        assert not step[step_id]["committed"]
+        assert step[step_id]["error"] == step[step_id]["result"]
+    assert "Cancelled" in step["deposit"]["error"]
+    assert body["status"] == "PARTIAL"
+
+def test_read_notice_commits_only_the_first_read(client):
+    customer = spa_module.spa.search_customer_by_id("C0001")
+    spa_module.spa.add_notice_list([(customer, Message("NOTE-1", customer, "hello", datetime(2026, 1, 1)))])
+    read = {"op": "readNotice", "args": {"customer_id": "C0001", "notice_id": "NOTE-1"}}
+    body = run_batch(client, [dict(read, id="first"), dict(read, id="second")])
+    assert body["status"] == "SUCCESS"
+    assert [step["committed"] for step in body["steps"]] == [True, False]
+
+@pytest.mark.skipif(not spa_module.SPA_ASYNC_ROUTES, reason="the event loop only matters for async routes")
+def test_batch_runs_off_the_event_loop(client, monkeypatch):
+    thread_name_list = []
+    def record(req):
+        thread_name_list.append(threading.current_thread().name)
+        return 0
+    monkeypatch.setitem(spa_module.BATCH_OPERATION, "countUnreadNotice", (record, spa_module.RequestCheckNotice, None, False))
+    run_batch(client, [{"id": "count", "op": "countUnreadNotice", "args": {"customer_id": "C0001"}}])
+    assert thread_name_list[0].startswith("spa-blocking")
@@ -0,0 +1,157 @@
+import random
+import sqlite3
+import sys
+import threading
+from datetime import date, timedelta
+
+import pytest
+
+import spa as spa_module
+from spa import SLOT_PER_DAY, InMemoryRepository, OperationLog, SkillSets, Therapist, Treatment, TreatmentTransaction
+
+from conftest import book
+
+DAY = date(2026, 1, 15)
+
+def test_window_for_odd_duration_is_bookable(system):
+    officer = system.search_employee_by_id("0001")
+    officer.add_treatment(Treatment("TM-45", "Traditional Thai Massage", 500, 45, "DRY", SkillSets.TM))
+
+    result = spa_module.find_free_slot(spa_module.RequestGetSlot(
+        customer_id="C0001", therapist_id="T0001", treatment_id="TM-45", room_type="PV",
+        year=DAY.year, month=DAY.month, day=DAY.day))
+    window = result[0].slot[0].time
+    assert window == "8:00-9:00"
+
+    response = book("C0001", DAY, "T0001", "TM-45", result[0].room_id, window)
+    assert response.status == "SUCCESS"
+
+def test_window_must_match_slot_count(system):
+    response = book("C0001", DAY, "T0001", "TM-01", "ROOM-DRY-PV-001", "10:00-10:30")
+    assert response.status == "FAIL"
+    assert response.detail[0].error[0].error_code == "TIME_WRONG_FORMAT"
+    assert response.detail[0].error[0].error_message == "Time must be exactly 60 minutes."
+
+def slot_state(system, date_target):
+    entity_list = system.room_list + [employee for employee in system.employee_list if isinstance(employee, Therapist)]
+    return {(entity.id, slot.slot_order): (slot.vacancy, list(slot.treatment_transaction))
+            for entity in entity_list for slot in entity.get_slot_by_date(date_target)}
+
+def make_transaction_list(system, customer_id: str, date_target, item_list: list):
+    customer = system.search_customer_by_id(customer_id)
+    return [TreatmentTransaction(customer, system.search_treatment_by_id(treatment_id), date_target,
+                                 system.search_room_by_id(room_id), slot_list, system.search_employee_by_id(therapist_id),
+                                 [system.search_add_on_by_id(addon_id) for addon_id in addon_list])
+            for therapist_id, treatment_id, room_id, slot_list, addon_list in item_list]
+
+class FailingObserver:
+    def update_slot(self, calendar, slot):
+        raise RuntimeError("observer failed")
+
+class FailingRepository(InMemoryRepository):
+    def add_booking(self, booking):
+        raise sqlite3.OperationalError("database is locked")
+
+ITEM_LIST = [("T0001", "TM-01", "ROOM-DRY-PV-001", [5, 6], ["OIL-P"]),
+             ("T0005", "DT-03", "ROOM-DRY-SH-001", [7, 8], ["SNK-S"])]
+
+def assert_nothing_reserved(system, before):
+    assert slot_state(system, DAY) == before
+    assert system.search_add_on_by_id("OIL-P").amount == 100
+    assert system.search_add_on_by_id("SNK-S").amount == 100
+    assert system.booking_count == 0
+    assert system.search_customer_by_id("C0001").booking_list == []
+
+def test_reservation_rolls_back_when_an_observer_fails(system):
+    before = slot_state(system, DAY)
+    system.search_room_by_id("ROOM-DRY-SH-001").calendar.add_observer(FailingObserver())
+    with pytest.raises(RuntimeError):
+        system.create_booking(system.search_customer_by_id("C0001"), DAY, make_transaction_list(system, "C0001", DAY, ITEM_LIST))
+    assert_nothing_reserved(system, before)
+
+def test_reservation_rolls_back_when_the_repository_fails(system):
+    before = slot_state(system, DAY)
+    system.attach_repository(FailingRepository())
+    with pytest.raises(sqlite3.OperationalError):
+        system.create_booking(system.search_customer_by_id("C0001"), DAY, make_transaction_list(system, "C0001", DAY, ITEM_LIST))
+    assert_nothing_reserved(system, before)
+
+def test_reservation_rolls_back_when_the_journal_fails(system, tmp_path):
+    before = slot_state(system, DAY)
+    journal = OperationLog(str(tmp_path))
+    system.attach_journal(journal)
+    journal.close()
+    with pytest.raises(RuntimeError):
+        system.create_booking(system.search_customer_by_id("C0001"), DAY, make_transaction_list(system, "C0001", DAY, ITEM_LIST))
+    assert_nothing_reserved(system, before)
+
+def test_concurrent_bookings_never_double_book(system):
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    pair_list = [("T0001", "TM-01"), ("T0002", "TM-01"), ("T0005", "DT-03"), ("T0006", "DT-03")]
+    room_list = ["ROOM-DRY-PV-001", "ROOM-DRY-PV-002", "ROOM-DRY-SH-001"]
+    customer_list = [customer.id for customer in system.customer_list]
+    day_list = [DAY + timedelta(days=offset) for offset in range(7)]
+    errors = []
+
+    def worker(seed: int):
+        rand = random.Random(seed)
+        try:
+            for _ in range(150):
+                item_list = []
+                for _ in range(rand.choice((1, 1, 2))):
+                    therapist_id, treatment_id = rand.choice(pair_list)
+                    start = rand.randint(1, SLOT_PER_DAY - 1)
+                    item_list.append((therapist_id, treatment_id, rand.choice(room_list), [start, start + 1],
+                                      rand.choice(([], ["OIL-P"]))))
+                customer_id = rand.choice(customer_list)
+                date_target = rand.choice(day_list)
+                try:
+                    booking = system.create_booking(system.search_customer_by_id(customer_id), date_target,
+                                                    make_transaction_list(system, customer_id, date_target, item_list))
+                except ValueError:
+                    continue
+                if rand.random() < 0.5:
+                    booking.cancle()
+        except Exception as e:
+            errors.append(e)
+
+    try:
+        thread_list = [threading.Thread(target=worker, args=(seed,)) for seed in range(32)]
+        for thread in thread_list: thread.start()
+        for thread in thread_list: thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert errors == []
+
+    active_list = [booking for booking in system.search_booking() if booking.status != "Cancelled"]
+    assert active_list
+    expected = {}
+    for booking in active_list:
+        for transaction in booking.treatment_list:
+            for time_order in transaction.time_slot:
+                for entity in (transaction.room, transaction.therapist):
+                    expected.setdefault((entity.id, transaction.date, time_order), []).append(transaction)
+    for date_target in day_list:
+        for (entity_id, time_order), (vacancy, transaction_list) in slot_state(system, date_target).items():
+            entity = system.search_room_by_id(entity_id) or system.search_employee_by_id(entity_id)
+            capacity = entity.calendar.get_default_vacancy(date_target)
+            assert vacancy >= 0
+            assert vacancy + len(transaction_list) == capacity
+            assert sorted(map(id, transaction_list)) == sorted(map(id, expected.get((entity_id, date_target, time_order), [])))
+    addon_used = sum(len(transaction.add_on_list) for booking in active_list for transaction in booking.treatment_list)
+    assert system.search_add_on_by_id("OIL-P").amount == 100 - addon_used
+
+def test_schedule_reads_do_not_materialize_days(system):
+    d = date(2026, 1, 20)
+    room = system.search_room_by_id("ROOM-DRY-PV-001")
+    therapist = system.search_employee_by_id("T0001")
+    employee_schedule = spa_module.request_employee_schedule(
+        spa_module.Request_employee_schedule(employee_id="T0001", year=2026, month=1, day=20))
+    room_schedule = spa_module.request_room_schedule(spa_module.RequestRoomSchedule(room_id="ROOM-DRY-PV-001", year=2026, month=1, day=20))
+    assert len(employee_schedule.slot) == len(room_schedule.slot) == SLOT_PER_DAY
+    assert all(slot.date != d for slot in room.calendar.slot + therapist.calendar.slot)
+
+    book("C0001", d, "T0001", "TM-01", "ROOM-DRY-PV-001", "10:00-11:00")
+    room_schedule = spa_module.request_room_schedule(spa_module.RequestRoomSchedule(room_id="ROOM-DRY-PV-001", year=2026, month=1, day=20))
+    assert [slot.time for slot in room_schedule.slot if slot.detail][:1] == ["10:00-10:30"]
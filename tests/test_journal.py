@@ -0,0 +1,117 @@
+import pickle
+import sys
+import threading
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import spa as spa_module
+from spa import Message, list_segment, list_snapshot, recover_system
+
+from conftest import book
+
+DAY = date(2026, 1, 15)
+
+@pytest.fixture
+def recover(monkeypatch, tmp_path):
+    system_list = []
+    def recover():
+        if system_list:
+            system_list[-1].journal.close()
+        system = recover_system(str(tmp_path), 3600)
+        monkeypatch.setattr(spa_module, "spa", system)
+        system_list.append(system)
+        return system
+    yield recover
+    system_list[-1].journal.close()
+
+def booking_summary(system):
+    return sorted((booking.id, booking.customer.id, booking.status, [tuple(transaction.time_slot) for transaction in booking.treatment_list])
+                  for booking in system.search_booking())
+
+def test_recovery_replays_the_journal(recover):
+    system = recover()
+    first = book("C0001", DAY, "T0001", "TM-01", "ROOM-DRY-PV-001", "10:00-11:00", ["OIL-P"])
+    book("C0002", DAY, "T0005", "DT-03", "ROOM-DRY-SH-001", "13:00-14:00")
+    spa_module.cancel_booking(spa_module.RequestCancleBooking(customer_id="C0001", booking_id=first.booking_id))
+    before = booking_summary(system)
+    vacancy = system.search_room_by_id("ROOM-DRY-SH-001").calendar.get_vacancy_by_date(DAY)
+
+    system = recover()
+    assert booking_summary(system) == before
+    assert system.search_room_by_id("ROOM-DRY-SH-001").calendar.get_vacancy_by_date(DAY) == vacancy
+    assert system.search_add_on_by_id("OIL-P").amount == 100
+
+    response = book("C0003", DAY, "T0001", "TM-01", "ROOM-DRY-PV-001", "10:00-11:00")
+    assert response.status == "SUCCESS"
+    assert response.booking_id not in [booking_id for booking_id, *_ in before]
+
+def test_recovery_ignores_a_torn_last_record(recover, tmp_path):
+    system = recover()
+    book("C0001", DAY, "T0001", "TM-01", "ROOM-DRY-PV-001", "10:00-11:00")
+    before = booking_summary(system)
+    system.journal.close()
+    with open(list_segment(str(tmp_path))[-1][1], "ab") as file:
+        file.write(b'{"lsn": 999, "op": "booking", "da')
+
+    system = recover()
+    assert booking_summary(system) == before
+
+@pytest.fixture
+def fast_switch():
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+def test_checkpoint_waits_for_lazy_days_and_compaction(recover, fast_switch):
+    system = recover()
+    old = datetime.now() - timedelta(days=365)
+    for index in range(200):
+        customer = system.search_customer_by_id(f"C{index % 5 + 1:04d}")
+        system.add_notice_list([(customer, Message(f"PROMOTION-{index}", customer, "old promotion", old))])
+    calendar_list = [entity.calendar for entity in system.room_list + system.employee_list]
+    for calendar in calendar_list:
+        calendar.open_date_range(date(2027, 1, 1), date(2027, 12, 31), 1)
+    event_list = [(date(2027, 1, 1) + timedelta(days=offset), index)
+                  for offset in range(365) for index in range(len(calendar_list))]
+    stop = threading.Event()
+    errors = []
+
+    def checkpoint():
+        try:
+            while not stop.is_set():
+                system.journal.checkpoint(system)
+                with open(list_snapshot(system.journal.directory)[0][1], "rb") as file:
+                    snapshot = pickle.load(file)
+                materialized = {(day, index) for index, entity in enumerate(snapshot.room_list + snapshot.employee_list)
+                                for day in {slot.date for slot in entity.calendar.slot} if day.year == 2027}
+                assert materialized == set(event_list[:len(materialized)])
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=checkpoint)
+    thread.start()
+    try:
+        for day, index in event_list:
+            calendar_list[index].get_slot_by_date_time(day, 1)
+            if day.day == 1 and index == 0:
+                system.compact_notice(timedelta(days=30))
+    finally:
+        stop.set()
+        thread.join()
+    assert errors == []
+
+def test_checkpoint_loop_survives_a_failure(recover, monkeypatch):
+    system = recover()
+    journal = system.journal
+    called = threading.Event()
+    attempt_list = []
+    def checkpoint(spa):
+        attempt_list.append(spa)
+        if len(attempt_list) == 1: raise OSError("disk full")
+        called.set()
+    monkeypatch.setattr(journal, "checkpoint", checkpoint)
+    book("C0001", DAY, "T0001", "TM-01", "ROOM-DRY-PV-001", "10:00-11:00")
+    journal.start_checkpoint(system, 0.01)
+    assert called.wait(5)
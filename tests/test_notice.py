@@ -0,0 +1,48 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+import spa as spa_module
+from spa import Message, SQLiteRepository
+
+STAMP = datetime(2026, 1, 10, 9, 0)
+
+def check_notice(customer_id: str, limit: int, before: datetime = None, before_id: str = None):
+    return spa_module.check_notice(spa_module.RequestCheckNotice(customer_id=customer_id, before=before,
+                                                                 before_id=before_id, limit=limit))
+
+def test_paging_does_not_skip_notices_that_share_a_timestamp(system):
+    customer = system.search_customer_by_id("C0001")
+    system.add_notice_list([(customer, Message(f"NOTE-{index}", customer, "note", STAMP)) for index in (3, 1, 4, 0, 2)])
+    for index in range(4):
+        system.add_broadcast(Message(f"PROMOTION-{index}", None, "promo", STAMP))
+    expected = [notice.notice_id for notice in check_notice("C0001", 100)]
+
+    seen = []
+    page = check_notice("C0001", 3)
+    while page:
+        seen += [notice.notice_id for notice in page]
+        last = page[-1]
+        page = check_notice("C0001", 3, datetime.fromisoformat(last.date), last.notice_id)
+    assert seen == expected
+    assert len(set(seen)) == len(customer.notice_list) + 4
+
+def test_date_only_cursor_still_returns_older_notices(system):
+    customer = system.search_customer_by_id("C0001")
+    system.add_notice_list([(customer, Message("NOTE-OLD", customer, "old", STAMP - timedelta(days=1))),
+                            (customer, Message("NOTE-NOW", customer, "now", STAMP))])
+    assert "NOTE-OLD" in [notice.notice_id for notice in check_notice("C0001", 100, STAMP)]
+    assert "NOTE-NOW" not in [notice.notice_id for notice in check_notice("C0001", 100, STAMP)]
+
+def test_compaction_deletes_archived_rows(system, tmp_path):
+    database = str(tmp_path / "spa.db")
+    system.attach_repository(SQLiteRepository(database))
+    customer = system.search_customer_by_id("C0001")
+    old = datetime.now() - timedelta(days=365)
+    system.add_notice_list([(customer, Message("NOTE-OLD", customer, "old", old))])
+    customer.read_notice("NOTE-OLD")
+    system.repository.update_notice(customer, customer.notice_list[0])
+
+    assert system.compact_notice(timedelta(days=30)) == 1
+    with sqlite3.connect(database) as connection:
+        assert connection.execute("SELECT COUNT(*) FROM notice WHERE id = 'NOTE-OLD'").fetchone() == (0,)
+    system.repository.close()
@@ -0,0 +1,117 @@
+import functools
+import sys
+import threading
+from datetime import date
+
+import pytest
+from fastapi import HTTPException
+
+import spa as spa_module
+from spa import Card, Cash, DryPrivateRoom, SkillSets, Therapist
+
+from conftest import book
+
+DAY = date(2026, 1, 15)
+
+def occupancy_report(year: int = 2026, month: int = 1):
+    return spa_module.request_occupancy_report(spa_module.RequestOccupancyReport(admin_id="0002", year=year, month=month))
+
+def test_occupancy_report_includes_entities_added_later(system):
+    pytest.importorskip("numpy")
+    officer = system.search_employee_by_id("0001")
+    before = occupancy_report()
+    assert system.occupancy_matrix is not None
+
+    room = DryPrivateRoom("ROOM-DRY-PV-099", 300)
+    officer.add_room(room)
+    officer.add_slot(date(2026, 1, 31), room, 1)
+    therapist = Therapist("T0099", "New", SkillSets.TM)
+    officer.add_employee(therapist)
+    officer.add_slot(date(2026, 1, 31), therapist, 1)
+
+    after = occupancy_report()
+    assert after.free_capacity["ROOM-DRY-PV"][0] == before.free_capacity["ROOM-DRY-PV"][0] + 16
+    assert "T0099" in after.therapist_utilization
+
+    system.remove_room(room.id)
+    system.remove_employee(therapist.id)
+    assert occupancy_report() == before
+
+def checked_in_booking_list(system, count: int):
+    booking_list = []
+    for index in range(count):
+        therapist_id, room_id = (("T0001", "ROOM-DRY-PV-001"), ("T0002", "ROOM-DRY-PV-002"))[index // 8]
+        start = index % 8 * 2 + 1
+        response = book("C0005", DAY, therapist_id, "TM-01", room_id, spa_module.make_window_str(start, 2))
+        booking = system.search_booking_by_id(response.booking_id)
+        booking.pay_deposit(Cash(), 1000, money=1000)
+        booking.check_in()
+        booking_list.append(booking)
+    return booking_list
+
+def run_together(function_list: list):
+    barrier = threading.Barrier(len(function_list))
+    result_list = [None] * len(function_list)
+    def run(index, function):
+        barrier.wait()
+        result_list[index] = function()
+    thread_list = [threading.Thread(target=run, args=item) for item in enumerate(function_list)]
+    for thread in thread_list: thread.start()
+    for thread in thread_list: thread.join()
+    return result_list
+
+@pytest.fixture
+def fast_switch():
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+@pytest.mark.parametrize("round", range(10))
+def test_concurrent_payments_record_revenue_once(system, fast_switch, round):
+    booking = checked_in_booking_list(system, 1)[0]
+    total = booking.calculate_total("None")
+
+    result_list = run_together([lambda: booking.pay_expenses(Card(), total, number="4242")] * 16)
+
+    assert sum(result.startswith("Payment Success") for result in result_list) == 1
+    revenue = system.search_revenue_by_date(DAY)
+    assert revenue.booking_count == 1
+    assert revenue.total == total
+
+@pytest.mark.parametrize("round", range(10))
+def test_concurrent_first_payments_share_one_ledger_day(system, fast_switch, round):
+    booking_list = checked_in_booking_list(system, 16)
+    total_list = [booking.calculate_total("None") for booking in booking_list]
+
+    run_together([functools.partial(booking.pay_expenses, Card(), total, number="4242")
+                  for booking, total in zip(booking_list, total_list)])
+
+    assert all(booking.status == "Completed" for booking in booking_list)
+    assert [revenue.date for revenue in system.revenue_per_day_list] == [DAY]
+    revenue = system.search_revenue_by_date(DAY)
+    assert revenue.booking_count == len(booking_list)
+    assert revenue.total == pytest.approx(sum(total_list))
+    assert sum(revenue.treatment_count.values()) == len(booking_list)
+
+def test_revenue_report_only_visits_recorded_days(system):
+    for day in (20, 5, 15):
+        response = book("C0005", date(2026, 1, day), "T0001", "TM-01", "ROOM-DRY-PV-001", "10:00-11:00")
+        booking = system.search_booking_by_id(response.booking_id)
+        booking.pay_deposit(Cash(), 1000, money=1000)
+        booking.check_in()
+        booking.pay_expenses(Card(), 500, number="4242")
+
+    report = spa_module.request_revenue_report(spa_module.RequestRevenueReport(
+        admin_id="0002", start_date=date(1, 1, 1), end_date=date(9999, 12, 31)))
+    assert [row.period for row in report] == ["2026-01-05", "2026-01-15", "2026-01-20"]
+
+    report = spa_module.request_revenue_report(spa_module.RequestRevenueReport(
+        admin_id="0002", start_date=date(2026, 1, 6), end_date=date(2026, 1, 31), group_by="month", dimension="therapist"))
+    assert [(row.period, row.total, row.booking_count) for row in report] == [("2026-01", 1000, 2)]
+    assert report[0].breakdown["T0001"].count == 2
+
+    with pytest.raises(HTTPException) as error:
+        spa_module.request_revenue_report(spa_module.RequestRevenueReport(
+            admin_id="0002", start_date=DAY, end_date=DAY, dimension="addon"))
+    assert error.value.status_code == 400
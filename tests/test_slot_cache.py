@@ -0,0 +1,49 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import spa as spa_module
+
+SLOT_BODY = {"customer_id": "C0001", "therapist_id": "T0001", "treatment_id": "TM-01", "room_type": "PV",
+             "year": 2026, "month": 1, "day": 15}
+
+@pytest.mark.skipif(not spa_module.SPA_ASYNC_ROUTES, reason="single-flight over the event loop needs async routes")
+def test_concurrent_slot_requests_share_one_computation(system, monkeypatch):
+    httpx = pytest.importorskip("httpx")
+    executor = ThreadPoolExecutor(4)
+    monkeypatch.setattr(spa_module, "blocking_executor", executor)
+    find_window = system.find_intersect_free_window
+    def slow_find_window(*args):
+        time.sleep(0.1)
+        return find_window(*args)
+    monkeypatch.setattr(system, "find_intersect_free_window", slow_find_window)
+    before = spa_module.slot_cache.metrics()
+
+    async def main():
+        tick_list = []
+        async def ticker(stop):
+            while not stop.is_set():
+                tick_list.append(time.perf_counter())
+                await asyncio.sleep(0.01)
+        transport = httpx.ASGITransport(app=spa_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://spa") as client:
+            stop = asyncio.Event()
+            task = asyncio.create_task(ticker(stop))
+            response_list = await asyncio.gather(*(client.post("/getSlot", json=SLOT_BODY) for _ in range(8)))
+            stop.set()
+            await task
+        return response_list, tick_list
+
+    try:
+        response_list, tick_list = asyncio.run(main())
+    finally:
+        executor.shutdown()
+    after = spa_module.slot_cache.metrics()
+
+    assert [response.status_code for response in response_list] == [200] * 8
+    assert len({response.text for response in response_list}) == 1
+    assert after["miss"] - before["miss"] == 1
+    assert after["coalesced"] - before["coalesced"] == 7
+    assert len(tick_list) >= 10
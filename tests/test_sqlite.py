@@ -0,0 +1,153 @@
+import sqlite3
+from datetime import date, datetime
+
+import pytest
+
+import spa as spa_module
+from spa import Coupon, Gold, Message, SQLiteRepository, init_system
+
+from conftest import book
+
+DAY = date(2026, 1, 15)
+
+@pytest.fixture
+def database(tmp_path):
+    return str(tmp_path / "spa.db")
+
+def select(database: str, query: str):
+    with sqlite3.connect(database) as connection:
+        return connection.execute(query).fetchall()
+
+def state(system):
+    entity_list = system.room_list + system.employee_list
+    return {
+        "booking": sorted((booking.id, booking.customer.id, booking.status,
+                           [(transaction.room.id, transaction.therapist.id, tuple(transaction.time_slot),
+                             tuple(addon.id for addon in transaction.add_on_list)) for transaction in booking.treatment_list])
+                          for booking in system.search_booking()),
+        "vacancy": {entity.id: entity.calendar.get_vacancy_by_date(DAY) for entity in entity_list},
+        "free_mask": {entity.id: entity.calendar.get_free_mask(DAY) for entity in entity_list},
+        "add_on": {add_on.id: add_on.amount for add_on in system.add_on_list},
+        "customer": {customer.id: (customer.name, type(customer).__name__, customer.unread_notice_count,
+                                   [(message.id, message.status) for message in customer.notice_list],
+                                   [(record.therapist.id, record.wellness_record) for record in customer.wellness_record])
+                     for customer in system.customer_list},
+        "broadcast": [message.id for message in system.broadcast_box.get_message_list(0)],
+    }
+
+def test_load_restores_what_the_routes_wrote(system, database, monkeypatch):
+    system.attach_repository(SQLiteRepository(database))
+    first = book("C0001", DAY, "T0001", "TM-01", "ROOM-DRY-PV-001", "10:00-11:00", ["OIL-P"])
+    second = book("C0002", DAY, "T0005", "DT-03", "ROOM-DRY-SH-001", "13:00-14:00")
+    book("C0003", DAY, "T0002", "TM-01", "ROOM-DRY-PV-002", "8:00-9:00", ["OIL-P"])
+    spa_module.cancel_booking(spa_module.RequestCancleBooking(customer_id="C0001", booking_id=first.booking_id))
+    spa_module.request_to_pay_deposit(spa_module.RequestToPay(customer_id="C0002", booking_id=second.booking_id,
+                                                              payment_type="Cash", payment_value=1000, coupon_id="None"))
+    spa_module.send_promotion(spa_module.RequestSendPromotion(admin_id="0002", promo_text="Half price"))
+    customer = system.search_customer_by_id("C0002")
+    for notice in customer.check_notice():
+        spa_module.read_notice(spa_module.RequestReadNotice(customer_id="C0002", notice_id=notice.id))
+    spa_module.request_to_create_wellness_record(spa_module.RequestCreateWellnessRecord(
+        therapist_id="T0005", customer_id="C0002", text_record="Tight shoulders"))
+    expected = state(system)
+    system.repository.close()
+
+    loaded = init_system()
+    repository = SQLiteRepository(database)
+    assert repository.load(loaded)
+    loaded.attach_repository(repository)
+    assert state(loaded) == expected
+
+    monkeypatch.setattr(spa_module, "spa", loaded)
+    response = book("C0004", DAY, "T0001", "TM-01", "ROOM-DRY-PV-001", "10:00-11:00")
+    assert response.status == "SUCCESS"
+    assert response.booking_id not in [booking[0] for booking in expected["booking"]]
+    repository.close()
+
+def test_load_leaves_the_seed_alone_for_an_empty_database(database):
+    system = init_system()
+    before = state(system)
+    repository = SQLiteRepository(database)
+    assert not repository.load(system)
+    assert state(system) == before
+    repository.close()
+
+def test_sync_replaces_stale_rows(system, database):
+    system.attach_repository(SQLiteRepository(database))
+    book("C0001", DAY, "T0001", "TM-01", "ROOM-DRY-PV-001", "10:00-11:00")
+    system.remove_customer("C0010")
+    system.repository.close()
+
+    fresh = init_system()
+    fresh.remove_customer("C0009")
+    fresh.attach_repository(SQLiteRepository(database))
+    assert select(database, "SELECT COUNT(*) FROM booking") == [(0,)]
+    assert select(database, "SELECT COUNT(*) FROM treatment_transaction") == [(0,)]
+    assert select(database, "SELECT id FROM customer WHERE id IN ('C0009', 'C0010')") == [("C0010",)]
+    assert select(database, "SELECT COUNT(*) FROM slot WHERE vacancy = 0") == [(0,)]
+    fresh.repository.close()
+
+def test_broadcast_seq_matches_the_broadcast_box(system, database):
+    system.attach_repository(SQLiteRepository(database))
+    for index in range(3):
+        system.add_broadcast(Message(f"PROMOTION-{index}", None, "promo", datetime(2026, 1, 1, index)))
+    system.repository.close()
+
+    fresh = init_system()
+    fresh.add_broadcast(Message("PROMOTION-9", None, "promo", datetime(2026, 1, 2)))
+    fresh.attach_repository(SQLiteRepository(database))
+    fresh.add_broadcast(Message("PROMOTION-10", None, "promo", datetime(2026, 1, 3)))
+    assert select(database, "SELECT seq, id FROM broadcast ORDER BY seq") == [(0, "PROMOTION-9"), (1, "PROMOTION-10")]
+    assert fresh.broadcast_box.get_index("PROMOTION-10") == 1
+    fresh.repository.close()
+
+def test_load_does_not_reuse_ids_of_removed_rows(system, database):
+    system.attach_repository(SQLiteRepository(database))
+    customer_id = system.generate_customer_id()
+    system.add_customer(Gold(customer_id, "Gone"))
+    system.remove_customer(customer_id)
+    booking = book("C0001", DAY, "T0001", "TM-01", "ROOM-DRY-PV-001", "10:00-11:00")
+    system.remove_booking(system.search_booking_by_id(booking.booking_id))
+    system.repository.close()
+
+    loaded = init_system()
+    repository = SQLiteRepository(database)
+    assert repository.load(loaded)
+    assert loaded.generate_customer_id() != customer_id
+    assert loaded.create_booking_id(DAY) != booking.booking_id
+    repository.close()
+
+def revenue_state(system):
+    report = spa_module.request_revenue_report(spa_module.RequestRevenueReport(
+        admin_id="0002", start_date=DAY, end_date=DAY, dimension="therapist"))
+    return [row.model_dump() for row in report], system.search_revenue_by_date(DAY).to_report()
+
+def test_load_restores_revenue_coupons_and_missed_count(system, database, monkeypatch):
+    system.attach_repository(SQLiteRepository(database))
+    customer = system.search_customer_by_id("C0005")
+    customer.missed_count = 2
+    customer.add_coupon_list(Coupon("CP-100", 100.0))
+    customer.add_coupon_list(Coupon("CP-50", 50.0))
+    system.repository.update_customer(customer)
+    for (therapist_id, room_id), coupon_id in ((("T0001", "ROOM-DRY-PV-001"), "CP-100"), (("T0002", "ROOM-DRY-PV-002"), "None")):
+        booking_id = book("C0005", DAY, therapist_id, "TM-01", room_id, "10:00-11:00").booking_id
+        payment = {"customer_id": "C0005", "booking_id": booking_id, "payment_type": "Cash", "payment_value": 5000}
+        spa_module.request_to_pay_deposit(spa_module.RequestToPay(**payment, coupon_id="None"))
+        spa_module.request_to_check_in(spa_module.RequestToCheckIn(customer_id="C0005", booking_id=booking_id))
+        spa_module.request_to_pay_expenses(spa_module.RequestToPay(**payment, coupon_id=coupon_id))
+    expected = revenue_state(system)
+    assert expected[1]["booking_count"] == 2
+    coupon_booking = next(booking for booking in customer.booking_list if booking.coupon_used_record is not None)
+    system.repository.close()
+
+    loaded = init_system()
+    repository = SQLiteRepository(database)
+    assert repository.load(loaded)
+    loaded.attach_repository(repository)
+    monkeypatch.setattr(spa_module, "spa", loaded)
+    assert revenue_state(loaded) == expected
+    reloaded = loaded.search_customer_by_id("C0005")
+    assert reloaded.missed_count == 2
+    assert [(coupon.id, coupon.discount) for coupon in reloaded.coupon_list] == [("CP-50", 50.0)]
+    assert loaded.search_booking_by_id(coupon_booking.id).coupon_used_record.id == "CP-100"
+    repository.close()
@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import spa as spa_module
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MCP_SCRIPT = """
+import asyncio
+import spa
+from fastmcp import Client
+
+async def main():
+    assert spa.spa is None
+    async with Client(spa.mcp) as client:
+        result = await client.call_tool("getCustomerIdByName", {"customer_name": "Batman"})
+        print(result.content[0].text)
+    assert spa.spa is None
+
+asyncio.run(main())
+"""
+
+def test_mcp_server_starts_the_system(tmp_path):
+    pytest.importorskip("fastmcp")
+    env = dict(os.environ, SPA_ENABLE_MCP="1", SPA_CACHE_DIR=str(tmp_path), PYTHONPATH=ROOT)
+    env.pop("SPA_DATA_DIR", None)
+    env.pop("SPA_DATABASE", None)
+    result = subprocess.run([sys.executable, "-c", MCP_SCRIPT], env=env, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "C0001"
+
+def test_seed_snapshot_is_written_to_the_cache_directory(tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / "cache")
+    monkeypatch.setattr(spa_module, "SPA_CACHE_DIR", cache_dir)
+    monkeypatch.setattr(spa_module, "SEED_SNAPSHOT", os.path.join(cache_dir, "seed.pkl"))
+    first = spa_module.load_seed()
+    assert os.listdir(cache_dir) == ["seed.pkl"]
+    assert not os.path.exists(os.path.join(ROOT, ".spa_seed.pkl"))
+    second = spa_module.load_seed()
+    assert second is not first
+    assert [customer.id for customer in second.customer_list] == [customer.id for customer in first.customer_list]